@@ -3,6 +3,11 @@
 `sysmaint --help` discovers subcommands. Each subcommand is a thin wrapper
 that loads config, sets up logging, and delegates to a tasks/ module.
 
+`sysmaint status` is run constantly by scripts and monitoring, so startup
+is kept small: task modules, logging handlers and locking are imported by
+the branch that uses them, and only the invoked subcommand's options are
+built (tests/test_cli.py holds the import budget).
+
 Exit codes:
   0  success
   1  task-level failure (subprocess returned non-zero, email failed, etc.)
@@ -13,7 +18,9 @@ Exit codes:
 from __future__ import annotations
 
 import argparse
+import datetime as dt
 import sys
+from collections.abc import Callable
 from pathlib import Path
 
 from sysmaint import __version__
@@ -23,15 +30,21 @@ from sysmaint.core.config import (
     ConfigError,
     load_config,
 )
-from sysmaint.core.lock import AlreadyRunning, acquire_lock
-from sysmaint.core.logging_utils import setup_logger
 
 UPDATE_LOG = Path("/var/log/sysmaint.log")
 PIHOLE_LOG = Path("/var/log/sysmaint-pihole.log")
 POSTFIX_LOG = Path("/var/log/sysmaint-postfix.log")
+CACHE_LOG = Path("/var/log/sysmaint-cache.log")
+# Fleet runs are driven from an operator's workstation, usually not as root.
+FLEET_LOG = Path.home() / ".local" / "state" / "sysmaint" / "fleet.log"
+
 
+def _build_parser(command: str | None = None) -> argparse.ArgumentParser:
+    """The argument parser; with `command`, only that subcommand's branch.
 
-def _build_parser() -> argparse.ArgumentParser:
+    Building every subcommand's options costs more than some commands take
+    to run, so main() builds just the one on the command line.
+    """
     parser = argparse.ArgumentParser(
         prog="sysmaint",
         description=(
@@ -46,67 +59,346 @@ def _build_parser() -> argparse.ArgumentParser:
         default=DEFAULT_CONFIG_PATH,
         help=f"Path to config file (default: {DEFAULT_CONFIG_PATH})",
     )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help="Record where the run spends its time and write it to FILE as Chrome "
+        "trace JSON (open in chrome://tracing or ui.perfetto.dev)",
+    )
 
     sub = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+    for name, (help_text, add_arguments) in _COMMANDS.items():
+        if command is None or name == command:
+            add_arguments(sub.add_parser(name, help=help_text))
+    return parser
 
-    sub.add_parser(
-        "install",
-        help="First-time setup: write config, install timers, send test email",
-    ).add_argument(
+
+def _requested_command(argv: list[str]) -> str | None:
+    """The subcommand named in `argv`, or None if there isn't a known one yet
+    (e.g. `sysmaint --help`), in which case the whole parser is needed."""
+    args = iter(argv)
+    for arg in args:
+        if arg in _GLOBAL_OPTIONS_WITH_VALUE:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg if arg in _COMMANDS else None
+        elif "=" not in arg:
+            return None
+    return None
+
+
+def _no_arguments(parser: argparse.ArgumentParser) -> None:
+    pass
+
+
+def _install_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
         "--non-interactive",
         action="store_true",
         help="Skip prompts (use existing config; just install timers)",
     )
 
-    upd = sub.add_parser("update", help="Run apt maintenance and send the summary email")
-    upd.add_argument(
+
+def _update_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
         "--security-only",
         action="store_true",
-        help="Run security upgrades only (instead of full upgrade)",
+        help="Upgrade only packages whose new version comes from a security pocket "
+        "(with --plan: list only those)",
     )
+    parser.add_argument(
+        "--prefetch-only",
+        action="store_true",
+        help="Only download pending upgrades (at idle IO priority) for a later run; "
+        "no install, no email",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only print the pending upgrades, computed from apt's indexes without "
+        "running apt; changes nothing",
+    )
+
+
+def _postfix_arguments(parser: argparse.ArgumentParser) -> None:
+    actions = parser.add_subparsers(dest="postfix_command", metavar="ACTION", required=True)
+    actions.add_parser("setup", help="Install + configure Postfix as Gmail relay")
+    actions.add_parser("purge", help="Remove Postfix and its config")
 
-    sub.add_parser(
-        "pihole",
-        help="Run `pihole -up` and email the result (DNS boxes only)",
+
+def _status_arguments(parser: argparse.ArgumentParser) -> None:
+    from sysmaint.core.status_cache import DEFAULT_TTL_SEC
+
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Re-check everything instead of reusing a recent cached report",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=_positive_int,
+        default=DEFAULT_TTL_SEC,
+        metavar="SECONDS",
+        help=f"Reuse a cached report at most this old (default: {DEFAULT_TTL_SEC})",
     )
 
-    postfix_parser = sub.add_parser("postfix", help="Postfix management")
-    postfix_sub = postfix_parser.add_subparsers(
-        dest="postfix_command", metavar="ACTION", required=True
+
+def _bench_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "names", nargs="*", metavar="NAME", help="Benchmarks to run (default: all)"
     )
-    postfix_sub.add_parser("setup", help="Install + configure Postfix as Gmail relay")
-    postfix_sub.add_parser("purge", help="Remove Postfix and its config")
+    parser.add_argument("--save", type=Path, metavar="FILE", help="Write results as JSON")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="FILE",
+        help="Compare against results saved earlier; exit 1 on a regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown ratio that counts as a regression (default: 1.25)",
+    )
+    parser.add_argument(
+        "--repeat", type=_positive_int, default=5, help="Samples per benchmark (default: 5)"
+    )
+
 
-    sub.add_parser("vim-config", help="Append standard vim settings to /etc/vim/vimrc")
-    sub.add_parser(
-        "configure-unattended",
-        help="Install + configure unattended-upgrades to email through the relay",
+def _history_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--step", help="Only this step (e.g. dist-upgrade, update)")
+    parser.add_argument(
+        "--since", type=_date, help="Only runs on or after this date (YYYY-MM-DD)"
     )
-    sub.add_parser("status", help="Print local diagnostics (config, timers, disks, services)")
-    sub.add_parser("test-email", help="Send a test email using the current config")
-    sub.add_parser(
-        "migrate-from-legacy",
-        help="Migrate from the old auto_updater_package layout",
+    parser.add_argument(
+        "--until", type=_date, help="Only runs on or before this date (YYYY-MM-DD)"
     )
-    sub.add_parser(
-        "uninstall",
-        help="Remove timers and unit files (preserves config under /etc/sysmaint)",
+    parser.add_argument(
+        "--failures-only", action="store_true", help="Only failed steps / runs with a failure"
     )
 
-    return parser
+
+def _mail_arguments(parser: argparse.ArgumentParser) -> None:
+    actions = parser.add_subparsers(dest="mail_command", metavar="ACTION", required=True)
+    actions.add_parser(
+        "flush", help="Deliver queued email that is due (run by sysmaint-mail-flush.timer)"
+    ).add_argument(
+        "--force",
+        action="store_true",
+        help="Retry every queued message now, ignoring backoff",
+    )
+
+
+def _digest_arguments(parser: argparse.ArgumentParser) -> None:
+    actions = parser.add_subparsers(dest="digest_command", metavar="ACTION", required=True)
+    actions.add_parser(
+        "send", help="Email one summary of every host record in the digest spool"
+    ).add_argument(
+        "--keep",
+        action="store_true",
+        help="Leave the records in the spool after sending",
+    )
+
+
+def _cache_serve_arguments(parser: argparse.ArgumentParser) -> None:
+    from sysmaint.core.aptcache import DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE_DAYS, DEFAULT_PORT
+
+    parser.add_argument(
+        "--listen", default="0.0.0.0", help="Address to bind (default: 0.0.0.0)"
+    )
+    parser.add_argument(
+        "--port", type=_positive_int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Where cached files live (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--mirror",
+        action="append",
+        default=[],
+        metavar="HOST[:PORT]",
+        help="Only proxy requests to this mirror (repeatable). Without any, only "
+        "port 80 on public addresses is proxied",
+    )
+    parser.add_argument(
+        "--max-age-days",
+        type=_positive_int,
+        default=DEFAULT_MAX_AGE_DAYS,
+        help="At startup, delete cached packages unused for this many days "
+        f"(default: {DEFAULT_MAX_AGE_DAYS})",
+    )
+
+
+def _fleet_arguments(parser: argparse.ArgumentParser) -> None:
+    from sysmaint.tasks.fleet import DEFAULT_HOST_TIMEOUT_SEC, DEFAULT_SSH
+
+    actions = parser.add_subparsers(dest="fleet_command", metavar="ACTION", required=True)
+    upd = actions.add_parser(
+        "update", help="Run `sysmaint update` on every host in an inventory, in batches"
+    )
+    upd.add_argument(
+        "--inventory",
+        type=Path,
+        required=True,
+        help="File with one host (or user@host) per line; '#' starts a comment",
+    )
+    upd.add_argument(
+        "--concurrency", type=_positive_int, default=10, help="Hosts updated at once (default: 10)"
+    )
+    upd.add_argument(
+        "--batch-size",
+        type=_positive_int,
+        default=None,
+        help="Hosts per rolling batch; each batch finishes before the next starts "
+        "(default: all hosts in one batch)",
+    )
+    upd.add_argument(
+        "--max-failures",
+        type=int,
+        default=None,
+        help="Stop starting new hosts once more than this many have failed "
+        "(default: never abort)",
+    )
+    upd.add_argument(
+        "--ssh",
+        default=DEFAULT_SSH,
+        help=f"SSH command used to reach each host (default: {DEFAULT_SSH!r})",
+    )
+    upd.add_argument(
+        "--timeout",
+        type=_positive_int,
+        default=DEFAULT_HOST_TIMEOUT_SEC,
+        help=f"Per-host timeout in seconds (default: {DEFAULT_HOST_TIMEOUT_SEC})",
+    )
+    upd.add_argument(
+        "--security-only",
+        action="store_true",
+        help="Pass --security-only to each host's update",
+    )
+
+
+# Subcommand -> (help, adds its arguments), in `sysmaint --help` order.
+_COMMANDS: dict[str, tuple[str, Callable[[argparse.ArgumentParser], None]]] = {
+    "install": (
+        "First-time setup: write config, install timers, send test email",
+        _install_arguments,
+    ),
+    "update": ("Run apt maintenance and send the summary email", _update_arguments),
+    "pihole": ("Run `pihole -up` and email the result (DNS boxes only)", _no_arguments),
+    "postfix": ("Postfix management", _postfix_arguments),
+    "vim-config": ("Append standard vim settings to /etc/vim/vimrc", _no_arguments),
+    "configure-unattended": (
+        "Install + configure unattended-upgrades to email through the relay",
+        _no_arguments,
+    ),
+    "status": ("Print local diagnostics (config, timers, disks, services)", _status_arguments),
+    "test-email": ("Send a test email using the current config", _no_arguments),
+    "bench": (
+        "Time sysmaint's hot paths; save and compare results between versions",
+        _bench_arguments,
+    ),
+    "history": (
+        "Step-duration and package-count percentiles from past update runs",
+        _history_arguments,
+    ),
+    "mail": ("Outbound mail queue", _mail_arguments),
+    "digest": ("Fleet digest email ([notify] mode = digest)", _digest_arguments),
+    "migrate-from-legacy": (
+        "Migrate from the old auto_updater_package layout",
+        _no_arguments,
+    ),
+    "uninstall": (
+        "Remove timers and unit files (preserves config under /etc/sysmaint)",
+        _no_arguments,
+    ),
+    "cache-serve": (
+        "Run a caching apt proxy so the fleet downloads each package once "
+        "(point hosts at it with [update] apt_proxy)",
+        _cache_serve_arguments,
+    ),
+    "fleet": ("Run sysmaint on many hosts over SSH", _fleet_arguments),
+}
+_GLOBAL_OPTIONS_WITH_VALUE = frozenset({"--config", "--trace"})
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _date(value: str) -> dt.date:
+    try:
+        return dt.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}") from None
 
 
 def main(argv: list[str] | None = None) -> int:
     """Parse args and dispatch. Returns exit code."""
-    parser = _build_parser()
-    args = parser.parse_args(argv)
+    if argv is None:
+        argv = sys.argv[1:]
+    args = _build_parser(_requested_command(argv)).parse_args(argv)
+    if not args.trace:
+        return _dispatch(args)
+
+    from sysmaint.core import trace
+
+    trace.enable()
+    try:
+        with trace.span(f"sysmaint {args.command}", "cli"):
+            return _dispatch(args)
+    finally:
+        trace.disable()
+        try:
+            count = trace.export_chrome(args.trace)
+            print(f"sysmaint: wrote {count} trace span(s) to {args.trace}", file=sys.stderr)
+        except OSError as exc:
+            print(f"sysmaint: could not write trace to {args.trace}: {exc}", file=sys.stderr)
+
+
+def _dispatch(args: argparse.Namespace) -> int:
 
     # `sysmaint status` is a special case — it must work even when there's no
     # config yet, and it should run as any user.
     if args.command == "status":
         from sysmaint.tasks import status
 
-        return status.execute()
+        return status.execute(fresh=args.fresh, max_age=args.max_age)
+
+    if args.command == "bench":
+        from sysmaint.tasks import bench
+
+        return bench.execute(
+            names=args.names or None,
+            save_path=args.save,
+            compare_path=args.compare,
+            threshold=args.threshold,
+            repeat=args.repeat,
+        )
+
+    if args.command == "update" and args.plan:
+        from sysmaint.tasks import plan
+
+        return plan.execute(security_only=args.security_only)
+
+    if args.command == "history":
+        from sysmaint.tasks import history_cmd
+
+        return history_cmd.execute(
+            step=args.step,
+            since=args.since,
+            until=args.until,
+            failures_only=args.failures_only,
+        )
+
+    # Imported here, not at the top, so the commands above start faster.
+    from sysmaint.core.logging_utils import setup_logger
 
     # Commands that don't need config loaded:
     if args.command == "install":
@@ -134,9 +426,40 @@ def main(argv: list[str] | None = None) -> int:
         postfix_purge.execute(logger)
         return 0
 
+    if args.command == "cache-serve":
+        from sysmaint.tasks import cache_serve
+
+        logger = setup_logger("sysmaint.cache", CACHE_LOG, console=True)
+        return cache_serve.execute(
+            logger,
+            listen=args.listen,
+            port=args.port,
+            cache_dir=args.cache_dir,
+            max_age_days=args.max_age_days,
+            mirrors=args.mirror,
+        )
+
+    if args.command == "fleet":
+        from sysmaint.tasks import fleet
+
+        logger = setup_logger("sysmaint.fleet", FLEET_LOG, console=True)
+        return fleet.execute(
+            logger,
+            inventory=args.inventory,
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            max_failures=args.max_failures,
+            ssh=args.ssh,
+            timeout=args.timeout,
+            security_only=args.security_only,
+        )
+
     # Everything below needs config.
+    from sysmaint.core import trace
+
     try:
-        config = load_config(args.config)
+        with trace.span("load config", "config", path=str(args.config)):
+            config = load_config(args.config)
     except ConfigError as exc:
         print(f"sysmaint: config error: {exc}", file=sys.stderr)
         print(
@@ -150,6 +473,20 @@ def main(argv: list[str] | None = None) -> int:
 
 def _dispatch_with_config(args: argparse.Namespace, config: Config) -> int:
     """Handle commands that require a loaded Config."""
+    from sysmaint.core.lock import AlreadyRunning, acquire_lock
+    from sysmaint.core.logging_utils import setup_logger
+
+    if args.command == "update" and args.prefetch_only:
+        from sysmaint.tasks import prefetch
+
+        logger = setup_logger("sysmaint.prefetch", UPDATE_LOG, console=True)
+        try:
+            with acquire_lock():
+                return prefetch.execute(config, logger, security_only=args.security_only)
+        except AlreadyRunning as exc:
+            print(f"sysmaint: {exc}", file=sys.stderr)
+            return 3
+
     if args.command == "update":
         from sysmaint.tasks import apt_update
 
@@ -203,6 +540,22 @@ def _dispatch_with_config(args: argparse.Namespace, config: Config) -> int:
         logger = setup_logger("sysmaint.test-email", UPDATE_LOG, console=True)
         return test_email_cmd.execute(config, logger)
 
+    if args.command == "mail" and args.mail_command == "flush":
+        from sysmaint.tasks import mail_cmd
+
+        logger = setup_logger("sysmaint.mail", UPDATE_LOG, console=True)
+        try:
+            return mail_cmd.flush(config, logger, force=args.force)
+        except AlreadyRunning as exc:
+            print(f"sysmaint: {exc}", file=sys.stderr)
+            return 3
+
+    if args.command == "digest" and args.digest_command == "send":
+        from sysmaint.tasks import digest_cmd
+
+        logger = setup_logger("sysmaint.digest", UPDATE_LOG, console=True)
+        return digest_cmd.execute(config, logger, keep=args.keep)
+
     # Unreachable — argparse already validated the command name.
     print(f"sysmaint: unknown command: {args.command}", file=sys.stderr)
     return 2
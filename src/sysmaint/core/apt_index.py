@@ -0,0 +1,341 @@
+"""Candidate versions from apt's package indexes, without running apt.
+
+`apt-get update` leaves one Packages file per suite, component and
+architecture in /var/lib/apt/lists. Reading those directly and comparing
+them with dpkg's installed versions answers "what would an upgrade
+change?" in-process — `sysmaint update --plan` — instead of forking
+`apt-get -s dist-upgrade` and scraping its output.
+
+Design notes:
+- Packages files are mmapped and scanned like dpkg's status file
+  (dpkg.mapped/dpkg.stanzas); only Package, Architecture and Version
+  are read out of each stanza.
+- PackageIndex keeps, per "name:arch", the highest version seen and the
+  Release it came from, in parallel lists and an array behind __slots__,
+  with one dict from key to position. A full Ubuntu archive is ~100k
+  entries.
+- Building it reads tens of MB, so the result is cached on disk as JSON,
+  keyed by the name, size and mtime of every list file; anything
+  `apt-get update` rewrites forces a rebuild.
+- The candidate approximates apt's: the highest version from any suite
+  whose Release isn't NotAutomatic (experimental, backports). Pins in
+  /etc/apt/preferences are not applied; `apt-get -s` stays authoritative.
+- A version published in both a security pocket and the main or -updates
+  suite (Ubuntu copies every security fix to -updates) is attributed to
+  the security pocket, so security_only() sees it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+from array import array
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from sysmaint.core import debversion, dpkg, state
+from sysmaint.core.fingerprint import APT_LISTS_DIR
+
+DEFAULT_INDEX_CACHE = Path("/var/cache/sysmaint/apt-index.json")
+APT_PREFERENCES = (Path("/etc/apt/preferences"), Path("/etc/apt/preferences.d"))
+_CACHE_VERSION = 3
+_PACKAGES_FIELDS = dpkg.field_pattern("Package", "Architecture", "Version")
+_DEPENDS_FIELDS = dpkg.field_pattern("Package", "Version", "Depends", "Pre-Depends")
+# The package name in one alternative of a Depends entry, e.g. b"libc6" in
+# b"libc6:any (>= 2.34)".
+_DEPENDS_NAME = re.compile(rb"\s*([^\s:(]+)")
+_RELEASE_SUFFIXES = ("_InRelease", "_Release")
+# Debian's "bookworm-security", Ubuntu's "noble-security"; before bullseye,
+# Debian's security suite was "<codename>/updates", labelled Debian-Security.
+_SECURITY_SUFFIXES = ("-security", "/updates")
+_SECURITY_LABELS = frozenset({"Debian-Security"})
+
+
+@dataclass(frozen=True)
+class Release:
+    """One suite's Release file, as apt saved it in the lists directory."""
+
+    prefix: str  # list file name prefix, e.g. "deb.debian.org_debian_dists_bookworm-security_"
+    suite: str = ""
+    codename: str = ""
+    origin: str = ""
+    label: str = ""
+    not_automatic: bool = False
+
+    @property
+    def security(self) -> bool:
+        """Whether this is a distribution's security pocket."""
+        return (
+            self.suite.endswith(_SECURITY_SUFFIXES)
+            or self.codename.endswith(_SECURITY_SUFFIXES)
+            or self.label in _SECURITY_LABELS
+        )
+
+
+@dataclass(frozen=True)
+class Candidate:
+    version: str
+    release: Release
+
+
+@dataclass(frozen=True)
+class PendingUpgrade:
+    name: str  # dpkg's key: "name", or "name:arch" for Multi-Arch: same
+    installed: str
+    candidate: str
+    release: Release
+
+
+class PackageIndex:
+    """Highest available version per "name:arch", and the Release providing it."""
+
+    __slots__ = ("_positions", "_release_ids", "_versions", "releases")
+
+    def __init__(self, releases: tuple[Release, ...] = ()) -> None:
+        self.releases = releases
+        self._positions: dict[str, int] = {}
+        self._versions: list[str] = []
+        self._release_ids = array("H")
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def add(self, key: str, version: str, release_id: int) -> None:
+        """Record `version` of `key` from releases[release_id], keeping the highest
+        (and, for a version several suites publish, the security pocket)."""
+        position = self._positions.get(key)
+        if position is None:
+            self._positions[key] = len(self._versions)
+            self._versions.append(version)
+            self._release_ids.append(release_id)
+            return
+        order = debversion.compare(version, self._versions[position])
+        if order > 0:
+            self._versions[position] = version
+            self._release_ids[position] = release_id
+        elif (
+            order == 0
+            and self.releases[release_id].security
+            and not self.releases[self._release_ids[position]].security
+        ):
+            self._release_ids[position] = release_id
+
+    def candidate(self, key: str) -> Candidate | None:
+        position = self._positions.get(key)
+        if position is None:
+            return None
+        return Candidate(
+            self._versions[position], self.releases[self._release_ids[position]]
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "releases": [asdict(r) for r in self.releases],
+            "keys": list(self._positions),
+            "versions": self._versions,
+            "release_ids": self._release_ids.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PackageIndex:
+        index = cls(tuple(Release(**r) for r in data["releases"]))
+        keys, versions = data["keys"], data["versions"]
+        if len(keys) != len(versions):
+            raise ValueError("index keys and versions differ in length")
+        index._positions = {key: i for i, key in enumerate(keys)}
+        index._versions = list(versions)
+        index._release_ids = array("H", data["release_ids"])
+        return index
+
+
+def build(lists_dir: Path = APT_LISTS_DIR, *, logger: logging.Logger | None = None) -> PackageIndex:
+    """Index every Packages file in `lists_dir`.
+
+    A stanza whose version dpkg couldn't parse (one bad third-party
+    repository) is skipped, with a warning to `logger`, rather than
+    failing the whole index.
+
+    Raises:
+        OSError: If a list file can't be read.
+    """
+    releases = _read_releases(lists_dir)
+    # Lists no Release file accounts for (flat repositories) share one entry.
+    releases.append(Release(prefix=""))
+    index = PackageIndex(tuple(releases))
+    for path in sorted(lists_dir.glob("*_Packages")):
+        release_id = _release_for(path.name, releases)
+        if releases[release_id].not_automatic:
+            continue
+        with dpkg.mapped(path) as data:
+            for fields in dpkg.stanzas(data, _PACKAGES_FIELDS):
+                name, arch = fields.get(b"Package"), fields.get(b"Architecture")
+                version = fields.get(b"Version")
+                if not (name and arch and version):
+                    continue
+                try:
+                    debversion.sort_key(version.decode())
+                except ValueError as exc:
+                    if logger:
+                        logger.warning("Skipping %s in %s: %s", name.decode(), path.name, exc)
+                    continue
+                index.add(f"{name.decode()}:{arch.decode()}", version.decode(), release_id)
+    return index
+
+
+def load(
+    lists_dir: Path = APT_LISTS_DIR,
+    cache: Path | None = DEFAULT_INDEX_CACHE,
+    *,
+    logger: logging.Logger | None = None,
+) -> tuple[PackageIndex, bool]:
+    """The index for the current lists, and whether it came from `cache`.
+
+    A missing, stale or unreadable cache is rebuilt and rewritten (best
+    effort: a cache that can't be written is just not saved).
+
+    Raises:
+        OSError: If a list file can't be read.
+    """
+    key = lists_key(lists_dir)
+    if cache is not None:
+        with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+            data = state.read_json(cache)
+            if data.get("version") == _CACHE_VERSION and data.get("key") == key:
+                return PackageIndex.from_dict(data), True
+    index = build(lists_dir, logger=logger)
+    if cache is not None:
+        payload = {"version": _CACHE_VERSION, "key": key, **index.to_dict()}
+        with contextlib.suppress(OSError):
+            state.atomic_write_text(cache, json.dumps(payload, separators=(",", ":")))
+    return index, False
+
+
+def lists_key(lists_dir: Path = APT_LISTS_DIR) -> str:
+    """Hex digest over (name, size, mtime) of the Packages and Release files."""
+    entries = []
+    with contextlib.suppress(FileNotFoundError), os.scandir(lists_dir) as it:
+        for entry in it:
+            if entry.name.endswith(("_Packages", *_RELEASE_SUFFIXES)):
+                st = entry.stat()
+                entries.append(f"{entry.name}\0{st.st_size}\0{st.st_mtime_ns}\n")
+    return hashlib.sha256("".join(sorted(entries)).encode()).hexdigest()
+
+
+def pending_upgrades(
+    installed: Mapping[str, dpkg.InstalledPackage], index: PackageIndex
+) -> tuple[list[PendingUpgrade], list[PendingUpgrade]]:
+    """(upgradable, held back by `apt-mark hold`), each sorted by name."""
+    pending: list[PendingUpgrade] = []
+    held: list[PendingUpgrade] = []
+    found = []
+    for key in sorted(installed):
+        package = installed[key]
+        candidate = index.candidate(f"{package.name}:{package.architecture}")
+        if candidate is not None and candidate.version != package.version:
+            found.append((key, package, candidate))
+    newer = debversion.compare_many((c.version, p.version) for _, p, c in found)
+    for (key, package, candidate), order in zip(found, newer, strict=True):
+        if order > 0:
+            upgrade = PendingUpgrade(key, package.version, candidate.version, candidate.release)
+            (held if package.want == "hold" else pending).append(upgrade)
+    return pending, held
+
+
+def dependencies(
+    wanted: Mapping[str, str], lists_dir: Path = APT_LISTS_DIR
+) -> dict[str, set[str]]:
+    """Names each wanted package's version depends on (Depends, Pre-Depends).
+
+    `wanted` maps package names (no architecture) to the version whose
+    dependencies are wanted, e.g. each pending upgrade's candidate. Every
+    alternative of an "a | b" dependency is included. Only an upgrade
+    needs this, so it is read on demand rather than kept in the index.
+
+    Raises:
+        OSError: If a list file can't be read.
+    """
+    versions = {name.encode(): version.encode() for name, version in wanted.items()}
+    depends: dict[str, set[str]] = {}
+    for path in sorted(lists_dir.glob("*_Packages")):
+        with dpkg.mapped(path) as data:
+            for fields in dpkg.stanzas(data, _DEPENDS_FIELDS):
+                name = fields.get(b"Package", b"")
+                if name not in versions or fields.get(b"Version") != versions[name]:
+                    continue
+                names = depends.setdefault(name.decode(), set())
+                for field in (b"Depends", b"Pre-Depends"):
+                    for entry in re.split(rb"[,|]", fields.get(field, b"")):
+                        match = _DEPENDS_NAME.match(entry)
+                        if match:
+                            names.add(match.group(1).decode())
+    return depends
+
+
+def security_only(upgrades: list[PendingUpgrade]) -> list[PendingUpgrade]:
+    """The upgrades whose candidate comes from a security pocket.
+
+    An upgrade whose candidate is a newer, non-security version is left
+    out even if a security pocket has a fix in between: apt would install
+    the candidate, which is more than a security-only run should.
+    """
+    return [u for u in upgrades if u.release.security]
+
+
+def pins_configured(paths: tuple[Path, ...] = APT_PREFERENCES) -> bool:
+    """Whether apt preferences exist that a plan from this module ignores."""
+    for path in paths:
+        if path.is_file():
+            return True
+        if path.is_dir() and any(p.is_file() for p in path.iterdir()):
+            return True
+    return False
+
+
+def _read_releases(lists_dir: Path) -> list[Release]:
+    releases = {}
+    for suffix in _RELEASE_SUFFIXES:
+        for path in lists_dir.glob(f"*{suffix}"):
+            prefix = path.name[: -len(suffix)] + "_"
+            # InRelease is preferred; a stale Release beside it is ignored.
+            if prefix not in releases:
+                releases[prefix] = _parse_release(prefix, path.read_bytes())
+    return [releases[prefix] for prefix in sorted(releases)]
+
+
+def _parse_release(prefix: str, data: bytes) -> Release:
+    fields: dict[str, str] = {}
+    for line in data.decode("utf-8", "replace").splitlines():
+        if not line or line[0].isspace():
+            continue  # checksum lists, signature body
+        if line.startswith("-----BEGIN PGP SIGNATURE"):
+            break
+        name, colon, value = line.partition(":")
+        if colon:
+            fields.setdefault(name, value.strip())
+    return Release(
+        prefix=prefix,
+        suite=fields.get("Suite", ""),
+        codename=fields.get("Codename", ""),
+        origin=fields.get("Origin", ""),
+        label=fields.get("Label", ""),
+        not_automatic=fields.get("NotAutomatic", "").lower() == "yes",
+    )
+
+
+def _release_for(list_name: str, releases: list[Release]) -> int:
+    """Position of the Release whose prefix `list_name` starts with. The
+    longest wins: an old-style "stretch/updates" suite is saved as
+    "…_dists_stretch_updates_", which "…_dists_stretch_" also prefixes."""
+    best = len(releases) - 1  # the catch-all with prefix ""
+    for i, release in enumerate(releases):
+        if list_name.startswith(release.prefix) and len(release.prefix) > len(
+            releases[best].prefix
+        ):
+            best = i
+    return best
@@ -0,0 +1,213 @@
+"""Incremental parser for apt-get / dpkg console output.
+
+The runner streams apt output line by line (see `run_command(stream=True)`);
+this parser is a line consumer that turns those lines into structured data
+as they arrive:
+
+- the "X upgraded, Y newly installed, Z to remove" summary counts,
+- one `PackageChange` per package with old/new versions,
+- per-package wall time from "Unpacking" to "Setting up",
+- the packages downloaded ("Get:" lines), which is all a `-d` run prints.
+
+Nothing but the per-package table is retained, so memory stays flat no
+matter how much output a 30-minute dist-upgrade prints. Progress is logged
+as each package finishes, which is what makes a long run followable in
+`journalctl -f` instead of only in the email afterwards.
+
+Both the real-run format (Unpacking/Setting up/Removing) and the
+simulation format (`apt-get -s`: Inst/Remv) are understood.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# Matches the "X upgraded, Y newly installed, Z to remove" summary line
+# that apt prints before it starts downloading.
+SUMMARY_RE = re.compile(
+    r"^(\d+)\s+upgraded,\s+(\d+)\s+newly installed,\s+(\d+)\s+to remove"
+)
+
+# Package names never contain ':' — strip the ":amd64" multi-arch qualifier.
+_NAME = r"(?P<name>[^\s:]+)(?::[\w-]+)?"
+
+_UNPACK_RE = re.compile(
+    rf"^Unpacking {_NAME} \((?P<new>[^)]+)\)(?: over \((?P<old>[^)]+)\))?"
+)
+# ".../03-libssl3t64_3.0.13-0ubuntu3.4_amd64.deb" — apt numbers batched debs.
+_PREPARE_RE = re.compile(r"^Preparing to unpack \S*/(?:\d+-)?(?P<name>[^/\s_]+)_\S+\.deb")
+_SETUP_RE = re.compile(rf"^Setting up {_NAME} \((?P<new>[^)]+)\)")
+_REMOVE_RE = re.compile(rf"^Removing {_NAME} \((?P<old>[^)]+)\)")
+# "Get:7 http://deb.debian.org/debian bookworm/main amd64 curl amd64 7.88.1-10 [315 kB]".
+# Index downloads ("... bookworm/main amd64 Packages [8786 kB]") have fewer
+# fields and don't match.
+_GET_RE = re.compile(rf"^Get:\d+ \S+ \S+ \S+ {_NAME} \S+ (?P<new>\S+) \[")
+# Simulation (`apt-get -s`) forms.
+_INST_RE = re.compile(rf"^Inst {_NAME}(?: \[(?P<old>[^\]]+)\])?(?: \((?P<new>[^\s)]+))?")
+_REMV_RE = re.compile(rf"^Remv {_NAME}(?: \[(?P<old>[^\]]+)\])?")
+
+UPGRADE = "upgrade"
+INSTALL = "install"
+REMOVE = "remove"
+
+
+@dataclass
+class PackageChange:
+    """One package touched by an apt run."""
+
+    name: str
+    action: str  # UPGRADE, INSTALL, or REMOVE
+    old_version: str | None = None
+    new_version: str | None = None
+    seconds: float | None = None  # unpack → configured; None in simulations
+
+
+class AptOutputParser:
+    """Line consumer that accumulates apt results in a single pass.
+
+    Instances are callable so they can be passed straight to
+    `run_command(line_consumers=[...])`.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.logger = logger
+        self._clock = clock
+        self.summary_seen = False
+        self.upgraded = 0
+        self.installed = 0
+        self.removed = 0
+        self.changes: dict[str, PackageChange] = {}
+        self.downloaded: dict[str, str] = {}  # name -> version fetched
+        self._started: dict[str, float] = {}
+
+    def __call__(self, line: str) -> None:
+        self.feed(line)
+
+    def feed(self, line: str) -> None:
+        """Consume one line of output (without its trailing newline)."""
+        # Cheap first-character dispatch: nearly every line of a big upgrade
+        # is download/progress noise that matches none of the patterns.
+        first = line[:1]
+        if first.isdigit():
+            self._summary(line)
+        elif first == "P":
+            self._prepare(line)
+        elif first == "U":
+            self._unpack(line)
+        elif first == "S":
+            self._setup(line)
+        elif first == "R":
+            self._remove(line, _REMV_RE if line.startswith("Remv ") else _REMOVE_RE)
+        elif first == "I":
+            self._inst(line)
+        elif first == "G":
+            self._get(line)
+
+    # -- per-line handlers -------------------------------------------------
+
+    def _summary(self, line: str) -> None:
+        match = SUMMARY_RE.match(line)
+        if not match:
+            return
+        self.summary_seen = True
+        self.upgraded = int(match.group(1))
+        self.installed = int(match.group(2))
+        self.removed = int(match.group(3))
+        if self.logger:
+            self.logger.info(
+                "apt plan: %d to upgrade, %d to install, %d to remove",
+                self.upgraded,
+                self.installed,
+                self.removed,
+            )
+
+    def _prepare(self, line: str) -> None:
+        match = _PREPARE_RE.match(line)
+        if match:
+            self._started.setdefault(match.group("name"), self._clock())
+
+    def _unpack(self, line: str) -> None:
+        match = _UNPACK_RE.match(line)
+        if not match:
+            return
+        name = match.group("name")
+        self._started.setdefault(name, self._clock())
+        old = match.group("old")
+        self.changes[name] = PackageChange(
+            name=name,
+            action=UPGRADE if old else INSTALL,
+            old_version=old,
+            new_version=match.group("new"),
+        )
+
+    def _setup(self, line: str) -> None:
+        match = _SETUP_RE.match(line)
+        if not match:
+            return
+        name = match.group("name")
+        change = self.changes.get(name)
+        if change is None:
+            # Configured without being unpacked in this run (e.g. a package
+            # left half-configured by an earlier, interrupted run).
+            change = self.changes[name] = PackageChange(name=name, action=UPGRADE)
+        change.new_version = match.group("new")
+        started = self._started.pop(name, None)
+        if started is not None:
+            change.seconds = self._clock() - started
+        if self.logger:
+            self.logger.info(
+                "%s %s %s%s",
+                "Upgraded" if change.action == UPGRADE else "Installed",
+                name,
+                f"{change.old_version} -> {change.new_version}"
+                if change.old_version
+                else change.new_version,
+                f" ({change.seconds:.1f}s)" if change.seconds is not None else "",
+            )
+
+    def _remove(self, line: str, pattern: re.Pattern[str]) -> None:
+        match = pattern.match(line)
+        if not match:
+            return
+        name = match.group("name")
+        self.changes[name] = PackageChange(
+            name=name, action=REMOVE, old_version=match.group("old")
+        )
+        if self.logger:
+            self.logger.info("Removed %s %s", name, match.group("old") or "")
+
+    def _inst(self, line: str) -> None:
+        match = _INST_RE.match(line)
+        if not match:
+            return
+        name = match.group("name")
+        old = match.group("old")
+        self.changes[name] = PackageChange(
+            name=name,
+            action=UPGRADE if old else INSTALL,
+            old_version=old,
+            new_version=match.group("new"),
+        )
+
+    def _get(self, line: str) -> None:
+        match = _GET_RE.match(line)
+        if match:
+            self.downloaded[match.group("name")] = match.group("new")
+
+    # -- results -----------------------------------------------------------
+
+    def changed_names(self) -> list[str]:
+        """Sorted names of packages upgraded or installed (not removed)."""
+        return sorted(n for n, c in self.changes.items() if c.action != REMOVE)
+
+    def changes_by_action(self, action: str) -> list[PackageChange]:
+        return [c for c in self.changes.values() if c.action == action]
@@ -0,0 +1,371 @@
+"""A minimal caching HTTP proxy for apt, so a fleet downloads each .deb once.
+
+One node runs `sysmaint cache-serve`; every other host sets
+[update] apt_proxy = http://<that node>:3142 and apt sends its plain-HTTP
+requests there. The first host to ask for a file pulls it from the mirror;
+the rest get it from the cache.
+
+Design notes:
+- Only apt's own paths are proxied (pool/ packages and dists/ indexes),
+  without query strings. With a mirror allowlist (`--mirror`), only those
+  hosts are fetched from. Without one, only port 80 on public addresses
+  is: loopback, private and link-local targets (cloud metadata services,
+  internal HTTP APIs) get 403, so the cache can't be used as an open
+  proxy into the network it sits in. Upstream redirects are checked the
+  same way before they're followed, and without an allowlist the
+  connection goes to the address that passed the check, not to a second
+  lookup of the name (DNS rebinding).
+- Packages and by-hash indexes are immutable — their names change with
+  their content — so a cached copy is served without asking upstream.
+  Other index files (Release, InRelease, Packages.xz, ...) change in place
+  and are revalidated with If-Modified-Since on every request; if the
+  mirror is unreachable the cached copy is served anyway.
+- Concurrent requests for the same file are coalesced: one fetches from
+  upstream while the others wait on a per-file lock, then read the cache.
+  That's what turns N hosts x one package into one mirror download.
+- Files land via a temp file + rename, so a reader never sees a partial
+  download and a crashed fetch leaves nothing behind.
+- HTTPS repositories are not proxied (apt only uses Acquire::http::Proxy
+  for http:// sources) and keep going direct.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import email.utils
+import http.client
+import ipaddress
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Iterable
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_DIR = Path("/var/cache/sysmaint/apt")
+DEFAULT_PORT = 3142  # apt-cacher-ng's port; clients often already allow it
+_UPSTREAM_TIMEOUT_SEC = 60
+_CHUNK = 1 << 16
+# Cached packages nobody has fetched for this long are pruned at startup.
+DEFAULT_MAX_AGE_DAYS = 30
+
+_IMMUTABLE_SUFFIXES = (".deb", ".udeb", ".dsc")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stale: int = 0
+    bytes_upstream: int = 0
+    bytes_served: int = 0
+
+
+def is_apt_path(path: str) -> bool:
+    """True for the pool/ and dists/ paths an apt mirror serves."""
+    parts = path.split("/")
+    return ("pool" in parts and path.endswith(_IMMUTABLE_SUFFIXES)) or "dists" in parts
+
+
+def refusal(url: str, mirrors: frozenset[str] = frozenset()) -> tuple[int, str] | None:
+    """(HTTP status, reason) if `url` may not be fetched through the cache.
+
+    `mirrors` is the allowlist from mirror_keys(); when empty, only port 80
+    on hosts that resolve to public addresses is allowed.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        return HTTPStatus.BAD_REQUEST, "Only absolute http:// URLs are proxied"
+    if parts.query or parts.fragment:
+        return HTTPStatus.FORBIDDEN, "Query strings are not proxied"
+    if not is_apt_path(parts.path):
+        return HTTPStatus.FORBIDDEN, "Not an apt repository path"
+    try:
+        port = parts.port
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST, "Invalid port"
+    if mirrors:
+        if _mirror_key(parts.hostname, port) not in mirrors:
+            return HTTPStatus.FORBIDDEN, "Not a configured mirror"
+        return None
+    if port not in (None, 80):
+        return HTTPStatus.FORBIDDEN, "Only port 80 is proxied"
+    if not _resolves_public(parts.hostname):
+        return HTTPStatus.FORBIDDEN, "Upstream is not a public address"
+    return None
+
+
+def mirror_keys(mirrors: Iterable[str]) -> frozenset[str]:
+    """Normalize "host" / "host:port" allowlist entries for refusal()."""
+    keys = set()
+    for mirror in mirrors:
+        parts = urlsplit(f"//{mirror.strip()}")
+        if not parts.hostname:
+            raise ValueError(f"invalid mirror {mirror!r}; expected host or host:port")
+        keys.add(_mirror_key(parts.hostname, parts.port))
+    return frozenset(keys)
+
+
+def _mirror_key(hostname: str, port: int | None) -> str:
+    return hostname.lower() if port in (None, 80) else f"{hostname.lower()}:{port}"
+
+
+def _resolves_public(hostname: str) -> bool:
+    """Whether every address `hostname` resolves to is globally routable."""
+    try:
+        _public_address(hostname, 80)
+    except OSError:
+        return False
+    return True
+
+
+def _public_address(hostname: str, port: int) -> str:
+    """One address of `hostname`, provided all of them are globally routable.
+
+    Raises:
+        OSError: If the name doesn't resolve or any address isn't public.
+    """
+    try:
+        infos = socket.getaddrinfo(hostname, port, proto=socket.IPPROTO_TCP)
+    except UnicodeError as exc:
+        raise OSError(f"invalid host name {hostname!r}") from exc
+    addresses = [str(info[4][0]) for info in infos]
+    for address in addresses:
+        if not ipaddress.ip_address(address.partition("%")[0]).is_global:
+            raise OSError(f"{hostname} resolves to non-public address {address}")
+    if not addresses:
+        raise OSError(f"{hostname} has no addresses")
+    return addresses[0]
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    """Connects to the address that passed _public_address(), not a fresh lookup."""
+
+    def connect(self) -> None:
+        address = _public_address(self.host, self.port)
+        self.sock = socket.create_connection((address, self.port), self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req: urllib.request.Request) -> http.client.HTTPResponse:
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows an upstream redirect only to a URL refusal() accepts."""
+
+    def __init__(self, mirrors: frozenset[str]) -> None:
+        self.mirrors = mirrors
+
+    def redirect_request(
+        self,
+        req: urllib.request.Request,
+        fp: Any,
+        code: int,
+        msg: str,
+        headers: Any,
+        newurl: str,
+    ) -> urllib.request.Request | None:
+        refused = refusal(newurl, self.mirrors)
+        if refused is not None:
+            raise urllib.error.HTTPError(
+                req.full_url, HTTPStatus.FORBIDDEN, f"redirect refused: {refused[1]}", headers, fp
+            )
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def is_immutable(path: str) -> bool:
+    """Packages and by-hash indexes never change under the same name."""
+    return path.endswith(_IMMUTABLE_SUFFIXES) or "/by-hash/" in path
+
+
+class AptCache:
+    """The on-disk cache and the fetch/coalesce logic, independent of HTTP serving."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        *,
+        logger: logging.Logger | None = None,
+        timeout: float = _UPSTREAM_TIMEOUT_SEC,
+        mirrors: Iterable[str] = (),
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.mirrors = mirror_keys(mirrors)
+        self.logger = logger or logging.getLogger("sysmaint.cache")
+        self.timeout = timeout
+        self.stats = CacheStats()
+        self._locks: dict[Path, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # The cache must reach the mirror directly, whatever http_proxy says.
+        handlers: list[urllib.request.BaseHandler] = [
+            urllib.request.ProxyHandler({}),
+            _CheckedRedirectHandler(self.mirrors),
+        ]
+        if not self.mirrors:
+            handlers.append(_PublicHTTPHandler())
+        self._opener = urllib.request.build_opener(*handlers)
+
+    def path_for(self, url: str) -> Path:
+        """Cache file for `url`: <cache_dir>/<host>/<path>, never outside cache_dir.
+
+        Raises:
+            ValueError: If `url` has a query string, which the file name
+                couldn't tell apart.
+        """
+        parts = urlsplit(url)
+        if parts.query or parts.fragment:
+            raise ValueError(f"not cacheable (query string): {url}")
+        segments = [s for s in parts.path.split("/") if s not in ("", ".", "..")]
+        return self.cache_dir.joinpath(parts.netloc.replace(":", "_"), *segments)
+
+    def fetch(self, url: str) -> tuple[int, Path | None]:
+        """Make sure `url` is cached; return (HTTP status, cache file or None).
+
+        URLs refusal() rejects are never fetched.
+        """
+        refused = refusal(url, self.mirrors)
+        if refused is not None:
+            return refused[0], None
+        target = self.path_for(url)
+        with self._lock_for(target):
+            if target.is_file() and is_immutable(urlsplit(url).path):
+                self.stats.hits += 1
+                with contextlib.suppress(OSError):
+                    os.utime(target)  # keep recently used packages out of prune()
+                return HTTPStatus.OK, target
+            return self._fetch_upstream(url, target)
+
+    def prune(self, max_age_days: float = DEFAULT_MAX_AGE_DAYS, *, now: float | None = None) -> int:
+        """Delete cached packages not requested in `max_age_days`. Returns count."""
+        cutoff = (time.time() if now is None else now) - max_age_days * 86400
+        removed = 0
+        for path in self.cache_dir.rglob("*"):
+            if path.suffix not in (".deb", ".udeb") or not path.is_file():
+                continue
+            with contextlib.suppress(OSError):
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+    def _lock_for(self, target: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(target, threading.Lock())
+
+    def _fetch_upstream(self, url: str, target: Path) -> tuple[int, Path | None]:
+        request = urllib.request.Request(url, headers={"User-Agent": "sysmaint-cache"})
+        cached = target.is_file()
+        if cached:
+            mtime = target.stat().st_mtime
+            request.add_header("If-Modified-Since", email.utils.formatdate(mtime, usegmt=True))
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                self._store(response, target, keep_mtime=not is_immutable(urlsplit(url).path))
+        except urllib.error.HTTPError as exc:
+            if exc.code == HTTPStatus.NOT_MODIFIED and cached:
+                self.stats.revalidated += 1
+                return HTTPStatus.OK, target
+            if cached and exc.code >= 500:
+                return self._serve_stale(url, target, exc)
+            return exc.code, None
+        except OSError as exc:
+            if cached:
+                return self._serve_stale(url, target, exc)
+            self.logger.warning("Upstream fetch failed for %s: %s", url, exc)
+            return HTTPStatus.BAD_GATEWAY, None
+        self.stats.misses += 1
+        return HTTPStatus.OK, target
+
+    def _serve_stale(self, url: str, target: Path, exc: Exception) -> tuple[int, Path]:
+        self.logger.warning("Upstream unavailable for %s (%s); serving cached copy", url, exc)
+        self.stats.stale += 1
+        return HTTPStatus.OK, target
+
+    def _store(self, response: Any, target: Path, *, keep_mtime: bool) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                while chunk := response.read(_CHUNK):
+                    fh.write(chunk)
+                    self.stats.bytes_upstream += len(chunk)
+            last_modified = response.headers.get("Last-Modified")
+            if keep_mtime and last_modified:
+                # Keep the mirror's timestamp so If-Modified-Since compares like with like.
+                with contextlib.suppress(TypeError, ValueError):
+                    stamp = email.utils.parsedate_to_datetime(last_modified).timestamp()
+                    os.utime(tmp_name, (stamp, stamp))
+            os.replace(tmp_name, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+            raise
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    server: _CacheServer
+    protocol_version = "HTTP/1.1"  # apt pipelines requests over one connection
+
+    def do_GET(self) -> None:
+        self._handle(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._handle(send_body=False)
+
+    def _handle(self, *, send_body: bool) -> None:
+        refused = refusal(self.path, self.server.cache.mirrors)
+        if refused is not None:
+            self.send_error(*refused)
+            return
+
+        status, path = self.server.cache.fetch(self.path)
+        if path is None:
+            self.send_error(status)
+            return
+        try:
+            fh = path.open("rb")
+        except OSError:
+            self.send_error(HTTPStatus.BAD_GATEWAY)
+            return
+        with fh:
+            size = os.fstat(fh.fileno()).st_size
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.send_header(
+                "Last-Modified",
+                email.utils.formatdate(os.fstat(fh.fileno()).st_mtime, usegmt=True),
+            )
+            self.end_headers()
+            if send_body:
+                shutil.copyfileobj(fh, self.wfile, _CHUNK)
+                self.server.cache.stats.bytes_served += size
+
+    def log_message(self, format: str, *args: object) -> None:
+        self.server.cache.logger.debug("%s %s", self.address_string(), format % args)
+
+
+class _CacheServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], cache: AptCache) -> None:
+        super().__init__(address, _ProxyHandler)
+        self.cache = cache
+
+
+def make_server(cache: AptCache, host: str = "0.0.0.0", port: int = DEFAULT_PORT) -> _CacheServer:
+    """Bind the proxy (port 0 picks a free port); call serve_forever() to run it."""
+    return _CacheServer((host, port), cache)
@@ -15,6 +15,17 @@ from pathlib import Path
 
 DEFAULT_CONFIG_PATH = Path("/etc/sysmaint/sysmaint.conf")
 DEFAULT_PASSWORD_PATH = Path("/etc/sysmaint/smtp_password")
+NOTIFY_MODES = ("email", "digest")
+DELIVERY_MODES = ("direct", "queued")
+# Defaults for the digest, metrics and system modules. They live here so
+# loading the config, which every command does, doesn't import those.
+DEFAULT_DIGEST_DIR = Path("/var/spool/sysmaint/digest")
+# Debian/Ubuntu prometheus-node-exporter's --collector.textfile.directory.
+DEFAULT_METRICS_FILE = Path("/var/lib/prometheus/node-exporter/sysmaint.prom")
+# How unit state is queried: "auto" asks systemd over the D-Bus system bus
+# and falls back to forking `systemctl` if the bus can't be used;
+# "systemctl" always forks.
+SYSTEMD_BACKENDS = ("auto", "systemctl")
 
 
 class ConfigError(Exception):
@@ -28,6 +39,7 @@ class EmailConfig:
     smtp_server: str
     smtp_port: int
     password: str
+    delivery: str = "direct"  # "direct" (send now, queue on failure) or "queued"
 
 
 @dataclass(frozen=True)
@@ -36,18 +48,27 @@ class UpdateConfig:
     reboot_window_start: str  # "HH:MM"
     reboot_window_end: str
     include_dist_upgrade: bool
+    skip_if_unchanged: bool = True  # skip upgrade steps when nothing is pending
+    apt_proxy: str = ""  # http://host:port of a `sysmaint cache-serve` node, or ""
+    batch_size: int = 0  # packages per apt transaction; 0 = one transaction
+    batch_deadline_min: int = 0  # start no batch after this long into the run; 0 = none
 
 
 @dataclass(frozen=True)
 class NotifyConfig:
     on_success: bool
     on_no_changes: bool
+    mode: str = "email"  # "email" (one per run) or "digest" (spool for the collector)
+    digest_dir: Path = DEFAULT_DIGEST_DIR
 
 
 @dataclass(frozen=True)
 class MonitorConfig:
     disk_threshold_percent: int
     services: tuple[str, ...]
+    systemd_backend: str = "auto"  # "auto" (D-Bus, falling back) or "systemctl"
+    # node_exporter textfile written after each update; None disables it.
+    metrics_file: Path | None = DEFAULT_METRICS_FILE
 
 
 @dataclass(frozen=True)
@@ -99,6 +120,11 @@ def load_config(
 
     smtp_server = email_section.get("smtp_server", "smtp.gmail.com").strip()
     smtp_port = email_section.getint("smtp_port", 587)
+    delivery = email_section.get("delivery", "direct").strip().lower()
+    if delivery not in DELIVERY_MODES:
+        raise ConfigError(
+            f"[email] delivery must be one of {', '.join(DELIVERY_MODES)}, got {delivery!r}"
+        )
 
     pw_path = Path(
         password_path
@@ -113,6 +139,7 @@ def load_config(
         smtp_server=smtp_server,
         smtp_port=smtp_port,
         password=password,
+        delivery=delivery,
     )
 
     # Optional sections — use defaults if absent.
@@ -151,11 +178,22 @@ def _load_update_section(parser: configparser.ConfigParser) -> UpdateConfig:
             include_dist_upgrade=True,
         )
     section = parser["update"]
+    apt_proxy = section.get("apt_proxy", "").strip()
+    if apt_proxy and not apt_proxy.startswith("http://"):
+        raise ConfigError(f"[update] apt_proxy must be an http:// URL, got {apt_proxy!r}")
+    batch_size = section.getint("batch_size", 0)
+    batch_deadline_min = section.getint("batch_deadline_min", 0)
+    if batch_size < 0 or batch_deadline_min < 0:
+        raise ConfigError("[update] batch_size and batch_deadline_min must not be negative")
     return UpdateConfig(
         auto_reboot=section.getboolean("auto_reboot", False),
         reboot_window_start=section.get("reboot_window_start", "03:00").strip(),
         reboot_window_end=section.get("reboot_window_end", "05:00").strip(),
         include_dist_upgrade=section.getboolean("include_dist_upgrade", True),
+        skip_if_unchanged=section.getboolean("skip_if_unchanged", True),
+        apt_proxy=apt_proxy,
+        batch_size=batch_size,
+        batch_deadline_min=batch_deadline_min,
     )
 
 
@@ -163,9 +201,16 @@ def _load_notify_section(parser: configparser.ConfigParser) -> NotifyConfig:
     if "notify" not in parser:
         return NotifyConfig(on_success=True, on_no_changes=False)
     section = parser["notify"]
+    mode = section.get("mode", "email").strip().lower()
+    if mode not in NOTIFY_MODES:
+        raise ConfigError(
+            f"[notify] mode must be one of {', '.join(NOTIFY_MODES)}, got {mode!r}"
+        )
     return NotifyConfig(
         on_success=section.getboolean("on_success", True),
         on_no_changes=section.getboolean("on_no_changes", False),
+        mode=mode,
+        digest_dir=Path(section.get("digest_dir", str(DEFAULT_DIGEST_DIR)).strip()),
     )
 
 
@@ -183,9 +228,18 @@ def _load_monitor_section(parser: configparser.ConfigParser) -> MonitorConfig:
         )
     services_raw = section.get("services", "sshd,postfix")
     services = tuple(s.strip() for s in services_raw.split(",") if s.strip())
+    backend = section.get("systemd_backend", "auto").strip().lower()
+    if backend not in SYSTEMD_BACKENDS:
+        raise ConfigError(
+            f"[monitor] systemd_backend must be one of {', '.join(SYSTEMD_BACKENDS)}, "
+            f"got {backend!r}"
+        )
+    metrics_raw = section.get("metrics_file", str(DEFAULT_METRICS_FILE)).strip()
     return MonitorConfig(
         disk_threshold_percent=threshold,
         services=services,
+        systemd_backend=backend,
+        metrics_file=Path(metrics_raw) if metrics_raw else None,
     )
 
 
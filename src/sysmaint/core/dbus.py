@@ -0,0 +1,459 @@
+"""Minimal D-Bus client over a Unix socket — standard library only.
+
+Just enough of the wire protocol to ask systemd questions without forking
+`systemctl`: SASL EXTERNAL authentication, method calls, and the
+marshalling rules for the basic and container types. Calls can be
+pipelined with `call_many()`, so asking about thirty units costs one
+write and one round trip on an already-open socket.
+
+Reference: https://dbus.freedesktop.org/doc/dbus-specification.html
+
+Values map to Python as: integers/bools/doubles → int/bool/float,
+strings/object paths/signatures → str, arrays → list, dicts → dict,
+structs → tuple. Variants are written as `(signature, value)` pairs and
+unwrapped to the bare value when read.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import struct
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+SYSTEM_BUS_ADDRESS = "unix:path=/run/dbus/system_bus_socket"
+
+METHOD_CALL = 1
+METHOD_RETURN = 2
+ERROR = 3
+SIGNAL = 4
+
+# Header field codes.
+FIELD_PATH = 1
+FIELD_INTERFACE = 2
+FIELD_MEMBER = 3
+FIELD_ERROR_NAME = 4
+FIELD_REPLY_SERIAL = 5
+FIELD_DESTINATION = 6
+FIELD_SENDER = 7
+FIELD_SIGNATURE = 8
+
+_FIELD_TYPES = {
+    FIELD_PATH: "o",
+    FIELD_INTERFACE: "s",
+    FIELD_MEMBER: "s",
+    FIELD_ERROR_NAME: "s",
+    FIELD_REPLY_SERIAL: "u",
+    FIELD_DESTINATION: "s",
+    FIELD_SENDER: "s",
+    FIELD_SIGNATURE: "g",
+}
+
+# Fixed-size types: struct format char and alignment (== size).
+_FIXED = {
+    "y": ("B", 1),
+    "b": ("I", 4),
+    "n": ("h", 2),
+    "q": ("H", 2),
+    "i": ("i", 4),
+    "u": ("I", 4),
+    "x": ("q", 8),
+    "t": ("Q", 8),
+    "d": ("d", 8),
+    "h": ("I", 4),
+}
+_ALIGNMENT = {"s": 4, "o": 4, "g": 1, "v": 1, "a": 4, "(": 8, "{": 8}
+
+_DEFAULT_TIMEOUT = 5.0
+_MAX_MESSAGE = 128 * 1024 * 1024  # spec limit
+
+
+class DBusError(Exception):
+    """An error reply from the bus, or a protocol/authentication failure."""
+
+    def __init__(self, name: str, message: str = "") -> None:
+        super().__init__(f"{name}: {message}" if message else name)
+        self.name = name
+        self.message = message
+
+
+# -- signatures ------------------------------------------------------------
+
+
+def _type_end(sig: str, i: int) -> int:
+    """Index just past the complete type starting at sig[i]."""
+    try:
+        c = sig[i]
+        if c == "a":
+            return _type_end(sig, i + 1)
+        if c in "({":
+            close = ")" if c == "(" else "}"
+            j = i + 1
+            while sig[j] != close:
+                j = _type_end(sig, j)
+            return j + 1
+    except IndexError:
+        raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", sig) from None
+    return i + 1
+
+
+def split_signature(sig: str) -> list[str]:
+    """Split a signature into its complete types: "sa{sv}u" → ["s", "a{sv}", "u"]."""
+    types: list[str] = []
+    i = 0
+    while i < len(sig):
+        end = _type_end(sig, i)
+        types.append(sig[i:end])
+        i = end
+    return types
+
+
+def _alignment(sig: str) -> int:
+    c = sig[0]
+    return _FIXED[c][1] if c in _FIXED else _ALIGNMENT[c]
+
+
+# -- marshalling -----------------------------------------------------------
+
+
+class _Writer:
+    __slots__ = ("buf",)
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+
+    def align(self, n: int) -> None:
+        self.buf.extend(b"\0" * (-len(self.buf) % n))
+
+    def write(self, sig: str, value: Any) -> None:
+        """Append one value of complete type `sig`."""
+        c = sig[0]
+        if c in _FIXED:
+            fmt, size = _FIXED[c]
+            self.align(size)
+            self.buf.extend(struct.pack("<" + fmt, value))
+        elif c in "so":
+            data = value.encode()
+            self.align(4)
+            self.buf.extend(struct.pack("<I", len(data)) + data + b"\0")
+        elif c == "g":
+            data = value.encode()
+            self.buf.extend(struct.pack("<B", len(data)) + data + b"\0")
+        elif c == "v":
+            inner_sig, inner = value
+            self.write("g", inner_sig)
+            self.write(inner_sig, inner)
+        elif c == "a":
+            elem = sig[1:]
+            self.align(4)
+            length_at = len(self.buf)
+            self.buf.extend(b"\0\0\0\0")
+            self.align(_alignment(elem))
+            start = len(self.buf)
+            items = value.items() if elem[0] == "{" else value
+            for item in items:
+                self.write(elem, item)
+            struct.pack_into("<I", self.buf, length_at, len(self.buf) - start)
+        elif c in "({":
+            self.align(8)
+            for member_sig, member in zip(split_signature(sig[1:-1]), value, strict=True):
+                self.write(member_sig, member)
+        else:
+            raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", sig)
+
+
+class _Reader:
+    __slots__ = ("data", "endian", "pos")
+
+    def __init__(self, data: bytes, pos: int = 0, *, endian: str = "<") -> None:
+        self.data = data
+        self.pos = pos
+        self.endian = endian
+
+    def align(self, n: int) -> None:
+        self.pos += -self.pos % n
+
+    def read(self, sig: str) -> Any:
+        """Read one value of complete type `sig`."""
+        c = sig[0]
+        if c in _FIXED:
+            fmt, size = _FIXED[c]
+            self.align(size)
+            (value,) = struct.unpack_from(self.endian + fmt, self.data, self.pos)
+            self.pos += size
+            return bool(value) if c == "b" else value
+        if c in "so":
+            length = self.read("u")
+            text = self.data[self.pos : self.pos + length].decode(errors="replace")
+            self.pos += length + 1
+            return text
+        if c == "g":
+            length = self.data[self.pos]
+            text = self.data[self.pos + 1 : self.pos + 1 + length].decode()
+            self.pos += length + 2
+            return text
+        if c == "v":
+            return self.read(self.read("g"))
+        if c == "a":
+            elem = sig[1:]
+            length = self.read("u")
+            self.align(_alignment(elem))
+            end = self.pos + length
+            if elem[0] == "{":
+                result: dict[Any, Any] = {}
+                while self.pos < end:
+                    key, val = self.read(elem)
+                    result[key] = val
+                return result
+            items = []
+            while self.pos < end:
+                items.append(self.read(elem))
+            return items
+        if c in "({":
+            self.align(8)
+            return tuple(self.read(member) for member in split_signature(sig[1:-1]))
+        raise DBusError("org.freedesktop.DBus.Error.InvalidSignature", sig)
+
+
+# -- messages --------------------------------------------------------------
+
+
+@dataclass
+class Message:
+    """A decoded D-Bus message. `fields` maps header field codes to values."""
+
+    type: int
+    serial: int
+    fields: dict[int, Any] = field(default_factory=dict)
+    body: list[Any] = field(default_factory=list)
+    flags: int = 0
+
+    @property
+    def signature(self) -> str:
+        return str(self.fields.get(FIELD_SIGNATURE, ""))
+
+
+def encode_message(
+    msg_type: int,
+    serial: int,
+    fields: dict[int, Any],
+    signature: str = "",
+    body: Sequence[Any] = (),
+    *,
+    flags: int = 0,
+) -> bytes:
+    """Serialize a message (always little-endian)."""
+    body_writer = _Writer()
+    for member_sig, value in zip(split_signature(signature), body, strict=True):
+        body_writer.write(member_sig, value)
+    all_fields = dict(fields)
+    if signature:
+        all_fields[FIELD_SIGNATURE] = signature
+
+    header = _Writer()
+    header.write("y", ord("l"))
+    header.write("y", msg_type)
+    header.write("y", flags)
+    header.write("y", 1)  # protocol version
+    header.write("u", len(body_writer.buf))
+    header.write("u", serial)
+    header.write(
+        "a(yv)",
+        [(code, (_FIELD_TYPES[code], value)) for code, value in sorted(all_fields.items())],
+    )
+    header.align(8)
+    return bytes(header.buf + body_writer.buf)
+
+
+def message_length(prefix: bytes) -> int:
+    """Total message size given at least its first 16 bytes."""
+    endian = "<" if prefix[0:1] == b"l" else ">"
+    body_len, _serial, fields_len = struct.unpack_from(endian + "III", prefix, 4)
+    header_len = 16 + fields_len
+    header_len += -header_len % 8
+    total = header_len + body_len
+    if total > _MAX_MESSAGE:
+        raise DBusError("org.freedesktop.DBus.Error.LimitsExceeded", f"{total} byte message")
+    return int(total)
+
+
+def decode_message(data: bytes) -> Message:
+    """Parse one complete message (as sized by message_length())."""
+    try:
+        return _decode_message(data)
+    except (struct.error, IndexError, KeyError, ValueError) as exc:
+        raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", f"malformed message: {exc}") from exc
+
+
+def _decode_message(data: bytes) -> Message:
+    if data[0:1] not in (b"l", b"B"):
+        raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "bad endianness marker")
+    if len(data) != message_length(data):
+        raise DBusError("org.freedesktop.DBus.Error.InvalidArgs", "truncated message")
+    endian = "<" if data[0:1] == b"l" else ">"
+    msg_type, flags = data[1], data[2]
+    reader = _Reader(data, 4, endian=endian)
+    reader.read("u")  # body length — implied by message_length()
+    serial = reader.read("u")
+    raw_fields = reader.read("a(yv)")
+    reader.align(8)
+    fields = {code: value for code, value in raw_fields}
+    signature = str(fields.get(FIELD_SIGNATURE, ""))
+    body = [reader.read(member) for member in split_signature(signature)]
+    return Message(type=msg_type, serial=serial, fields=fields, body=body, flags=flags)
+
+
+# -- connection ------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class MethodCall:
+    destination: str
+    path: str
+    interface: str
+    member: str
+    signature: str = ""
+    args: tuple[Any, ...] = ()
+
+
+def socket_address(address: str) -> str:
+    """Turn a D-Bus server address into something `socket.connect` accepts.
+
+    Only `unix:path=` and `unix:abstract=` transports are supported; the
+    first usable entry of a `;`-separated list wins.
+    """
+    for entry in address.split(";"):
+        transport, _, params = entry.partition(":")
+        if transport != "unix":
+            continue
+        options = dict(p.partition("=")[::2] for p in params.split(",") if p)
+        if "path" in options:
+            return options["path"]
+        if "abstract" in options:
+            return "\0" + options["abstract"]
+    raise DBusError("org.freedesktop.DBus.Error.BadAddress", address)
+
+
+def system_bus_address() -> str:
+    return os.environ.get("DBUS_SYSTEM_BUS_ADDRESS", SYSTEM_BUS_ADDRESS)
+
+
+class DBusConnection:
+    """An authenticated connection to a message bus.
+
+    Raises OSError if the socket can't be reached and DBusError if the bus
+    refuses authentication or sends something unparseable.
+    """
+
+    def __init__(self, address: str | None = None, *, timeout: float = _DEFAULT_TIMEOUT) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._buf = b""
+        self._serial = 0
+        try:
+            self._sock.connect(socket_address(address or system_bus_address()))
+            self._authenticate()
+            (self.unique_name,) = self.call(
+                MethodCall(
+                    "org.freedesktop.DBus",
+                    "/org/freedesktop/DBus",
+                    "org.freedesktop.DBus",
+                    "Hello",
+                )
+            )
+        except BaseException:
+            self._sock.close()
+            raise
+
+    def __enter__(self) -> DBusConnection:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def _authenticate(self) -> None:
+        uid_hex = str(os.getuid()).encode().hex()
+        self._sock.sendall(b"\0AUTH EXTERNAL " + uid_hex.encode() + b"\r\n")
+        reply = self._read_line()
+        if not reply.startswith(b"OK "):
+            raise DBusError(
+                "org.freedesktop.DBus.Error.AuthFailed",
+                reply.decode(errors="replace").strip(),
+            )
+        self._sock.sendall(b"BEGIN\r\n")
+
+    def _read_line(self) -> bytes:
+        while b"\r\n" not in self._buf:
+            self._fill()
+        line, _, self._buf = self._buf.partition(b"\r\n")
+        return line
+
+    def _fill(self) -> None:
+        chunk = self._sock.recv(65536)
+        if not chunk:
+            raise DBusError("org.freedesktop.DBus.Error.Disconnected", "bus closed the connection")
+        self._buf += chunk
+
+    def _read_message(self) -> Message:
+        while len(self._buf) < 16:
+            self._fill()
+        total = message_length(self._buf)
+        while len(self._buf) < total:
+            self._fill()
+        data, self._buf = self._buf[:total], self._buf[total:]
+        return decode_message(data)
+
+    def call_many(self, calls: Sequence[MethodCall]) -> list[list[Any] | DBusError]:
+        """Send every call before reading any reply; results keep call order.
+
+        A call that gets an error reply yields a DBusError in its slot
+        rather than raising, so one missing object doesn't sink the batch.
+        """
+        pending: dict[int, int] = {}
+        payload = bytearray()
+        for index, call in enumerate(calls):
+            self._serial += 1
+            pending[self._serial] = index
+            payload += encode_message(
+                METHOD_CALL,
+                self._serial,
+                {
+                    FIELD_PATH: call.path,
+                    FIELD_INTERFACE: call.interface,
+                    FIELD_MEMBER: call.member,
+                    FIELD_DESTINATION: call.destination,
+                },
+                call.signature,
+                call.args,
+            )
+        self._sock.sendall(payload)
+
+        results: list[list[Any] | DBusError | None] = [None] * len(calls)
+        while pending:
+            msg = self._read_message()
+            if msg.type not in (METHOD_RETURN, ERROR):
+                continue  # signals (e.g. NameAcquired) aren't ours to handle
+            index_or_none = pending.pop(msg.fields.get(FIELD_REPLY_SERIAL, -1), None)
+            if index_or_none is None:
+                continue
+            if msg.type == ERROR:
+                detail = msg.body[0] if msg.body and isinstance(msg.body[0], str) else ""
+                results[index_or_none] = DBusError(
+                    str(msg.fields.get(FIELD_ERROR_NAME, "org.freedesktop.DBus.Error.Failed")),
+                    detail,
+                )
+            else:
+                results[index_or_none] = msg.body
+        return [r for r in results if r is not None]
+
+    def call(self, call: MethodCall) -> list[Any]:
+        """Make one call and return its reply body. Raises DBusError on error replies."""
+        (result,) = self.call_many([call])
+        if isinstance(result, DBusError):
+            raise result
+        return result
@@ -0,0 +1,133 @@
+"""Debian version ordering, as `dpkg --compare-versions` does it.
+
+A version is [epoch:]upstream[-revision]. Epochs compare as integers;
+upstream and revision compare by dpkg's verrevcmp: alternating runs of
+non-digits (character by character, letters before other characters,
+"~" before everything including the end of the string) and digits
+(numerically).
+
+Design notes:
+- Planning an upgrade compares thousands of (installed, candidate)
+  pairs, and the same versions recur across suites. Rather than walk two
+  strings per comparison, sort_key() turns a version into a tuple that
+  orders exactly as dpkg does, once per distinct version (memoized), and
+  compare() / compare_many() compare tuples in C.
+- In a key each non-digit run becomes its characters' weights plus a 0
+  terminator, and each digit run its integer value. The runs alternate,
+  so tuples and ints never meet in the same position; a trailing (0,)
+  stands for the end of the string, which sorts after "~" and before
+  everything else, just like dpkg's end-of-string weight.
+- _verrevcmp() is the character-walking port of dpkg's C, kept as the
+  reference the tests check sort_key() against.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from collections.abc import Iterable
+
+_DIGITS = frozenset("0123456789")
+_RUNS = re.compile(r"([^0-9]*)([0-9]*)")
+# A part that is empty or all zeros still has one (non-digits, digits) pair,
+# so "" and "0" get equal keys.
+_EMPTY_PAIR = ((0,), 0)
+_END = (0,)
+
+VersionKey = tuple[int, tuple[object, ...], tuple[object, ...]]
+
+
+def split(version: str) -> tuple[int, str, str]:
+    """(epoch, upstream, revision); a missing epoch is 0, a missing revision "".
+
+    Raises:
+        ValueError: If the epoch isn't a non-negative integer.
+    """
+    epoch_text, colon, rest = version.partition(":")
+    if not colon:
+        epoch_text, rest = "0", version
+    if not epoch_text.isdigit():
+        raise ValueError(f"invalid epoch in version {version!r}")
+    upstream, hyphen, revision = rest.rpartition("-")
+    if not hyphen:
+        upstream, revision = rest, ""
+    return int(epoch_text), upstream, revision
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def sort_key(version: str) -> VersionKey:
+    """A key ordering versions exactly as dpkg does: sorted(v, key=sort_key).
+
+    Raises:
+        ValueError: If the epoch isn't a non-negative integer.
+    """
+    epoch, upstream, revision = split(version)
+    return epoch, _part_key(upstream), _part_key(revision)
+
+
+def compare(a: str, b: str) -> int:
+    """-1, 0 or 1 as `a` sorts before, equal to or after `b`."""
+    key_a, key_b = sort_key(a), sort_key(b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def compare_many(pairs: Iterable[tuple[str, str]]) -> list[int]:
+    """compare(a, b) for each (a, b), e.g. every (installed, candidate) pair."""
+    key = sort_key
+    return [(ka > kb) - (ka < kb) for ka, kb in ((key(a), key(b)) for a, b in pairs)]
+
+
+def _part_key(part: str) -> tuple[object, ...]:
+    run_key = _run_key
+    key = [
+        item
+        for nondigits, digits in _RUNS.findall(part)
+        if nondigits or digits
+        for item in (run_key(nondigits), int(digits or 0))
+    ]
+    return (*(key or _EMPTY_PAIR), _END)
+
+
+@functools.lru_cache(maxsize=1024)
+def _run_key(nondigits: str) -> tuple[int, ...]:
+    # Runs repeat endlessly across versions: ".", "-", "+deb", "~rc", "ubuntu".
+    return (*map(_weight, nondigits), 0)
+
+
+def _weight(char: str) -> int:
+    """dpkg's order() for a non-digit character."""
+    if char.isascii() and char.isalpha():
+        return ord(char)
+    if char == "~":
+        return -1
+    return ord(char) + 256
+
+
+def _verrevcmp(a: str, b: str) -> int:
+    """dpkg's verrevcmp(), index for index (the reference for sort_key)."""
+    i = j = 0
+    while i < len(a) or j < len(b):
+        while (i < len(a) and a[i] not in _DIGITS) or (j < len(b) and b[j] not in _DIGITS):
+            ac = _weight(a[i]) if i < len(a) and a[i] not in _DIGITS else 0
+            bc = _weight(b[j]) if j < len(b) and b[j] not in _DIGITS else 0
+            if ac != bc:
+                return -1 if ac < bc else 1
+            i += 1
+            j += 1
+        while i < len(a) and a[i] == "0":
+            i += 1
+        while j < len(b) and b[j] == "0":
+            j += 1
+        first_diff = 0
+        while i < len(a) and a[i] in _DIGITS and j < len(b) and b[j] in _DIGITS:
+            if not first_diff and a[i] != b[j]:
+                first_diff = -1 if a[i] < b[j] else 1
+            i += 1
+            j += 1
+        if i < len(a) and a[i] in _DIGITS:
+            return 1
+        if j < len(b) and b[j] in _DIGITS:
+            return -1
+        if first_diff:
+            return first_diff
+    return 0
@@ -0,0 +1,236 @@
+"""Fleet digest: per-host run records in a spool, merged into one email.
+
+In `[notify] mode = digest` a host doesn't email after its weekly run.
+It writes a `HostRecord` — the facts the summary email would have shown —
+as JSON to a spool directory (local, or a share every host can write).
+`sysmaint digest send` on a collector box reads every record, renders one
+email with a row per host (failures first), sends it, and removes the
+records it sent.
+
+Design notes:
+- One file per host (`<hostname>.json`), replaced on each run, so the
+  spool holds each host's latest state and never grows past fleet size.
+- Records are written atomically (see core.state), so the collector never
+  reads a half-written file from a host that is mid-write.
+- The collector first claims the records by renaming them into a
+  `sending/` subdirectory, then reads, sends and deletes only those. A
+  host that rewrites its record while the email is being sent writes a
+  new `<hostname>.json` in the spool, which waits for the next digest.
+- Records that weren't sent (a failed send, `--keep`) are linked back
+  into the spool, unless the host has written a newer one meanwhile.
+  Records left in `sending/` by a crashed collector are sent next time.
+- Unreadable or foreign-version records are reported and left in place.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import datetime as dt
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sysmaint.core import state
+
+if TYPE_CHECKING:
+    import logging
+
+SENDING_DIR = "sending"  # under the spool: records a collector has claimed
+RECORD_VERSION = 1
+
+# Row status, in the order the digest lists them.
+FAILED = "FAILED"
+REBOOT = "REBOOT"
+UPDATED = "updated"
+NO_CHANGES = "no changes"
+_STATUS_ORDER = {FAILED: 0, REBOOT: 1, UPDATED: 2, NO_CHANGES: 3}
+
+
+@dataclass(frozen=True)
+class FailedCommand:
+    command: str
+    returncode: int
+    stderr: str = ""  # last few hundred characters
+
+
+@dataclass(frozen=True)
+class HostRecord:
+    """One host's weekly run, as stored in the digest spool."""
+
+    host: str
+    fqdn: str
+    finished: str  # ISO-8601, local time of the host
+    duration: float
+    upgraded: int = 0
+    installed: int = 0
+    removed: int = 0
+    packages: tuple[str, ...] = ()
+    failed_commands: tuple[FailedCommand, ...] = ()
+    reboot_required: bool = False
+    reboot_packages: tuple[str, ...] = ()
+    disks_over: tuple[str, ...] = ()  # "mount NN%"
+    services_down: tuple[str, ...] = ()
+    version: int = field(default=RECORD_VERSION)
+
+    @property
+    def status(self) -> str:
+        if self.failed_commands:
+            return FAILED
+        if self.reboot_required:
+            return REBOOT
+        if self.upgraded or self.installed or self.removed:
+            return UPDATED
+        return NO_CHANGES
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> HostRecord:
+        if data.get("version") != RECORD_VERSION:
+            raise ValueError(f"unsupported record version {data.get('version')!r}")
+        return cls(
+            host=str(data["host"]),
+            fqdn=str(data.get("fqdn", data["host"])),
+            finished=str(data["finished"]),
+            duration=float(data.get("duration", 0.0)),
+            upgraded=int(data.get("upgraded", 0)),
+            installed=int(data.get("installed", 0)),
+            removed=int(data.get("removed", 0)),
+            packages=tuple(data.get("packages", ())),
+            failed_commands=tuple(FailedCommand(**c) for c in data.get("failed_commands", ())),
+            reboot_required=bool(data.get("reboot_required", False)),
+            reboot_packages=tuple(data.get("reboot_packages", ())),
+            disks_over=tuple(data.get("disks_over", ())),
+            services_down=tuple(data.get("services_down", ())),
+        )
+
+
+def spool_record(spool_dir: Path | str, record: HostRecord) -> Path:
+    """Write (or replace) this host's record in the spool."""
+    return state.write_json(Path(spool_dir) / f"{record.host}.json", record.to_dict())
+
+
+def load_records(
+    spool_dir: Path | str, logger: logging.Logger | None = None
+) -> tuple[list[HostRecord], list[Path]]:
+    """Read every record in the spool.
+
+    Returns (records, paths) where `paths` are the files that parsed — the
+    ones the caller should remove once the digest has been delivered.
+    """
+    records: list[HostRecord] = []
+    paths: list[Path] = []
+    spool = Path(spool_dir)
+    if not spool.is_dir():
+        return records, paths
+    for path in sorted(spool.glob("*.json")):
+        try:
+            records.append(HostRecord.from_dict(state.read_json(path)))
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            if logger:
+                logger.warning("Skipping unreadable digest record %s: %s", path, exc)
+            continue
+        paths.append(path)
+    return records, paths
+
+
+def claim_records(
+    spool_dir: Path | str, logger: logging.Logger | None = None
+) -> tuple[list[HostRecord], list[Path]]:
+    """Move the spool's records into SENDING_DIR and read them (see load_records).
+
+    The returned paths are in SENDING_DIR: delete them once the digest is
+    delivered, or hand them to release_records() if it wasn't.
+
+    Raises:
+        OSError: If SENDING_DIR can't be created.
+    """
+    spool = Path(spool_dir)
+    if not spool.is_dir():
+        return [], []
+    sending = spool / SENDING_DIR
+    sending.mkdir(exist_ok=True)
+    for path in spool.glob("*.json"):
+        # Replaces a copy an earlier, failed collector left: this one is newer.
+        with contextlib.suppress(FileNotFoundError):
+            os.replace(path, sending / path.name)
+    records, paths = load_records(sending, logger)
+    unreadable = set(sending.glob("*.json")) - set(paths)
+    release_records(sorted(unreadable), spool)
+    return records, paths
+
+
+def release_records(paths: list[Path], spool_dir: Path | str) -> None:
+    """Return claimed records to the spool, unless their host has written a
+    newer record since they were claimed."""
+    for path in paths:
+        target = Path(spool_dir) / path.name
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            pass  # the host's newer record wins
+        except OSError:
+            # No hard links on this filesystem (some network shares).
+            if not target.exists():
+                os.replace(path, target)
+                continue
+        path.unlink(missing_ok=True)
+
+
+def render_digest(
+    records: list[HostRecord], *, now: dt.datetime | None = None
+) -> tuple[str, str]:
+    """Build (subject, body) for the fleet digest email."""
+    rows = sorted(records, key=lambda r: (_STATUS_ORDER[r.status], r.host))
+    counts = {s: sum(1 for r in rows if r.status == s) for s in _STATUS_ORDER}
+
+    parts = [f"{len(rows)} hosts"]
+    if counts[FAILED]:
+        parts.append(f"{counts[FAILED]} FAILED")
+    if counts[REBOOT]:
+        parts.append(f"{counts[REBOOT]} REBOOT REQUIRED")
+    parts.append(f"{sum(r.upgraded for r in rows)} upgraded")
+    subject = "sysmaint fleet digest: " + ", ".join(parts)
+
+    width = max((len(r.host) for r in rows), default=4)
+    lines = [
+        "=== sysmaint fleet digest ===",
+        f"Generated: {(now or dt.datetime.now()).isoformat(timespec='seconds')}",
+        "Hosts:     "
+        + "   ".join(f"{status}: {counts[status]}" for status in _STATUS_ORDER),
+        "",
+        "--- Hosts ---",
+    ]
+    if not rows:
+        lines.append("  (no host records in the spool — did the weekly timers run?)")
+    for r in rows:
+        lines.append(
+            f"  [{r.status:10s}] {r.host:{width}s}  {r.upgraded:3d} up {r.installed:3d} new "
+            f"{r.removed:3d} rm  {r.duration:5.0f}s  {r.finished}"
+        )
+
+    # Per-host detail only where there's something to act on.
+    details: list[str] = []
+    for r in rows:
+        notes = [
+            f"FAIL exit={c.returncode}: {c.command}"
+            + (f"\n        {c.stderr.strip()[:400]}" if c.stderr.strip() else "")
+            for c in r.failed_commands
+        ]
+        if r.reboot_required:
+            notes.append(
+                "reboot required"
+                + (f" ({', '.join(r.reboot_packages)})" if r.reboot_packages else "")
+            )
+        notes.extend(f"disk {d}" for d in r.disks_over)
+        notes.extend(f"service down: {s}" for s in r.services_down)
+        if notes:
+            details.append(f"  {r.host}:")
+            details.extend(f"    - {note}" for note in notes)
+    if details:
+        lines += ["", "--- Attention ---", *details]
+
+    lines += ["", "Per-host logs: /var/log/sysmaint.log on each host"]
+    return subject, "\n".join(lines)
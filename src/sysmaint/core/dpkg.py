@@ -0,0 +1,148 @@
+"""What dpkg has installed, read straight from /var/lib/dpkg/status.
+
+dpkg's status file is the authority on installed packages: one RFC 822
+style stanza per package, with its state and version. Snapshotting it
+before and after the upgrade steps and diffing the two gives the exact
+packages upgraded, installed and removed — including what autoremove took
+out — without trusting apt's console output, whose wording changes between
+releases and follows the locale.
+
+Design notes:
+- The file is mmapped and scanned by one line-anchored regex for the few
+  fields needed. Description and Conffiles bodies, most of the file, are
+  continuation lines starting with whitespace; the regex steps over them
+  without splitting or copying stanzas.
+- dpkg writes Package first in every stanza, so each Package line closes
+  the stanza before it. apt's Packages indexes share the format, and
+  apt_index.py reads them with the same mapped()/stanzas() helpers.
+- Packages in the "not-installed" or "config-files" state (removed, with
+  conffiles left behind) count as absent.
+- Multi-Arch: same packages can be installed once per architecture and are
+  keyed "name:arch", as `dpkg -l` shows them; the rest by plain name.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import mmap
+import re
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from sysmaint.core.apt_output import INSTALL, REMOVE, UPGRADE, PackageChange
+
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+
+_ABSENT_STATES = frozenset({"not-installed", "config-files"})
+
+
+@dataclass(frozen=True, slots=True)
+class InstalledPackage:
+    name: str
+    version: str
+    architecture: str
+    state: str  # dpkg's package state: "installed", "half-configured", ...
+    multi_arch: str = ""
+    want: str = "install"  # "hold" after `apt-mark hold`
+
+    @property
+    def key(self) -> str:
+        """Index key: "name:arch" for Multi-Arch: same packages, else the name."""
+        return f"{self.name}:{self.architecture}" if self.multi_arch == "same" else self.name
+
+
+def read_status(path: Path = DPKG_STATUS) -> dict[str, InstalledPackage]:
+    """Installed packages by key (see InstalledPackage.key).
+
+    Raises:
+        OSError: If the file can't be read.
+    """
+    with mapped(path) as data:
+        return parse_status(data)
+
+
+def parse_status(data: bytes | mmap.mmap) -> dict[str, InstalledPackage]:
+    """Parse the contents of a dpkg status file (see read_status)."""
+    packages: dict[str, InstalledPackage] = {}
+    for fields in stanzas(data, _STATUS_FIELDS):
+        # "Status: install ok installed" — want, error flag, state.
+        want, _, state = _text(fields.get(b"Status", b"")).partition(" ")
+        state = state.rpartition(" ")[2]
+        if state in _ABSENT_STATES or b"Package" not in fields or b"Version" not in fields:
+            continue
+        package = InstalledPackage(
+            name=_text(fields[b"Package"]),
+            version=_text(fields[b"Version"]),
+            architecture=_text(fields.get(b"Architecture", b"")),
+            state=state,
+            multi_arch=_text(fields.get(b"Multi-Arch", b"")),
+            want=want,
+        )
+        packages[package.key] = package
+    return packages
+
+
+def field_pattern(*names: str) -> re.Pattern[bytes]:
+    """Matches the named top-level fields of a control file, one per line."""
+    alternatives = b"|".join(re.escape(name.encode()) for name in names)
+    return re.compile(rb"^(" + alternatives + rb"):[ \t]*([^\n]*)", re.MULTILINE)
+
+
+def stanzas(data: bytes | mmap.mmap, pattern: re.Pattern[bytes]) -> Iterator[dict[bytes, bytes]]:
+    """The fields `pattern` matches (see field_pattern), one dict per stanza.
+
+    Every stanza must start with a Package field, as in dpkg's status file
+    and apt's Packages indexes.
+    """
+    fields: dict[bytes, bytes] = {}
+    for match in pattern.finditer(data):
+        name, value = match.group(1), match.group(2).rstrip()
+        if name == b"Package" and fields:
+            yield fields
+            fields = {}
+        fields[name] = value
+    if fields:
+        yield fields
+
+
+@contextlib.contextmanager
+def mapped(path: Path) -> Iterator[bytes | mmap.mmap]:
+    """`path`'s contents, memory-mapped read-only.
+
+    Raises:
+        OSError: If the file can't be opened.
+    """
+    with path.open("rb") as fh:
+        if not fh.seek(0, 2):
+            yield b""  # mmap refuses empty files
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+_STATUS_FIELDS = field_pattern("Package", "Status", "Architecture", "Multi-Arch", "Version")
+
+
+def _text(value: bytes) -> str:
+    return value.decode("ascii", "replace")
+
+
+def diff(
+    before: Mapping[str, InstalledPackage], after: Mapping[str, InstalledPackage]
+) -> list[PackageChange]:
+    """What changed between two read_status() snapshots, sorted by name.
+
+    Any version change counts as an upgrade; apt only goes backwards when
+    an operator pins it to, and the report shows both versions anyway.
+    """
+    changes = []
+    for key in sorted(before.keys() | after.keys()):
+        old, new = before.get(key), after.get(key)
+        if old is None and new is not None:
+            changes.append(PackageChange(key, INSTALL, new_version=new.version))
+        elif new is None and old is not None:
+            changes.append(PackageChange(key, REMOVE, old_version=old.version))
+        elif old is not None and new is not None and old.version != new.version:
+            changes.append(PackageChange(key, UPGRADE, old.version, new.version))
+    return changes
@@ -7,17 +7,30 @@ Design notes:
   failures are NOT retried — credentials are wrong, retrying won't help.
 - Subject is always prefixed with `[hostname]` so a flood of fleet emails
   in your inbox is visually scannable.
+- TLS + AUTH is most of the latency of a send to Gmail. `SMTPSession`
+  keeps one authenticated connection for every message a process sends
+  and re-handshakes only when that connection fails; `send_email` is a
+  one-message session.
+- smtplib, ssl and email.mime cost more to import than the rest of
+  sysmaint's startup put together, and most commands never send mail.
+  The CLI imports this module only for commands that send mail, so they
+  are plain module imports here.
 """
 
 from __future__ import annotations
 
+import contextlib
 import logging
 import smtplib
 import socket
 import ssl
 import time
+from collections.abc import Iterable
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 
+from sysmaint.core import trace
+
 _BACKOFF_SECONDS = (5, 25)  # delay before retry 2 and retry 3
 _DEFAULT_TIMEOUT = 30
 _MAX_ATTEMPTS = 3
@@ -27,6 +40,185 @@ class EmailError(Exception):
     """Raised when an email send ultimately fails."""
 
 
+class EmailAuthError(EmailError):
+    """The server rejected the credentials; retrying can't help."""
+
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    """One message for SMTPSession.send_many()."""
+
+    to_addr: str
+    subject: str
+    body: str
+
+
+class SMTPSession:
+    """An authenticated SMTP connection reused across messages.
+
+    The connection (TCP + STARTTLS + AUTH) is opened lazily on the first
+    send and kept until close(). A send on a reused connection that finds
+    it dropped (the server closed it while idle) reconnects immediately
+    without spending a retry; other failures follow the usual
+    attempt/backoff policy with a fresh handshake each time.
+
+    Use as a context manager:
+
+        with SMTPSession(from_addr=..., smtp_server=..., smtp_port=...,
+                         password=...) as session:
+            session.send(to_addr=..., subject=..., body=...)
+    """
+
+    def __init__(
+        self,
+        *,
+        from_addr: str,
+        smtp_server: str,
+        smtp_port: int,
+        password: str,
+        timeout: int = _DEFAULT_TIMEOUT,
+        max_attempts: int = _MAX_ATTEMPTS,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.from_addr = from_addr
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self._password = password
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.logger = logger
+        self.handshakes = 0  # connections opened, for logs and tests
+        self._stack: contextlib.ExitStack | None = None
+        self._server: smtplib.SMTP | None = None
+        self._context: ssl.SSLContext | None = None
+
+    def __enter__(self) -> SMTPSession:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """QUIT and drop the connection, if one is open."""
+        stack, self._stack, self._server = self._stack, None, None
+        if stack is not None:
+            # A dead connection can't QUIT cleanly; that's fine, it's closing.
+            with contextlib.suppress(smtplib.SMTPException, OSError):
+                stack.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._server is not None:
+            return self._server
+        if self._context is None:
+            self._context = ssl.create_default_context()
+        stack = contextlib.ExitStack()
+        try:
+            with trace.span("smtp connect", "smtp", server=self.smtp_server):
+                server = stack.enter_context(
+                    smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+                )
+                server.starttls(context=self._context)
+                server.login(self.from_addr, self._password)
+        except BaseException:
+            with contextlib.suppress(smtplib.SMTPException, OSError):
+                stack.close()
+            raise
+        self.handshakes += 1
+        self._stack, self._server = stack, server
+        return server
+
+    def send(self, *, to_addr: str, subject: str, body: str) -> None:
+        """Send one message, retrying transient failures.
+
+        Raises:
+            EmailError: After exhausting retries on transient SMTP/network
+                errors, or immediately on authentication failure.
+        """
+        msg = _compose(self.from_addr, to_addr, subject, body)
+        last_error: Exception | None = None
+        attempt = 1
+
+        while attempt <= self.max_attempts:
+            reused = self._server is not None
+            try:
+                server = self._connect()
+                with trace.span("smtp send", "smtp", attempt=attempt):
+                    server.sendmail(self.from_addr, [to_addr], msg.as_string())
+                if self.logger:
+                    self.logger.info("Email sent to %s (subject=%r)", to_addr, msg["Subject"])
+                return
+
+            except smtplib.SMTPAuthenticationError as exc:
+                # Bad credentials — don't waste attempts. Surface clearly so
+                # operators check the Gmail app password / 2FA setup.
+                self.close()
+                if self.logger:
+                    self.logger.error("SMTP authentication failed: %s", exc)
+                raise EmailAuthError(
+                    "SMTP authentication failed — verify the Gmail app password "
+                    "and that 2FA is enabled on the account"
+                ) from exc
+
+            except (smtplib.SMTPException, OSError) as exc:
+                self.close()
+                if reused and _connection_lost(exc):
+                    # Stale pooled connection: re-handshake right away, free.
+                    if self.logger:
+                        self.logger.info("SMTP connection dropped (%s); reconnecting", exc)
+                    continue
+                last_error = exc
+                if self.logger:
+                    self.logger.warning(
+                        "SMTP attempt %d/%d failed: %s", attempt, self.max_attempts, exc
+                    )
+                if attempt < self.max_attempts:
+                    # Index 0 → wait before attempt 2, index 1 → wait before attempt 3.
+                    delay = _BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)]
+                    time.sleep(delay)
+                attempt += 1
+
+        raise EmailError(
+            f"SMTP send failed after {self.max_attempts} attempts: {last_error}"
+        ) from last_error
+
+    def send_many(
+        self, messages: Iterable[OutgoingEmail]
+    ) -> list[tuple[OutgoingEmail, EmailError]]:
+        """Send messages over this one session; returns the ones that failed.
+
+        Authentication failure stops the batch (every later message would
+        fail the same way) and is raised.
+        """
+        failed: list[tuple[OutgoingEmail, EmailError]] = []
+        for message in messages:
+            try:
+                self.send(to_addr=message.to_addr, subject=message.subject, body=message.body)
+            except EmailAuthError:
+                raise
+            except EmailError as exc:
+                failed.append((message, exc))
+        return failed
+
+
+def _connection_lost(exc: Exception) -> bool:
+    # SMTPException subclasses OSError; only a disconnect or a socket-level
+    # error says the connection itself is gone, not the message refused.
+    return isinstance(exc, smtplib.SMTPServerDisconnected) or not isinstance(
+        exc, smtplib.SMTPException
+    )
+
+
+def _compose(from_addr: str, to_addr: str, subject: str, body: str) -> MIMEText:
+    """Build the MIME message with the `[hostname]` prefix and fqdn footer."""
+    hostname = socket.gethostname()
+    fqdn = socket.getfqdn()
+    msg = MIMEText(f"{body}\n\n-- \nSent from {fqdn}")
+    msg["Subject"] = f"[{hostname}] {subject}"
+    msg["From"] = from_addr
+    msg["To"] = to_addr
+    return msg
+
+
 def send_email(
     *,
     from_addr: str,
@@ -40,7 +232,7 @@ def send_email(
     max_attempts: int = _MAX_ATTEMPTS,
     logger: logging.Logger | None = None,
 ) -> None:
-    """Send a plain-text email via SMTP+STARTTLS.
+    """Send a plain-text email via SMTP+STARTTLS in a one-message session.
 
     Adds `[hostname]` to the subject and a `Sent from <fqdn>` footer to the
     body so the recipient can identify the source box across a fleet.
@@ -49,50 +241,13 @@ def send_email(
         EmailError: After exhausting retries on transient SMTP/network errors,
             or immediately on authentication failure.
     """
-    hostname = socket.gethostname()
-    fqdn = socket.getfqdn()
-    full_subject = f"[{hostname}] {subject}"
-    full_body = f"{body}\n\n-- \nSent from {fqdn}"
-
-    msg = MIMEText(full_body)
-    msg["Subject"] = full_subject
-    msg["From"] = from_addr
-    msg["To"] = to_addr
-
-    context = ssl.create_default_context()
-    last_error: Exception | None = None
-
-    for attempt in range(1, max_attempts + 1):
-        try:
-            with smtplib.SMTP(smtp_server, smtp_port, timeout=timeout) as server:
-                server.starttls(context=context)
-                server.login(from_addr, password)
-                server.sendmail(from_addr, [to_addr], msg.as_string())
-            if logger:
-                logger.info("Email sent to %s (subject=%r)", to_addr, full_subject)
-            return
-
-        except smtplib.SMTPAuthenticationError as exc:
-            # Bad credentials — don't waste attempts. Surface clearly so
-            # operators check the Gmail app password / 2FA setup.
-            if logger:
-                logger.error("SMTP authentication failed: %s", exc)
-            raise EmailError(
-                "SMTP authentication failed — verify the Gmail app password "
-                "and that 2FA is enabled on the account"
-            ) from exc
-
-        except (smtplib.SMTPException, OSError) as exc:
-            last_error = exc
-            if logger:
-                logger.warning(
-                    "SMTP attempt %d/%d failed: %s", attempt, max_attempts, exc
-                )
-            if attempt < max_attempts:
-                # Index 0 → wait before attempt 2, index 1 → wait before attempt 3.
-                delay = _BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)]
-                time.sleep(delay)
-
-    raise EmailError(
-        f"SMTP send failed after {max_attempts} attempts: {last_error}"
-    ) from last_error
+    with SMTPSession(
+        from_addr=from_addr,
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        password=password,
+        timeout=timeout,
+        max_attempts=max_attempts,
+        logger=logger,
+    ) as session:
+        session.send(to_addr=to_addr, subject=subject, body=body)
@@ -0,0 +1,68 @@
+"""Cheap "has anything apt cares about changed?" fingerprint.
+
+Whether an upgrade has work to do depends only on the package indexes in
+/var/lib/apt/lists and on what dpkg has installed (/var/lib/dpkg/status).
+Hashing those files' names, sizes and mtimes — not their contents — takes
+milliseconds. If the fingerprint after `apt-get update` matches the one
+recorded the last time a simulation found nothing pending, nothing can be
+pending now either, and the weekly run can skip straight to the report.
+
+An mtime or size change with identical content only costs a simulation;
+it can never hide a pending upgrade.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+from sysmaint.core import dpkg, state
+
+APT_LISTS_DIR = Path("/var/lib/apt/lists")
+FINGERPRINT_STATE = state.STATE_DIR / "apt-fingerprint.json"
+
+
+def apt_fingerprint(lists_dir: Path | None = None, dpkg_status: Path | None = None) -> str:
+    """Hex digest over (name, size, mtime) of the index files and dpkg status.
+
+    The paths default to APT_LISTS_DIR and dpkg.DPKG_STATUS, looked up at
+    call time.
+    """
+    if lists_dir is None:
+        lists_dir = APT_LISTS_DIR
+    if dpkg_status is None:
+        dpkg_status = dpkg.DPKG_STATUS
+    digest = hashlib.sha256()
+    entries: list[tuple[str, int, int]] = []
+    try:
+        with os.scandir(lists_dir) as it:
+            for entry in it:
+                # Skip apt's partial/ dir and lock file; only the indexes matter.
+                if entry.is_file(follow_symlinks=False) and entry.name != "lock":
+                    st = entry.stat(follow_symlinks=False)
+                    entries.append((entry.name, st.st_size, st.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    for name, size, mtime in sorted(entries):
+        digest.update(f"{name}\0{size}\0{mtime}\n".encode())
+    try:
+        st = dpkg_status.stat()
+        digest.update(f"dpkg\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    except FileNotFoundError:
+        digest.update(b"dpkg\0missing\n")
+    return digest.hexdigest()
+
+
+def is_known_idle(fingerprint: str, mode: str, path: Path = FINGERPRINT_STATE) -> bool:
+    """True if `fingerprint` was recorded as "nothing pending" for `mode`."""
+    try:
+        data = state.read_json(path)
+    except (OSError, ValueError):
+        return False
+    return bool(data.get("fingerprint") == fingerprint and data.get("mode") == mode)
+
+
+def record_idle(fingerprint: str, mode: str, path: Path = FINGERPRINT_STATE) -> None:
+    """Remember that, at `fingerprint`, `mode` had nothing to do."""
+    state.write_json(path, {"fingerprint": fingerprint, "mode": mode})
@@ -0,0 +1,73 @@
+"""One-shot, concurrent collection of everything the reports show about a host.
+
+The weekly email and `sysmaint status` both print the same host facts:
+disks, watched services, timers, the reboot flag. Gathered one after
+another, each probe waits on the previous one's `systemctl` round trip
+(10s timeout each). `collect_snapshot()` starts every probe at once on a
+small thread pool — they are all subprocess- or syscall-bound, so threads
+are enough — and freezes the answers into a `HealthSnapshot` that both
+renderers read instead of querying the system themselves. Services and
+timers are each resolved by a single batched `systemctl show`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from sysmaint.core import system
+
+# One worker per probe below; each is mostly waiting on a syscall or child.
+_MAX_WORKERS = 6
+
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    """Point-in-time view of the host, shared by the email and status renderers."""
+
+    host: system.HostInfo
+    disks: tuple[system.DiskUsage, ...]
+    services: tuple[system.ServiceStatus, ...]
+    timers: tuple[system.TimerStatus, ...]
+    reboot_required: bool
+    reboot_packages: tuple[str, ...]
+
+    def disks_over(self, threshold_percent: int) -> list[system.DiskUsage]:
+        return system.disks_over_threshold(list(self.disks), threshold_percent)
+
+
+def collect_snapshot(
+    services: Iterable[str] = (),
+    timers: Iterable[str] = (),
+    *,
+    backend: str = "auto",
+    max_workers: int = _MAX_WORKERS,
+) -> HealthSnapshot:
+    """Probe the host concurrently and return an immutable snapshot.
+
+    Services and timers are reported in the order given. `backend` selects
+    how systemd is asked (see config.SYSTEMD_BACKENDS).
+    """
+    service_names = tuple(services)
+    timer_names = tuple(timers)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sysmaint-probe") as pool:
+        host = pool.submit(system.get_host_info)
+        disks = pool.submit(system.get_disk_usage)
+        reboot = pool.submit(system.reboot_required)
+        reboot_pkgs = pool.submit(system.reboot_required_packages)
+        # Each batch is a single `systemctl show`, however many units it names.
+        service_statuses = pool.submit(
+            system.get_service_statuses, service_names, backend=backend
+        )
+        timer_statuses = pool.submit(system.get_timer_statuses, timer_names, backend=backend)
+
+        return HealthSnapshot(
+            host=host.result(),
+            disks=tuple(disks.result()),
+            services=tuple(service_statuses.result()),
+            timers=tuple(timer_statuses.result()),
+            reboot_required=reboot.result(),
+            reboot_packages=tuple(reboot_pkgs.result()),
+        )
@@ -0,0 +1,328 @@
+"""Append-only run history in SQLite (/var/lib/sysmaint/history.db).
+
+Every `sysmaint update` records what it did: each apt step's duration and
+exit status, the packages it touched, and the disk and service snapshot
+the email showed. Questions like "how long has dist-upgrade taken on this
+host over the last year?" become an indexed query instead of a grep
+through rotated logs.
+
+Design notes:
+- Rows are only ever inserted; record_run() is the single writer, one
+  transaction per run, so a crash leaves either the whole run or nothing.
+- Steps carry their own start time (denormalized from the run) so the
+  step/time index answers duration queries without touching `runs`.
+- The schema version lives in PRAGMA user_version. An older sysmaint
+  refuses a database written by a newer one rather than guessing.
+- WAL mode lets a `sysmaint history` reader run while an update writes.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from sysmaint.core import state
+from sysmaint.core.apt_output import PackageChange
+from sysmaint.core.system import DiskUsage, ServiceStatus
+
+DEFAULT_HISTORY_DB = state.STATE_DIR / "history.db"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    upgraded INTEGER NOT NULL,
+    installed INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    failed_steps INTEGER NOT NULL,
+    reboot_required INTEGER NOT NULL,
+    skipped_reason TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (started);
+
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    seq INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    returncode INTEGER NOT NULL,
+    timed_out INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+);
+CREATE INDEX IF NOT EXISTS steps_by_step_time ON steps (step, started, duration, returncode);
+
+CREATE TABLE IF NOT EXISTS packages (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    action TEXT NOT NULL,
+    old_version TEXT,
+    new_version TEXT,
+    seconds REAL
+);
+CREATE INDEX IF NOT EXISTS packages_by_name ON packages (name, run_id);
+CREATE INDEX IF NOT EXISTS packages_by_run ON packages (run_id);
+
+CREATE TABLE IF NOT EXISTS disks (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    mountpoint TEXT NOT NULL,
+    used_percent INTEGER NOT NULL,
+    total_gb REAL NOT NULL,
+    used_gb REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS disks_by_run ON disks (run_id);
+
+CREATE TABLE IF NOT EXISTS services (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    active INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS services_by_run ON services (run_id);
+"""
+
+
+class HistoryError(RuntimeError):
+    """The history database can't be used by this version of sysmaint."""
+
+
+@dataclass(frozen=True)
+class StepRecord:
+    step: str  # e.g. "update", "dist-upgrade", "-s autoremove"
+    command: str
+    started: float  # epoch seconds
+    duration: float
+    returncode: int
+    timed_out: bool = False
+
+
+@dataclass(frozen=True)
+class RunRecord:
+    host: str
+    kind: str  # "update" or "security"
+    started: float
+    finished: float
+    upgraded: int = 0
+    installed: int = 0
+    removed: int = 0
+    reboot_required: bool = False
+    skipped_reason: str = ""
+    steps: tuple[StepRecord, ...] = ()
+    packages: tuple[PackageChange, ...] = ()
+    disks: tuple[DiskUsage, ...] = ()
+    services: tuple[ServiceStatus, ...] = ()
+
+
+def connect(path: Path = DEFAULT_HISTORY_DB, *, readonly: bool = False) -> sqlite3.Connection:
+    """Open (and, unless `readonly`, create or migrate) the history database.
+
+    Raises:
+        HistoryError: If the database was written by a newer schema.
+        sqlite3.Error: If the file can't be opened.
+    """
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise HistoryError(
+                f"{path} has schema version {version}; this sysmaint understands "
+                f"up to {SCHEMA_VERSION}"
+            )
+        if not readonly:
+            conn.execute("PRAGMA journal_mode = WAL")
+            if version < SCHEMA_VERSION:
+                with conn:
+                    conn.executescript(_SCHEMA)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("PRAGMA foreign_keys = ON")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def step_name(command: Sequence[str]) -> str:
+    """Short, stable name for an apt step: the argv minus apt-get's fixed options
+    and any package names after the verb.
+
+    ("apt-get", "-y", "-o", "Dpkg::...", "dist-upgrade") -> "dist-upgrade"
+    ("apt-get", ..., "install", "--only-upgrade", "curl", "libcurl4")
+        -> "install --only-upgrade"
+
+    Names are grouped on by `sysmaint history` and become a metrics label,
+    so they must not vary with what a run happened to upgrade.
+    """
+    words: list[str] = []
+    skip_next = False
+    verb_seen = False
+    for arg in command[1:]:
+        if skip_next:
+            skip_next = False
+        elif arg == "-o":
+            skip_next = True
+        elif arg.startswith("-"):
+            if arg != "-y":
+                words.append(arg)
+        elif not verb_seen:
+            verb_seen = True
+            words.append(arg)
+    return " ".join(words) if words else " ".join(command)
+
+
+def record_run(conn: sqlite3.Connection, run: RunRecord) -> int:
+    """Append one run and everything it touched; returns the new run id."""
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO runs (host, kind, started, finished, upgraded, installed, removed,"
+            " failed_steps, reboot_required, skipped_reason)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run.host,
+                run.kind,
+                run.started,
+                run.finished,
+                run.upgraded,
+                run.installed,
+                run.removed,
+                sum(1 for s in run.steps if s.returncode != 0 or s.timed_out),
+                int(run.reboot_required),
+                run.skipped_reason,
+            ),
+        )
+        run_id = cursor.lastrowid
+        assert run_id is not None
+        conn.executemany(
+            "INSERT INTO steps (run_id, seq, step, started, duration, returncode, timed_out,"
+            " command) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, seq, s.step, s.started, s.duration, s.returncode, int(s.timed_out),
+                 s.command)
+                for seq, s in enumerate(run.steps)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO packages (run_id, name, action, old_version, new_version, seconds)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, p.name, p.action, p.old_version, p.new_version, p.seconds)
+                for p in run.packages
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO disks (run_id, mountpoint, used_percent, total_gb, used_gb)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(run_id, d.mountpoint, d.used_percent, d.total_gb, d.used_gb) for d in run.disks],
+        )
+        conn.executemany(
+            "INSERT INTO services (run_id, name, active, state) VALUES (?, ?, ?, ?)",
+            [(run_id, s.name, int(s.active), s.state) for s in run.services],
+        )
+    return run_id
+
+
+# --- Queries ---------------------------------------------------------------
+#
+# Every query below is answered from an index: the step list by seeking
+# through steps_by_step_time one distinct step at a time, and each step's
+# durations by a range scan of the same (covering) index. Neither reads
+# rows outside the requested window, however many years are stored.
+
+_NEXT_STEP_SQL = "SELECT MIN(step) FROM steps WHERE step > ?"
+_STEP_DURATIONS_SQL = (
+    "SELECT duration, returncode FROM steps WHERE step = ? AND started >= ? AND started < ?"
+)
+_RUN_COUNTS_SQL = (
+    "SELECT upgraded + installed + removed, failed_steps FROM runs"
+    " WHERE started >= ? AND started < ?"
+)
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """Summary of a sample: count and nearest-rank percentiles."""
+
+    count: int
+    p50: float
+    p95: float
+    max: float
+
+    @classmethod
+    def of(cls, values: Sequence[float]) -> Distribution:
+        ordered = sorted(values)
+        return cls(
+            count=len(ordered),
+            p50=percentile(ordered, 50),
+            p95=percentile(ordered, 95),
+            max=ordered[-1] if ordered else 0.0,
+        )
+
+
+@dataclass(frozen=True)
+class StepStats:
+    step: str
+    failures: int
+    duration: Distribution
+
+
+def percentile(ordered: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sample (0.0 if empty)."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+def steps(conn: sqlite3.Connection) -> list[str]:
+    """Every distinct step name, by index seeks rather than a table scan."""
+    names: list[str] = []
+    current = ""
+    while True:
+        (current,) = conn.execute(_NEXT_STEP_SQL, (current,)).fetchone()
+        if current is None:
+            return names
+        names.append(current)
+
+
+def step_stats(
+    conn: sqlite3.Connection,
+    *,
+    step: str | None = None,
+    since: float = 0.0,
+    until: float = float("inf"),
+    failures_only: bool = False,
+) -> list[StepStats]:
+    """Duration percentiles per step for steps started in [since, until)."""
+    stats = []
+    for name in [step] if step else steps(conn):
+        rows = conn.execute(_STEP_DURATIONS_SQL, (name, since, until)).fetchall()
+        failed = [duration for duration, returncode in rows if returncode != 0]
+        sample = failed if failures_only else [duration for duration, _ in rows]
+        if sample:
+            stats.append(StepStats(name, len(failed), Distribution.of(sample)))
+    return stats
+
+
+def package_stats(
+    conn: sqlite3.Connection,
+    *,
+    since: float = 0.0,
+    until: float = float("inf"),
+    failures_only: bool = False,
+) -> Distribution:
+    """Packages touched per run, for runs started in [since, until)."""
+    rows = conn.execute(_RUN_COUNTS_SQL, (since, until)).fetchall()
+    return Distribution.of(
+        [float(count) for count, failed in rows if failed or not failures_only]
+    )
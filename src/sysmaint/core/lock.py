@@ -13,6 +13,8 @@ import os
 from collections.abc import Iterator
 from pathlib import Path
 
+from sysmaint.core import trace
+
 DEFAULT_LOCK_PATH = Path("/run/sysmaint.lock")
 
 
@@ -36,7 +38,8 @@ def acquire_lock(path: Path | str = DEFAULT_LOCK_PATH) -> Iterator[None]:
     fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
     try:
         try:
-            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            with trace.span("acquire lock", "lock", path=str(lock_path)):
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
         except BlockingIOError as exc:
             # Someone else owns the lock. Read their PID (best-effort) for the message.
             holder = _read_holder_pid(fd)
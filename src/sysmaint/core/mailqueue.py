@@ -0,0 +1,349 @@
+"""Durable outbound mail spool: enqueue now, deliver when SMTP cooperates.
+
+A report that can't be sent within `send_email`'s three attempts used to
+be logged and lost, and those attempts' 5s/25s sleeps held up the apt run.
+With `[email] delivery = queued` a task writes the message to the outbox
+and moves on; `sysmaint mail flush` (run by sysmaint-mail-flush.timer)
+delivers whatever is due over one SMTP session.
+
+Design notes:
+- One JSON file per message, written atomically (core.state), named so a
+  directory listing sorts oldest first. Nothing is deleted until the
+  server accepted the message.
+- A failed message gets `next_attempt = now + backoff`: exponential from
+  `_BASE_DELAY_SEC`, capped at `_MAX_DELAY_SEC`, with jitter so a fleet
+  that lost its relay at the same moment doesn't retry in lockstep.
+- Messages older than `_MAX_AGE_SEC` move to `dead/` and are logged at
+  ERROR: a week-old weekly report is noise, and the outbox must not grow
+  forever on a box whose credentials are wrong.
+- Flushes take their own lock, so a flush can overlap an update run but
+  not another flush.
+- In `delivery = direct` the message is spooled first and then sent on a
+  background thread (`deliver_in_background`), so the caller can carry on
+  and only wait, with a deadline, when it must (before a reboot). The
+  spool copy is held back from flushes for `_IN_FLIGHT_HOLD_SEC` and
+  removed once the server accepts the message; if the send fails or the
+  process goes away first, the flush timer delivers it later. Delivery is
+  at-least-once: a reboot mid-send can produce a duplicate, never a loss.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from sysmaint.core import email as email_mod
+from sysmaint.core import state
+from sysmaint.core.config import Config
+from sysmaint.core.lock import acquire_lock
+
+DEFAULT_OUTBOX = Path("/var/spool/sysmaint/outbox")
+
+_BASE_DELAY_SEC = 60
+_MAX_DELAY_SEC = 6 * 60 * 60
+_MAX_AGE_SEC = 7 * 24 * 60 * 60
+# Long enough for send_email's three attempts; the spool copy is only a
+# fallback until then.
+_IN_FLIGHT_HOLD_SEC = 10 * 60
+
+
+@dataclass(frozen=True)
+class QueuedMessage:
+    to_addr: str
+    subject: str
+    body: str
+    created: float  # epoch seconds
+    attempts: int = 0
+    next_attempt: float = 0.0  # epoch seconds; 0 = due now
+    last_error: str = ""
+
+
+@dataclass
+class FlushResult:
+    sent: int = 0
+    deferred: int = 0
+    expired: int = 0
+    auth_failed: bool = False
+
+
+def enqueue(
+    outbox: Path | str,
+    *,
+    to_addr: str,
+    subject: str,
+    body: str,
+    now: float | None = None,
+    hold: float = 0.0,
+) -> Path:
+    """Spool a message for the next flush. Returns the spool file path.
+
+    `hold` keeps flushes from picking the message up for that many seconds.
+    """
+    created = time.time() if now is None else now
+    message = QueuedMessage(
+        to_addr=to_addr,
+        subject=subject,
+        body=body,
+        created=created,
+        next_attempt=created + hold if hold else 0.0,
+    )
+    # Time-ordered name; the random suffix keeps same-nanosecond writers apart.
+    name = f"{int(created * 1e9):020d}-{os.getpid()}-{random.randrange(16**6):06x}.json"
+    # Reports can mention package and host details; keep them root-only.
+    return state.write_json(Path(outbox) / name, asdict(message), mode=0o600)
+
+
+def load(path: Path) -> QueuedMessage:
+    return QueuedMessage(**state.read_json(path))
+
+
+def queued(outbox: Path | str) -> list[Path]:
+    """Spool files, oldest first."""
+    spool = Path(outbox)
+    return sorted(spool.glob("*.json")) if spool.is_dir() else []
+
+
+def backoff_delay(attempts: int, *, rng: Callable[[], float] = random.random) -> float:
+    """Seconds before retry number `attempts`: exponential, capped, jittered.
+
+    "Equal jitter": half the delay is fixed, the other half random, so
+    retries spread out without ever collapsing to zero.
+    """
+    doublings = min(max(0, attempts - 1), 32)
+    delay = min(_MAX_DELAY_SEC, _BASE_DELAY_SEC << doublings)
+    return delay / 2 + rng() * delay / 2
+
+
+def flush(
+    config: Config,
+    logger: logging.Logger,
+    *,
+    outbox: Path | str = DEFAULT_OUTBOX,
+    now: float | None = None,
+    force: bool = False,
+) -> FlushResult:
+    """Deliver every due message over one SMTP session.
+
+    `force` ignores each message's backoff and tries everything now.
+
+    Raises:
+        AlreadyRunning: If another flush holds the outbox lock.
+    """
+    spool = Path(outbox)
+    result = FlushResult()
+    if not spool.is_dir():
+        return result
+
+    with acquire_lock(spool / ".flush.lock"):
+        current = time.time() if now is None else now
+        due: list[tuple[Path, QueuedMessage]] = []
+        for path in queued(spool):
+            try:
+                message = load(path)
+            except (OSError, ValueError, TypeError) as exc:
+                logger.error("Unreadable queued message %s: %s", path, exc)
+                _move_to_dead(path)
+                continue
+            if current - message.created > _MAX_AGE_SEC:
+                logger.error(
+                    "Giving up on queued email %r after %d attempts (last error: %s)",
+                    message.subject,
+                    message.attempts,
+                    message.last_error,
+                )
+                _move_to_dead(path)
+                result.expired += 1
+            elif force or message.next_attempt <= current:
+                due.append((path, message))
+        if not due:
+            return result
+
+        logger.info("Flushing %d queued email(s)", len(due))
+        # One attempt per message per flush: the timer is the retry loop.
+        with email_mod.SMTPSession(
+            from_addr=config.email.from_addr,
+            smtp_server=config.email.smtp_server,
+            smtp_port=config.email.smtp_port,
+            password=config.email.password,
+            max_attempts=1,
+            logger=logger,
+        ) as session:
+            for index, (path, message) in enumerate(due):
+                try:
+                    session.send(
+                        to_addr=message.to_addr, subject=message.subject, body=message.body
+                    )
+                except email_mod.EmailError as exc:
+                    _defer(path, message, str(exc), current, logger)
+                    result.deferred += 1
+                    if isinstance(exc, email_mod.EmailAuthError):
+                        # Every other message would fail the same way.
+                        for later_path, later in due[index + 1 :]:
+                            _defer(later_path, later, str(exc), current, logger)
+                        result.deferred += len(due) - index - 1
+                        result.auth_failed = True
+                        break
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+                result.sent += 1
+
+    logger.info(
+        "Mail flush: %d sent, %d deferred, %d expired", result.sent, result.deferred, result.expired
+    )
+    return result
+
+
+def _defer(
+    path: Path, message: QueuedMessage, error: str, now: float, logger: logging.Logger
+) -> None:
+    attempts = message.attempts + 1
+    updated = replace(
+        message,
+        attempts=attempts,
+        next_attempt=now + backoff_delay(attempts),
+        last_error=error[:500],
+    )
+    try:
+        state.write_json(path, asdict(updated), mode=0o600)
+    except OSError as exc:
+        # The message stays queued as it was and is retried next flush;
+        # the rest of the queue still gets its attempt.
+        logger.error("Could not record failed attempt for queued email %s: %s", path, exc)
+
+
+def _move_to_dead(path: Path) -> None:
+    dead = path.parent / "dead"
+    dead.mkdir(exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        path.replace(dead / path.name)
+
+
+def deliver(
+    config: Config,
+    *,
+    subject: str,
+    body: str,
+    logger: logging.Logger,
+    outbox: Path | str = DEFAULT_OUTBOX,
+) -> None:
+    """Send a task's report according to `[email] delivery`.
+
+    queued: spool it for `sysmaint mail flush`; returns immediately.
+    direct: send now; if that fails after retries, spool it instead of
+    losing it.
+
+    Raises:
+        OSError: If the message had to be spooled and the spool isn't
+            writable. Delivery is then lost; callers log it.
+    """
+    if config.email.delivery == "direct":
+        try:
+            email_mod.send_email(
+                from_addr=config.email.from_addr,
+                to_addr=config.email.to_addr,
+                smtp_server=config.email.smtp_server,
+                smtp_port=config.email.smtp_port,
+                password=config.email.password,
+                subject=subject,
+                body=body,
+                logger=logger,
+            )
+            return
+        except email_mod.EmailError as exc:
+            logger.error("Failed to send email, queueing for retry: %s", exc)
+
+    path = enqueue(outbox, to_addr=config.email.to_addr, subject=subject, body=body)
+    logger.info("Queued email %r at %s", subject, path)
+
+
+class PendingDelivery:
+    """Handle on a send running in the background (see deliver_in_background)."""
+
+    def __init__(self, thread: threading.Thread | None = None) -> None:
+        self._thread = thread
+
+    @property
+    def done(self) -> bool:
+        return self._thread is None or not self._thread.is_alive()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the send finishes or `timeout` passes. True if finished."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+
+def deliver_in_background(
+    config: Config,
+    *,
+    subject: str,
+    body: str,
+    logger: logging.Logger,
+    outbox: Path | str = DEFAULT_OUTBOX,
+) -> PendingDelivery:
+    """Like deliver(), but a direct send runs on a thread.
+
+    The message is spooled before the thread starts, so abandoning the
+    returned handle (a reboot, a timeout) leaves it for `sysmaint mail flush`.
+
+    Raises:
+        OSError: In queued mode, if the spool isn't writable.
+    """
+    if config.email.delivery != "direct":
+        deliver(config, subject=subject, body=body, logger=logger, outbox=outbox)
+        return PendingDelivery()
+
+    path: Path | None
+    try:
+        path = enqueue(
+            outbox,
+            to_addr=config.email.to_addr,
+            subject=subject,
+            body=body,
+            hold=_IN_FLIGHT_HOLD_SEC,
+        )
+    except OSError as exc:
+        logger.warning("Could not spool email before sending, sending without a copy: %s", exc)
+        path = None
+
+    thread = threading.Thread(
+        target=_send_and_unspool,
+        args=(config, subject, body, logger, path),
+        name="sysmaint-mail",
+        daemon=True,  # never hold the process open; the spool copy survives
+    )
+    thread.start()
+    return PendingDelivery(thread)
+
+
+def _send_and_unspool(
+    config: Config, subject: str, body: str, logger: logging.Logger, path: Path | None
+) -> None:
+    try:
+        email_mod.send_email(
+            from_addr=config.email.from_addr,
+            to_addr=config.email.to_addr,
+            smtp_server=config.email.smtp_server,
+            smtp_port=config.email.smtp_port,
+            password=config.email.password,
+            subject=subject,
+            body=body,
+            logger=logger,
+        )
+    except email_mod.EmailError as exc:
+        if path is None:
+            logger.error("Failed to send email %r: %s", subject, exc)
+        else:
+            logger.error("Failed to send email, left in %s for mail flush: %s", path, exc)
+        return
+    if path is not None:
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
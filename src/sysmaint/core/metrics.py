@@ -0,0 +1,142 @@
+"""Prometheus node_exporter textfile for the last run.
+
+At the end of every `sysmaint update` the run is rendered in the text
+exposition format and written where node_exporter's textfile collector
+picks it up, so monitoring can alert on slow or failed runs across the
+fleet without anyone reading email.
+
+Design notes:
+- The input is the same history.RunRecord the run history stores, so the
+  metrics, the history and the email can't disagree about a run.
+- The file is replaced atomically (state.atomic_write_text); the collector
+  ignores the dot-prefixed .tmp file and never scrapes half a run.
+- Nothing is written when the target directory doesn't exist: no
+  node_exporter on this box means nobody to read it, and sysmaint shouldn't
+  create another package's directories.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sysmaint.core import state
+from sysmaint.core.config import DEFAULT_METRICS_FILE
+
+if TYPE_CHECKING:
+    # Only for annotations: history pulls in sqlite3.
+    from sysmaint.core.history import RunRecord
+
+
+def render(run: RunRecord) -> str:
+    """The run as Prometheus text exposition format."""
+    out: list[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(f"{name}{labels} {_number(value)}" for labels, value in samples)
+
+    # A step name can repeat within a run (upgrade batches are all "install
+    # --only-upgrade"), and duplicate series would make node_exporter reject
+    # the whole file: each name reports its total duration and its first
+    # failing exit code.
+    durations: dict[str, float] = {}
+    exit_codes: dict[str, int] = {}
+    for s in run.steps:
+        durations[s.step] = durations.get(s.step, 0.0) + s.duration
+        if not exit_codes.get(s.step):
+            exit_codes[s.step] = -1 if s.timed_out else s.returncode
+    failed = any(s.returncode != 0 or s.timed_out for s in run.steps)
+
+    metric(
+        "sysmaint_last_run_timestamp_seconds",
+        "gauge",
+        "Unix time the last sysmaint update finished.",
+        [("", run.finished)],
+    )
+    metric(
+        "sysmaint_last_run_duration_seconds",
+        "gauge",
+        "Wall-clock duration of the last sysmaint update.",
+        [("", run.finished - run.started)],
+    )
+    metric(
+        "sysmaint_last_run_success",
+        "gauge",
+        "1 if every step of the last run exited 0.",
+        [("", 0 if failed else 1)],
+    )
+    metric(
+        "sysmaint_last_run_skipped",
+        "gauge",
+        "1 if the last run skipped upgrade/cleanup because nothing was pending.",
+        [("", 1 if run.skipped_reason else 0)],
+    )
+    metric(
+        "sysmaint_step_duration_seconds",
+        "gauge",
+        "Duration of each apt step in the last run.",
+        [(_labels(step=name), duration) for name, duration in durations.items()],
+    )
+    metric(
+        "sysmaint_step_exit_code",
+        "gauge",
+        "Exit code of each apt step in the last run (-1 if it timed out).",
+        [(_labels(step=name), code) for name, code in exit_codes.items()],
+    )
+    metric(
+        "sysmaint_packages",
+        "gauge",
+        "Packages changed by the last run.",
+        [
+            (_labels(action="upgraded"), run.upgraded),
+            (_labels(action="installed"), run.installed),
+            (_labels(action="removed"), run.removed),
+        ],
+    )
+    metric(
+        "sysmaint_reboot_required",
+        "gauge",
+        "1 if /var/run/reboot-required existed after the last run.",
+        [("", 1 if run.reboot_required else 0)],
+    )
+    metric(
+        "sysmaint_disk_used_percent",
+        "gauge",
+        "Disk usage per mount after the last run.",
+        [(_labels(mountpoint=d.mountpoint), d.used_percent) for d in run.disks],
+    )
+    metric(
+        "sysmaint_service_up",
+        "gauge",
+        "1 if the monitored systemd service was active after the last run.",
+        [(_labels(service=s.name, state=s.state), 1 if s.active else 0) for s in run.services],
+    )
+    return "\n".join(out) + "\n"
+
+
+def write_textfile(run: RunRecord, path: Path = DEFAULT_METRICS_FILE) -> bool:
+    """Atomically write the metrics file. Returns False if `path`'s directory
+    doesn't exist (no collector on this box).
+
+    Raises:
+        OSError: If the directory exists but the file can't be written.
+    """
+    if not path.parent.is_dir():
+        return False
+    state.atomic_write_text(path, render(run), mode=0o644)
+    return True
+
+
+def _labels(**labels: str) -> str:
+    inner = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -7,17 +7,39 @@ Design notes:
   the second-most-common failure mode in the previous implementation.
 - `apt_command()` enforces non-interactive defaults so package upgrades
   never block waiting for stdin during scheduled runs.
+- `stream=True` reads the child's output incrementally instead of buffering
+  it all in memory. A big dist-upgrade can print tens of MB; in streaming
+  mode each line is handed to the logger and to any line consumers as it
+  arrives, and only a bounded head/tail is kept on the CommandResult.
 """
 
 from __future__ import annotations
 
 import logging
 import os
+import selectors
 import shlex
 import subprocess
 import time
+from collections import deque
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
 
+from sysmaint.core import trace
+
+# A line consumer receives each decoded stdout line (without the trailing
+# newline) as the child prints it.
+LineConsumer = Callable[[str], None]
+
+# Lines kept at each end of a streamed stream. 200 + 200 is plenty for a
+# failure email and the "summary" block apt prints at the end.
+DEFAULT_CAPTURE_LINES = 200
+
+_READ_CHUNK = 64 * 1024
+# Longest line held while waiting for its newline; a longer one is passed
+# on in pieces of this size.
+MAX_LINE_BYTES = 64 * 1024
+
 
 @dataclass(frozen=True)
 class CommandResult:
@@ -29,6 +51,8 @@ class CommandResult:
     stderr: str
     duration: float  # seconds, monotonic
     timed_out: bool = False
+    # Lines dropped from the middle of stdout/stderr by streaming capture.
+    truncated_lines: int = 0
 
     @property
     def succeeded(self) -> bool:
@@ -60,6 +84,9 @@ def run_command(
     env: dict[str, str] | None = None,
     check: bool = True,
     logger: logging.Logger | None = None,
+    stream: bool = False,
+    line_consumers: Iterable[LineConsumer] = (),
+    capture_lines: int = DEFAULT_CAPTURE_LINES,
 ) -> CommandResult:
     """Run a command without invoking a shell. Returns a structured result.
 
@@ -69,6 +96,12 @@ def run_command(
         env: Extra environment variables merged onto os.environ for the child.
         check: If True (default), raise CommandError on non-zero exit or timeout.
         logger: Optional logger; the runner logs invocation + outcome at INFO/ERROR.
+        stream: Read output incrementally with bounded memory. Each line is
+            logged (stdout at DEBUG, stderr at WARNING) and stdout lines are
+            passed to every line consumer as they arrive.
+        line_consumers: Callables fed each stdout line. Only used with stream=True.
+        capture_lines: With stream=True, the number of lines kept at the head
+            and at the tail of each stream on the result.
 
     Raises:
         CommandError: On non-zero exit or timeout when check=True.
@@ -84,6 +117,47 @@ def run_command(
     if logger:
         logger.info("Running: %s (timeout=%ds)", shlex.join(cmd), timeout)
 
+    with trace.span(cmd[0], "command", argv=shlex.join(cmd)) as span:
+        try:
+            result = _execute(
+                cmd,
+                timeout=timeout,
+                env=full_env,
+                check=check,
+                logger=logger,
+                stream=stream,
+                line_consumers=line_consumers,
+                capture_lines=capture_lines,
+            )
+        except CommandError as exc:
+            span.set(returncode=exc.result.returncode, timed_out=exc.result.timed_out)
+            raise
+        span.set(returncode=result.returncode, timed_out=result.timed_out)
+        return result
+
+
+def _execute(
+    cmd: tuple[str, ...],
+    *,
+    timeout: int,
+    env: dict[str, str],
+    check: bool,
+    logger: logging.Logger | None,
+    stream: bool,
+    line_consumers: Iterable[LineConsumer],
+    capture_lines: int,
+) -> CommandResult:
+    if stream:
+        return _run_streaming(
+            cmd,
+            timeout=timeout,
+            env=env,
+            check=check,
+            logger=logger,
+            line_consumers=tuple(line_consumers),
+            capture_lines=capture_lines,
+        )
+
     start = time.monotonic()
     try:
         proc = subprocess.run(
@@ -92,7 +166,7 @@ def run_command(
             capture_output=True,
             text=True,
             timeout=timeout,
-            env=full_env,
+            env=env,
         )
     except subprocess.TimeoutExpired as exc:
         duration = time.monotonic() - start
@@ -118,17 +192,23 @@ def run_command(
         stderr=proc.stderr or "",
         duration=duration,
     )
+    return _finish(result, check=check, logger=logger)
 
+
+def _finish(
+    result: CommandResult, *, check: bool, logger: logging.Logger | None
+) -> CommandResult:
+    """Log the outcome of a completed (not timed-out) command and apply `check`."""
     if logger:
         if result.succeeded:
-            logger.info("OK in %.1fs: %s", duration, shlex.join(cmd))
+            logger.info("OK in %.1fs: %s", result.duration, result.pretty_command())
         else:
             # Truncate stderr in the log line; the full body is on the result object.
             logger.error(
                 "Failed (exit %d) in %.1fs: %s\n%s",
-                proc.returncode,
-                duration,
-                shlex.join(cmd),
+                result.returncode,
+                result.duration,
+                result.pretty_command(),
                 result.stderr.strip()[:500],
             )
 
@@ -137,6 +217,186 @@ def run_command(
     return result
 
 
+class _BoundedCapture:
+    """Keep the first and last `limit` lines of a stream; count the rest.
+
+    The head holds the command's preamble (what apt decided to do), the tail
+    holds the end (errors, the final summary). Everything in between is only
+    seen by the logger and line consumers.
+    """
+
+    __slots__ = ("dropped", "head", "limit", "tail")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(limit, 0)
+        self.head: list[str] = []
+        self.tail: deque[str] = deque(maxlen=self.limit)
+        self.dropped = 0
+
+    def add(self, line: str) -> None:
+        if len(self.head) < self.limit:
+            self.head.append(line)
+        elif self.limit:
+            if len(self.tail) == self.limit:
+                self.dropped += 1
+            self.tail.append(line)
+        else:
+            self.dropped += 1
+
+    def text(self) -> str:
+        lines = list(self.head)
+        if self.dropped:
+            lines.append(f"... [{self.dropped} lines omitted] ...")
+        lines.extend(self.tail)
+        return "".join(f"{line}\n" for line in lines)
+
+
+class _LineSplitter:
+    """Reassemble complete lines from arbitrary byte chunks.
+
+    At most MAX_LINE_BYTES are held for an unfinished line, so a child
+    that never prints a newline can't grow it without bound.
+    """
+
+    __slots__ = ("_pending",)
+
+    def __init__(self) -> None:
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> list[str]:
+        data = self._pending + chunk
+        parts = data.split(b"\n")
+        pending = parts.pop()
+        if len(pending) > MAX_LINE_BYTES:
+            # Frames a progress bar redrew with bare CRs; _decode_line keeps
+            # only the last one anyway.
+            pending = pending[pending.rfind(b"\r", 0, len(pending) - 1) + 1 :]
+        while len(pending) > MAX_LINE_BYTES:
+            parts.append(pending[:MAX_LINE_BYTES])
+            pending = pending[MAX_LINE_BYTES:]
+        self._pending = pending
+        return [_decode_line(p) for p in parts]
+
+    def flush(self) -> list[str]:
+        if not self._pending:
+            return []
+        line, self._pending = _decode_line(self._pending), b""
+        return [line]
+
+
+def _decode_line(raw: bytes) -> str:
+    # apt/dpkg progress output uses bare CRs to redraw a line; keep the last frame.
+    text = raw.decode(errors="replace").rstrip("\r")
+    return text.rsplit("\r", 1)[-1]
+
+
+def _run_streaming(
+    cmd: tuple[str, ...],
+    *,
+    timeout: int,
+    env: dict[str, str],
+    check: bool,
+    logger: logging.Logger | None,
+    line_consumers: tuple[LineConsumer, ...],
+    capture_lines: int,
+) -> CommandResult:
+    """Streaming counterpart of the subprocess.run() path in run_command()."""
+    start = time.monotonic()
+    deadline = start + timeout
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    assert proc.stdout is not None and proc.stderr is not None
+
+    captures = {"stdout": _BoundedCapture(capture_lines), "stderr": _BoundedCapture(capture_lines)}
+    splitters = {"stdout": _LineSplitter(), "stderr": _LineSplitter()}
+
+    def emit(stream_name: str, lines: list[str]) -> None:
+        for line in lines:
+            captures[stream_name].add(line)
+            if stream_name == "stdout":
+                if logger:
+                    logger.debug("| %s", line)
+                for consumer in line_consumers:
+                    consumer(line)
+            elif logger:
+                logger.warning("| %s", line)
+
+    timed_out = False
+    try:
+        try:
+            with selectors.DefaultSelector() as sel:
+                sel.register(proc.stdout, selectors.EVENT_READ, "stdout")
+                sel.register(proc.stderr, selectors.EVENT_READ, "stderr")
+                while sel.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        timed_out = True
+                        break
+                    for key, _ in sel.select(timeout=remaining):
+                        stream_name = key.data
+                        chunk = os.read(key.fd, _READ_CHUNK)
+                        if not chunk:
+                            sel.unregister(key.fileobj)
+                            emit(stream_name, splitters[stream_name].flush())
+                            continue
+                        emit(stream_name, splitters[stream_name].feed(chunk))
+        except BaseException:
+            # A consumer raised, or KeyboardInterrupt/SystemExit: never leave
+            # the child running with nobody reading its pipes.
+            proc.kill()
+            proc.wait()
+            raise
+
+        if timed_out:
+            proc.kill()
+        try:
+            # Both pipes are at EOF, so the child is exiting; allow it a moment
+            # even when the deadline has just passed.
+            returncode = proc.wait(timeout=max(deadline - time.monotonic(), 5.0))
+        except subprocess.TimeoutExpired:
+            # The child closed its pipes (or handed them to a grandchild) but
+            # never exited. Treat it like any other timeout.
+            timed_out = True
+            proc.kill()
+            returncode = proc.wait()
+    finally:
+        proc.stdout.close()
+        proc.stderr.close()
+
+    duration = time.monotonic() - start
+    truncated = captures["stdout"].dropped + captures["stderr"].dropped
+    if timed_out:
+        result = CommandResult(
+            command=cmd,
+            returncode=-1,
+            stdout=captures["stdout"].text(),
+            stderr=f"Command timed out after {timeout}s",
+            duration=duration,
+            timed_out=True,
+            truncated_lines=truncated,
+        )
+        if logger:
+            logger.error("Timeout after %ds: %s", timeout, shlex.join(cmd))
+        if check:
+            raise CommandError(result)
+        return result
+
+    result = CommandResult(
+        command=cmd,
+        returncode=returncode,
+        stdout=captures["stdout"].text(),
+        stderr=captures["stderr"].text(),
+        duration=duration,
+        truncated_lines=truncated,
+    )
+    return _finish(result, check=check, logger=logger)
+
+
 # Non-interactive apt environment. Prevents debconf from blocking on stdin
 # when a package upgrade wants to ask about modified config files.
 APT_ENV: dict[str, str] = {
@@ -145,13 +405,15 @@ APT_ENV: dict[str, str] = {
 }
 
 
-def apt_command(args: list[str]) -> list[str]:
+def apt_command(args: list[str], *, proxy: str = "") -> list[str]:
     """Build an apt-get argv with safe non-interactive defaults.
 
     `--force-confold` keeps the existing config file on package upgrades;
     `--force-confdef` accepts the package default when there is no existing
     user-modified version. Together they prevent the "are you sure?" stall.
+    `proxy` (e.g. a `sysmaint cache-serve` node) is used for http:// sources.
     """
+    proxy_opts = ["-o", f"Acquire::http::Proxy={proxy}"] if proxy else []
     return [
         "apt-get",
         "-y",
@@ -159,5 +421,6 @@ def apt_command(args: list[str]) -> list[str]:
         "Dpkg::Options::=--force-confold",
         "-o",
         "Dpkg::Options::=--force-confdef",
+        *proxy_opts,
         *args,
     ]
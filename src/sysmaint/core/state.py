@@ -0,0 +1,56 @@
+"""Small, crash-safe file helpers for sysmaint's on-disk state.
+
+Several features leave files behind for another process to pick up — a
+digest record for the collector, a spooled email, a state file for the
+next run. Readers must never see a half-written file, so every write goes
+to a temp file in the same directory and is renamed into place; rename is
+atomic within a filesystem, including NFS shares used as a fleet spool.
+
+Temp files start with "." so readers globbing "*.json" skip them.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# Persistent, root-owned state that should survive reboots.
+STATE_DIR = Path("/var/lib/sysmaint")
+
+
+def atomic_write_text(path: Path | str, text: str, *, mode: int = 0o644) -> Path:
+    """Write `text` to `path` atomically, creating parent directories."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, target)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+    return target
+
+
+def write_json(path: Path | str, data: Any, *, mode: int = 0o644) -> Path:
+    """Atomically write `data` as pretty-printed JSON."""
+    return atomic_write_text(path, json.dumps(data, indent=2, sort_keys=True) + "\n", mode=mode)
+
+
+def read_json(path: Path | str) -> Any:
+    """Read a JSON file written by write_json().
+
+    Raises:
+        OSError: If the file can't be read.
+        ValueError: If it isn't valid JSON.
+    """
+    return json.loads(Path(path).read_text(encoding="utf-8"))
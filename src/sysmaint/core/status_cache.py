@@ -0,0 +1,109 @@
+"""Short-lived cache of the rendered `sysmaint status` report, under /run.
+
+Monitoring polls `sysmaint status` every minute on every host, and each
+call re-reads the config and asks systemd and journald about the timers,
+the last run and every watched service. Within a minute the answer has
+almost never changed, so the rendered report is kept and reused.
+
+Design notes:
+- /run is tmpfs, so a cached report never survives a reboot — exactly
+  when kernel, disks and services are most likely to have changed.
+- An entry is valid only for the config file and the last completed
+  update it was rendered against. Editing the config, or an update
+  finishing (which touches RUN_MARKER), makes every cached report stale
+  immediately rather than after the TTL.
+- Root's cache isn't shown to other users, whose report can differ
+  (unprivileged probes see less); they cache under $XDG_RUNTIME_DIR.
+- Everything is best effort: a cache that can't be read or written just
+  means the report is rendered fresh.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from sysmaint import __version__
+from sysmaint.core import state
+
+RUNTIME_DIR = Path("/run/sysmaint")
+RUN_MARKER = RUNTIME_DIR / "last-run"
+DEFAULT_TTL_SEC = 60
+_CACHE_NAME = "status.json"
+_CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CachedReport:
+    text: str
+    created: float  # epoch seconds
+
+    def age(self, now: float | None = None) -> float:
+        return (time.time() if now is None else now) - self.created
+
+
+def cache_path() -> Path | None:
+    """Where this user's report is cached, or None if there's nowhere to."""
+    if os.geteuid() == 0:
+        return RUNTIME_DIR / _CACHE_NAME
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    return Path(runtime) / "sysmaint" / _CACHE_NAME if runtime else None
+
+
+def validity_key(config_path: Path, run_marker: Path) -> dict[str, Any]:
+    """What a cached report must have been rendered against to be reused."""
+    return {
+        "sysmaint": __version__,
+        "config": _mtime_ns(config_path),
+        "last_run": _mtime_ns(run_marker),
+    }
+
+
+def load(
+    path: Path, key: dict[str, Any], *, max_age: float, now: float | None = None
+) -> CachedReport | None:
+    """The cached report, or None if missing, unreadable, stale or expired."""
+    try:
+        entry = state.read_json(path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != _CACHE_VERSION:
+        return None
+    text, created = entry.get("text"), entry.get("created")
+    if entry.get("key") != key or not isinstance(text, str):
+        return None
+    if not isinstance(created, (int, float)):
+        return None
+    report = CachedReport(text, float(created))
+    # A negative age means the clock stepped back; don't trust the entry.
+    return report if 0 <= report.age(now) < max_age else None
+
+
+def store(path: Path, key: dict[str, Any], text: str, *, now: float | None = None) -> None:
+    """Cache `text` (best effort; failures are ignored)."""
+    entry = {
+        "version": _CACHE_VERSION,
+        "created": time.time() if now is None else now,
+        "key": key,
+        "text": text,
+    }
+    with contextlib.suppress(OSError):
+        state.write_json(path, entry, mode=0o600)
+
+
+def mark_run_complete(marker: Path = RUN_MARKER) -> None:
+    """Record that an update finished, invalidating every cached report."""
+    with contextlib.suppress(OSError):
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+
+
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
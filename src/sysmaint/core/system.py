@@ -12,9 +12,12 @@ import platform
 import shutil
 import socket
 import subprocess
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
+from sysmaint.core import trace
+
 REBOOT_REQUIRED_FLAG = Path("/var/run/reboot-required")
 REBOOT_REQUIRED_PACKAGES = Path("/var/run/reboot-required.pkgs")
 
@@ -43,6 +46,18 @@ class ServiceStatus:
     state: str  # "active", "inactive", "failed", "not-installed", ...
 
 
+@dataclass(frozen=True)
+class TimerStatus:
+    """The handful of `systemctl show <timer>` fields `sysmaint status` prints."""
+
+    name: str
+    state: str
+    loaded: str
+    next: str
+    last: str
+    result: str
+
+
 def get_host_info() -> HostInfo:
     """Snapshot of hostname + OS version for the email header."""
     return HostInfo(
@@ -102,57 +117,238 @@ def disks_over_threshold(
     return [d for d in disks if d.used_percent >= threshold_percent]
 
 
-def get_service_status(service_name: str) -> ServiceStatus:
-    """Query systemd for the active state of a service.
+# Suffixes systemctl understands; anything else is treated as a service name.
+_UNIT_SUFFIXES = (
+    ".service", ".socket", ".timer", ".target", ".mount", ".automount",
+    ".path", ".slice", ".scope", ".swap", ".device",
+)
+_SERVICE_PROPERTIES = ("Id", "LoadState", "ActiveState", "SubState", "UnitFileState")
+_TIMER_PROPERTIES = (
+    "Id", "ActiveState", "LoadState", "NextElapseUSecRealtime", "LastTriggerUSec", "Result",
+)
+_SYSTEMCTL_TIMEOUT = 10
+
+_SYSTEMD_DEST = "org.freedesktop.systemd1"
+_UNIT_IFACE = "org.freedesktop.systemd1.Unit"
+_TIMER_IFACE = "org.freedesktop.systemd1.Timer"
+# Properties that live on the Timer interface rather than the Unit one.
+_TIMER_ONLY_PROPERTIES = frozenset({"NextElapseUSecRealtime", "LastTriggerUSec", "Result"})
+
+
+class _SystemctlUnavailable(Exception):
+    """systemctl is missing or didn't answer; `state` says which for the report."""
+
+    def __init__(self, state: str) -> None:
+        super().__init__(state)
+        self.state = state
+
+
+def _unit_name(name: str) -> str:
+    return name if name.endswith(_UNIT_SUFFIXES) else f"{name}.service"
 
-    Uses `systemctl is-active` which prints one of: active, inactive, failed,
-    activating, deactivating, reloading, or 'unknown'. We treat 'unknown'
-    paired with a non-zero exit as "not-installed" for friendlier reporting.
+
+def _systemctl_show(
+    units: list[str], properties: tuple[str, ...]
+) -> list[dict[str, str]] | None:
+    """Fetch `properties` for every unit with ONE `systemctl show` call.
+
+    systemctl prints one `Key=value` block per unit, blank-line separated,
+    in argument order. Returns one dict per unit (keys lowercased), or None
+    when the output can't be matched up with the request — e.g. systemctl
+    rejected one of the names and aborted the whole call.
+
+    Raises:
+        _SystemctlUnavailable: systemctl is not installed or timed out.
     """
+    if not units:
+        return []
     try:
-        proc = subprocess.run(
-            ["systemctl", "is-active", service_name],
-            capture_output=True,
-            text=True,
-            timeout=10,
-            check=False,
-        )
-    except FileNotFoundError:
+        with trace.span("systemctl show", "systemd", units=len(units)):
+            proc = subprocess.run(
+                ["systemctl", "show", f"--property={','.join(properties)}", "--", *units],
+                capture_output=True,
+                text=True,
+                timeout=_SYSTEMCTL_TIMEOUT,
+                check=False,
+            )
+    except FileNotFoundError as exc:
         # systemd not present at all (e.g. running in a container during tests).
-        return ServiceStatus(name=service_name, active=False, state="no-systemd")
-    except subprocess.TimeoutExpired:
-        return ServiceStatus(name=service_name, active=False, state="timeout")
-
-    state = proc.stdout.strip() or "unknown"
-    # Distinguish "service not installed" from "service known but stopped".
-    # `systemctl list-unit-files` confirms when the state is ambiguous and
-    # systemctl returned non-zero, which usually means the unit isn't known.
-    if (
-        proc.returncode != 0
-        and state in ("unknown", "inactive")
-        and not _unit_exists(service_name)
-    ):
-        state = "not-installed"
-    return ServiceStatus(
-        name=service_name,
-        active=(state == "active"),
-        state=state,
-    )
+        raise _SystemctlUnavailable("no-systemd") from exc
+    except subprocess.TimeoutExpired as exc:
+        raise _SystemctlUnavailable("timeout") from exc
+
+    records: list[dict[str, str]] = []
+    current: dict[str, str] = {}
+    for line in proc.stdout.splitlines():
+        if not line.strip():
+            if current:
+                records.append(current)
+                current = {}
+            continue
+        key, sep, value = line.partition("=")
+        if sep:
+            current[key.lower()] = value
+    if current:
+        records.append(current)
+    if len(records) != len(units):
+        return None
+    return records
+
 
+def _dbus_show(units: list[str], properties: tuple[str, ...]) -> list[dict[str, str]]:
+    """D-Bus counterpart of _systemctl_show(): same record shape, no fork.
 
-def _unit_exists(service_name: str) -> bool:
+    All Properties.GetAll calls go out pipelined on one connection. A unit
+    whose call fails gets an empty record (reported as "unknown").
+
+    Raises:
+        OSError / DBusError: The bus is unreachable or misbehaving.
+    """
+    from sysmaint.core.dbus import DBusConnection, DBusError, MethodCall
+
+    interfaces = [_UNIT_IFACE]
+    if _TIMER_ONLY_PROPERTIES.intersection(properties):
+        interfaces.append(_TIMER_IFACE)
+    calls = [
+        MethodCall(
+            _SYSTEMD_DEST,
+            unit_object_path(unit),
+            "org.freedesktop.DBus.Properties",
+            "GetAll",
+            "s",
+            (iface,),
+        )
+        for unit in units
+        for iface in interfaces
+    ]
+    with trace.span("dbus GetAll", "systemd", units=len(units)), DBusConnection() as bus:
+        replies = bus.call_many(calls)
+
+    records: list[dict[str, str]] = []
+    for i in range(len(units)):
+        unit_reply, *extra_replies = replies[i * len(interfaces) : (i + 1) * len(interfaces)]
+        if isinstance(unit_reply, DBusError):
+            records.append({})
+            continue
+        merged: dict[str, object] = dict(unit_reply[0])
+        for reply in extra_replies:
+            # A not-found unit has no Timer interface; keep its Unit properties.
+            if not isinstance(reply, DBusError):
+                merged.update(reply[0])
+        records.append(
+            {p.lower(): _format_property(p, merged[p]) for p in properties if p in merged}
+        )
+    return records
+
+
+def unit_object_path(unit: str) -> str:
+    """systemd's object path for a unit name (its bus_label_escape rules)."""
+    escaped: list[str] = []
+    for i, byte in enumerate(unit.encode()):
+        ch = chr(byte)
+        if ch.isascii() and (ch.isalpha() or (ch.isdigit() and i > 0)):
+            escaped.append(ch)
+        else:
+            escaped.append(f"_{byte:02x}")
+    return "/org/freedesktop/systemd1/unit/" + ("".join(escaped) or "_")
+
+
+def _format_property(name: str, value: object) -> str:
+    """Render a raw D-Bus property value the way `systemctl show` prints it."""
+    if name.endswith(("USec", "USecRealtime")) and isinstance(value, int):
+        # 0 is "never" and UINT64_MAX is "infinity"; systemctl prints neither.
+        if value in (0, 2**64 - 1):
+            return ""
+        try:
+            return time.strftime("%a %Y-%m-%d %H:%M:%S %Z", time.localtime(value / 1_000_000))
+        except (OverflowError, OSError, ValueError):
+            return str(value)
+    return str(value)
+
+
+def _show_units(
+    units: list[str], properties: tuple[str, ...], backend: str
+) -> list[dict[str, str]] | None:
+    """Dispatch to the configured backend; see config.SYSTEMD_BACKENDS."""
+    if backend == "auto" and units:
+        from sysmaint.core.dbus import DBusError
+
+        try:
+            return _dbus_show(units, properties)
+        except (OSError, DBusError):
+            pass  # no bus, no permission, bus timeout — fork systemctl instead
+    return _systemctl_show(units, properties)
+
+
+def get_service_statuses(
+    service_names: list[str] | tuple[str, ...], *, backend: str = "auto"
+) -> list[ServiceStatus]:
+    """Query systemd for any number of services in one round trip.
+
+    `state` is the unit's ActiveState (active, inactive, failed, activating,
+    ...), except that units systemd has never heard of (LoadState=not-found)
+    are reported as "not-installed" for friendlier reporting.
+    """
+    names = list(service_names)
     try:
-        proc = subprocess.run(
-            ["systemctl", "list-unit-files", f"{service_name}.service"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-            check=False,
+        records = _show_units([_unit_name(n) for n in names], _SERVICE_PROPERTIES, backend)
+    except _SystemctlUnavailable as exc:
+        return [ServiceStatus(name=n, active=False, state=exc.state) for n in names]
+    if records is None:
+        # One bad name spoils a batch; isolate it by asking unit by unit.
+        if len(names) > 1:
+            return [s for n in names for s in get_service_statuses([n], backend=backend)]
+        return [ServiceStatus(name=n, active=False, state="unknown") for n in names]
+
+    results: list[ServiceStatus] = []
+    for name, info in zip(names, records, strict=True):
+        if info.get("loadstate") == "not-found":
+            state = "not-installed"
+        else:
+            state = info.get("activestate") or "unknown"
+        results.append(ServiceStatus(name=name, active=(state == "active"), state=state))
+    return results
+
+
+def get_service_status(service_name: str, *, backend: str = "auto") -> ServiceStatus:
+    """Single-service convenience wrapper around get_service_statuses()."""
+    return get_service_statuses([service_name], backend=backend)[0]
+
+
+def get_timer_statuses(
+    timers: list[str] | tuple[str, ...], *, backend: str = "auto"
+) -> list[TimerStatus]:
+    """Pull the `sysmaint status` timer fields for every timer in one call."""
+    names = list(timers)
+    try:
+        records = _show_units(names, _TIMER_PROPERTIES, backend)
+    except _SystemctlUnavailable as exc:
+        return [_unknown_timer(n, exc.state) for n in names]
+    if records is None:
+        if len(names) > 1:
+            return [s for n in names for s in get_timer_statuses([n], backend=backend)]
+        return [_unknown_timer(n, "unknown") for n in names]
+
+    return [
+        TimerStatus(
+            name=name,
+            state=info.get("activestate") or "?",
+            loaded=info.get("loadstate") or "?",
+            next=info.get("nextelapseusecrealtime") or "(not scheduled)",
+            last=info.get("lasttriggerusec") or "(never)",
+            result=info.get("result") or "?",
         )
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
-    # Output contains the unit name if it exists at all (enabled, disabled, or static).
-    return service_name in proc.stdout
+        for name, info in zip(names, records, strict=True)
+    ]
+
+
+def get_timer_status(timer: str, *, backend: str = "auto") -> TimerStatus:
+    """Single-timer convenience wrapper around get_timer_statuses()."""
+    return get_timer_statuses([timer], backend=backend)[0]
+
+
+def _unknown_timer(name: str, state: str) -> TimerStatus:
+    return TimerStatus(name=name, state=state, loaded="?", next="?", last="?", result="?")
 
 
 def reboot_required() -> bool:
@@ -0,0 +1,172 @@
+"""Lightweight tracing spans, exportable as Chrome trace JSON.
+
+`sysmaint --trace FILE <command>` records a span around each phase of the
+run — config load, lock acquire, every command run_command() executes,
+systemd queries, report rendering, SMTP connect/send — and writes them in
+the Chrome trace event format. Open the file in chrome://tracing or
+https://ui.perfetto.dev to see whether a slow run was apt, systemd or SMTP.
+
+Design notes:
+- Tracing is off unless enable() is called. span() then returns one shared
+  no-op context manager, so instrumented hot paths pay a global lookup and
+  an attribute check, nothing more.
+- Timestamps are time.monotonic_ns(); only differences are meaningful.
+- Nesting is tracked per thread, so the background email thread's spans
+  sit on their own track instead of inside whatever the main thread was
+  doing.
+- A span still open at export time (a daemon thread mid-send) is left out
+  rather than given a made-up end.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sysmaint.core import state
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start_ns: int
+    thread_id: int
+    thread_name: str
+    parent: Span | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+    end_ns: int | None = None
+
+    def set(self, **attrs: Any) -> None:
+        """Attach attributes learned while the span is open (exit codes, counts)."""
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        """Seconds; 0.0 while the span is still open."""
+        return 0.0 if self.end_ns is None else (self.end_ns - self.start_ns) / 1e9
+
+
+class _NullSpan:
+    """What span() yields while tracing is off."""
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_enabled = False
+_finished: list[Span] = []
+_finished_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable() -> None:
+    """Start recording spans (discarding any recorded earlier)."""
+    global _enabled
+    with _finished_lock:
+        _finished.clear()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(
+    name: str, category: str = "sysmaint", **attrs: Any
+) -> AbstractContextManager[Span | _NullSpan]:
+    """Context manager timing one phase. Nested spans on a thread nest."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _record(name, category, attrs)
+
+
+@contextlib.contextmanager
+def _record(name: str, category: str, attrs: dict[str, Any]) -> Iterator[Span]:
+    stack: list[Span] = _local.__dict__.setdefault("stack", [])
+    current = threading.current_thread()
+    opened = Span(
+        name=name,
+        category=category,
+        start_ns=time.monotonic_ns(),
+        thread_id=current.ident or 0,
+        thread_name=current.name,
+        parent=stack[-1] if stack else None,
+        attrs=attrs,
+    )
+    stack.append(opened)
+    try:
+        yield opened
+    except BaseException as exc:
+        opened.attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        opened.end_ns = time.monotonic_ns()
+        stack.pop()
+        with _finished_lock:
+            _finished.append(opened)
+
+
+def finished_spans() -> list[Span]:
+    """Closed spans, in start order."""
+    with _finished_lock:
+        return sorted(_finished, key=lambda s: s.start_ns)
+
+
+def chrome_trace(spans: list[Span]) -> dict[str, Any]:
+    """Spans as a Chrome trace event document ("X" complete events, in µs)."""
+    pid = os.getpid()
+    events: list[dict[str, Any]] = []
+    threads: dict[int, str] = {}
+    for s in spans:
+        if s.end_ns is None:
+            continue
+        threads.setdefault(s.thread_id, s.thread_name)
+        events.append(
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": s.start_ns / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {k: _jsonable(v) for k, v in s.attrs.items()},
+            }
+        )
+    for tid, thread_name in threads.items():
+        events.append(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome(path: Path) -> int:
+    """Write every finished span to `path`. Returns the number written."""
+    spans = finished_spans()
+    state.atomic_write_text(path, json.dumps(chrome_trace(spans)) + "\n", mode=0o644)
+    return len(spans)
+
+
+def _jsonable(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
@@ -0,0 +1,75 @@
+"""Splitting an upgrade into small, dependency-closed apt transactions.
+
+One `dist-upgrade` holds dpkg's lock for the whole transaction — on a big
+upgrade, long enough to block config management and monitoring probes
+for most of the maintenance window, and to hit the apt timeout as a
+whole. Upgrading in batches of a bounded number of packages, one
+`apt-get install --only-upgrade` each, bounds how long the lock is held
+at a stretch: each apt-get releases it when it exits.
+
+Design notes:
+- A batch is closed under dependencies among the pending upgrades: an
+  upgrade and every pending upgrade its new version depends on (Depends,
+  Pre-Depends; any alternative) land in the same batch, via union-find.
+  Multi-Arch: same packages, whose versions must match across
+  architectures, are kept together too.
+- A dependency-closed group larger than the batch size is not split; it
+  becomes a batch of its own. apt still resolves each transaction, so a
+  dependency missed here (Breaks, a virtual package) only makes a batch
+  larger than planned, never an upgrade wrong.
+- Groups are packed greedily in name order, so the same pending set
+  always gives the same batches.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+
+from sysmaint.core.apt_index import PendingUpgrade
+
+
+def plan(
+    upgrades: list[PendingUpgrade], depends: Mapping[str, Iterable[str]], size: int
+) -> list[list[PendingUpgrade]]:
+    """`upgrades` in dependency-closed batches of about `size` packages.
+
+    `depends` maps package names to the names they depend on, as
+    apt_index.dependencies() returns them.
+    """
+    parent = list(range(len(upgrades)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    by_name: dict[str, list[int]] = {}
+    for i, upgrade in enumerate(upgrades):
+        by_name.setdefault(_bare(upgrade.name), []).append(i)
+    for name, positions in by_name.items():
+        for dep in depends.get(name, ()):
+            for j in by_name.get(dep, ()):
+                parent[find(j)] = find(positions[0])
+        for i in positions[1:]:
+            parent[find(i)] = find(positions[0])
+
+    groups: dict[int, list[PendingUpgrade]] = {}
+    for i in sorted(range(len(upgrades)), key=lambda i: upgrades[i].name):
+        groups.setdefault(find(i), []).append(upgrades[i])
+
+    batches: list[list[PendingUpgrade]] = []
+    current: list[PendingUpgrade] = []
+    for group in groups.values():
+        if current and len(current) + len(group) > size:
+            batches.append(current)
+            current = []
+        current.extend(group)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _bare(key: str) -> str:
+    """The package name of a dpkg key ("name" or "name:arch")."""
+    return key.partition(":")[0]
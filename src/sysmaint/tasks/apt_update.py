@@ -3,7 +3,7 @@
 Produces a human-readable summary email containing:
 - Host header (hostname/FQDN/distro/kernel)
 - Per-command exit status and duration
-- Packages upgraded (parsed from apt output)
+- Packages upgraded, installed and removed (dpkg's database before vs after)
 - Disk usage per mount + over-threshold flags
 - Configured service health
 - Reboot-required indicator
@@ -18,12 +18,27 @@ from __future__ import annotations
 
 import datetime as dt
 import logging
-import re
+import sqlite3
+import time
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass, field
 
-from sysmaint.core import email as email_mod
-from sysmaint.core import system
+from sysmaint.core import (
+    apt_index,
+    digest,
+    dpkg,
+    fingerprint,
+    history,
+    mailqueue,
+    metrics,
+    status_cache,
+    system,
+    trace,
+    upgrade_batches,
+)
+from sysmaint.core.apt_output import INSTALL, REMOVE, UPGRADE, AptOutputParser, PackageChange
 from sysmaint.core.config import Config
+from sysmaint.core.health import HealthSnapshot, collect_snapshot
 from sysmaint.core.runner import (
     APT_ENV,
     CommandError,
@@ -35,15 +50,11 @@ from sysmaint.core.runner import (
 # 30 minutes per apt command — enough for a long dist-upgrade on a slow
 # Pi, short enough to bail out if a mirror is wedged.
 _APT_TIMEOUT_SEC = 30 * 60
-
-# Matches the "X upgraded, Y newly installed, Z to remove" summary line
-# that apt prints near the end of `apt-get upgrade`.
-_APT_SUMMARY_RE = re.compile(
-    r"^(\d+)\s+upgraded,\s+(\d+)\s+newly installed,\s+(\d+)\s+to remove",
-    re.MULTILINE,
-)
-# Lines that announce a package upgrade in `apt-get upgrade` output.
-_APT_INST_RE = re.compile(r"^(?:Inst|Setting up)\s+(\S+)", re.MULTILINE)
+# How long a pending reboot waits for the summary email. The message is
+# already spooled, so giving up only delays it until after the reboot.
+_EMAIL_REBOOT_DEADLINE_SEC = 60
+# Without a reboot, give the background send this long before exiting.
+_EMAIL_EXIT_DEADLINE_SEC = 5 * 60
 
 
 @dataclass
@@ -55,6 +66,19 @@ class UpdateOutcome:
     packages_installed: int = 0
     packages_removed: int = 0
     upgraded_names: list[str] = field(default_factory=list)
+    # Per-package detail: versions from dpkg's status diff, unpack→configure
+    # time from the output parser.
+    package_changes: list[PackageChange] = field(default_factory=list)
+    # Installed packages whose deb a prefetch had already downloaded.
+    prefetched: int = 0
+    # Why the upgrade/cleanup steps were skipped ("" if they ran).
+    skipped_reason: str = ""
+    # The `apt-get -s` dry runs skip_if_unchanged made (see _nothing_pending).
+    simulations: list[CommandResult] = field(default_factory=list)
+    # Upgrades, and the steps, left for the next run when [update]
+    # batch_deadline_min passed.
+    deferred: list[str] = field(default_factory=list)
+    deferred_steps: list[str] = field(default_factory=list)
 
     @property
     def any_changes(self) -> bool:
@@ -82,68 +106,321 @@ def run_apt_maintenance(
     """Run the apt sequence and return a structured outcome.
 
     Each command is run with check=False so a failure mid-sequence still
-    runs the cleanup steps and still produces a summary email.
+    runs the cleanup steps and still produces a summary email. With
+    [update] skip_if_unchanged, the upgrade and cleanup steps are skipped
+    when nothing is pending after `apt-get update` (see _nothing_pending).
+
+    What changed is dpkg's status before vs after those steps; apt's output
+    is the fallback when the status file can't be read.
+
+    With `security_only`, the upgrade step installs just the packages whose
+    candidate comes from a security pocket (see security_upgrades), and
+    nothing runs when there are none or they can't be worked out.
+
+    With [update] batch_size, the upgrade runs in batches (see
+    _upgrade_steps); once [update] batch_deadline_min has passed, no
+    further step starts and the packages not reached are reported in
+    `deferred` for the next run.
     """
+    started = time.monotonic()
     outcome = UpdateOutcome()
+    proxy = config.update.apt_proxy
 
-    commands: list[list[str]] = [apt_command(["update"])]
+    outcome.results.append(_run_apt(apt_command(["update"], proxy=proxy), logger))
+    selected: list[apt_index.PendingUpgrade] | None = None
     if security_only:
-        # Unattended-upgrades handles this on most boxes; this path exists for
-        # operators who want sysmaint to own daily security patching too.
-        commands.append(apt_command(["upgrade", "--with-new-pkgs"]))
-    elif config.update.include_dist_upgrade:
-        # dist-upgrade is a superset of upgrade; no need to run both.
-        commands.append(apt_command(["dist-upgrade"]))
+        selected = _pending_upgrades(logger, security_only=True)
+        if not selected:
+            reason = (
+                "could not read the package indexes to select security upgrades"
+                if selected is None
+                else "no security upgrades pending"
+            )
+            logger.info("Skipping upgrade and cleanup: %s", reason)
+            outcome.skipped_reason = reason
+            return outcome
+        packages = [u.name for u in selected]
+        logger.info("Security upgrades pending: %s", " ".join(packages))
+        upgrade = upgrade_args(config, security_only=True, packages=packages)
     else:
-        commands.append(apt_command(["upgrade"]))
-    commands.extend(
-        [
-            apt_command(["autoremove"]),
-            apt_command(["autoclean"]),
-        ]
-    )
+        upgrade = upgrade_args(config)
+        if config.update.skip_if_unchanged and outcome.results[0].succeeded:
+            reason = _nothing_pending(upgrade, logger, outcome)
+            if reason:
+                logger.info("Skipping upgrade and cleanup: %s", reason)
+                outcome.skipped_reason = reason
+                return outcome
+
+    upgrade_steps = _upgrade_steps(config, upgrade, selected, logger, security_only=security_only)
+    deadline = None
+    if config.update.batch_size and config.update.batch_deadline_min:
+        deadline = started + config.update.batch_deadline_min * 60
+    steps = [*upgrade_steps, (["autoremove"], []), (["autoclean"], [])]
+
+    before = _installed_packages(logger)
+    # Output is streamed; each upgrade step gets a parser that logs progress
+    # per package and keeps only the structured results.
+    parsers: list[AptOutputParser] = []
+    for i, (args, _names) in enumerate(steps):
+        if deadline is not None and time.monotonic() >= deadline:
+            outcome.deferred = [name for _, names in steps[i:] for name in names]
+            outcome.deferred_steps = [_describe_step(a, names) for a, names in steps[i:]]
+            logger.warning(
+                "Batch deadline reached; not running %s; %d upgrade(s) left for the next run",
+                ", ".join(outcome.deferred_steps),
+                len(outcome.deferred),
+            )
+            break
+        parser = None
+        if i < len(upgrade_steps):
+            if len(upgrade_steps) > 1:
+                logger.info("Upgrade step %d of %d", i + 1, len(upgrade_steps))
+            parser = AptOutputParser(logger)
+            parsers.append(parser)
+        outcome.results.append(_run_apt(apt_command(args, proxy=proxy), logger, parser))
+
+    # Fold the upgrade steps' parsed output into human-readable counts.
+    _apply_parser(outcome, *parsers)
+    after = _installed_packages(logger) if before is not None else None
+    if before is not None and after is not None:
+        _apply_dpkg_diff(dpkg.diff(before, after), outcome)
+    outcome.prefetched = _prefetch_hits(outcome.package_changes)
+    return outcome
 
-    for cmd in commands:
-        try:
-            result = run_command(
-                cmd,
-                timeout=_APT_TIMEOUT_SEC,
-                env=APT_ENV,
-                check=False,
-                logger=logger,
+
+def _upgrade_steps(
+    config: Config,
+    upgrade: list[str],
+    selected: list[apt_index.PendingUpgrade] | None,
+    logger: logging.Logger,
+    *,
+    security_only: bool,
+) -> list[tuple[list[str], list[str]]]:
+    """(apt-get arguments, packages named) for each upgrade step.
+
+    Without [update] batch_size that is `upgrade` alone. With it, the
+    pending upgrades (`selected`, or all of them) are split into
+    dependency-closed batches (core/upgrade_batches.py), each installed
+    with --only-upgrade; apt-get releases dpkg's lock when each exits. A
+    full run then ends with `upgrade` itself, for what batches can't do
+    (new dependencies, removals) — by then a short transaction. If the
+    batches can't be worked out, the upgrade runs in one transaction.
+    """
+    size = config.update.batch_size
+    if not size:
+        return [(upgrade, [])]
+    if selected is None:
+        selected = _pending_upgrades(logger)
+    if selected is None:
+        return [(upgrade, [])]
+    lists_dir = fingerprint.APT_LISTS_DIR
+    wanted = {u.name.partition(":")[0]: u.candidate for u in selected}
+    try:
+        depends = apt_index.dependencies(wanted, lists_dir)
+    except OSError as exc:
+        logger.warning("Could not read dependencies in %s, not batching: %s", lists_dir, exc)
+        return [(upgrade, [])]
+    steps: list[tuple[list[str], list[str]]] = []
+    for batch in upgrade_batches.plan(selected, depends, size):
+        names = [u.name for u in batch]
+        steps.append((_only_upgrade(names), names))
+    if not security_only:
+        steps.append((upgrade, []))
+    logger.info("Upgrading %d package(s) in %d batch(es)", len(selected), len(steps))
+    return steps
+
+
+def _installed_packages(logger: logging.Logger) -> dict[str, dpkg.InstalledPackage] | None:
+    path = dpkg.DPKG_STATUS
+    try:
+        return dpkg.read_status(path)
+    except OSError as exc:
+        logger.warning("Could not read %s; reporting changes from apt output: %s", path, exc)
+        return None
+
+
+def _run_apt(
+    cmd: list[str], logger: logging.Logger, parser: AptOutputParser | None = None
+) -> CommandResult:
+    try:
+        return run_command(
+            cmd,
+            timeout=_APT_TIMEOUT_SEC,
+            env=APT_ENV,
+            check=False,
+            logger=logger,
+            stream=True,
+            line_consumers=[parser] if parser else (),
+        )
+    except CommandError as exc:
+        # check=False shouldn't reach here, but guard for robustness.
+        return exc.result
+
+
+def _nothing_pending(
+    upgrade: list[str], logger: logging.Logger, outcome: UpdateOutcome
+) -> str:
+    """Return why the upgrade steps can be skipped, or "" if they can't.
+
+    First the fingerprint: unchanged lists + dpkg status since a run that
+    found nothing pending means nothing is pending now. Otherwise ask apt
+    with a simulation of the upgrade and of autoremove (no lock, no
+    downloads), and remember the fingerprint if both come back empty.
+    """
+    mode = " ".join(upgrade)
+    state_path = fingerprint.FINGERPRINT_STATE
+    try:
+        current = fingerprint.apt_fingerprint()
+    except OSError as exc:
+        logger.warning("Could not fingerprint apt state, running full sequence: %s", exc)
+        return ""
+    if fingerprint.is_known_idle(current, mode, state_path):
+        return "apt lists and dpkg status unchanged since a run with nothing pending"
+
+    for args in (upgrade, ["autoremove"]):
+        parser = AptOutputParser()
+        result = _run_apt(apt_command(["-s", *args]), logger, parser)
+        # Kept apart from `results`: a dry run isn't a step of the run, and
+        # the email, history and metrics report only the steps.
+        outcome.simulations.append(result)
+        if not result.succeeded:
+            logger.warning(
+                "Simulation %s exited %d; running full sequence",
+                result.pretty_command(),
+                result.returncode,
             )
-        except CommandError as exc:
-            # check=False shouldn't reach here, but guard for robustness.
-            result = exc.result
-        outcome.results.append(result)
+            return ""
+        if not parser.summary_seen or parser.changes:
+            return ""
+        if parser.upgraded or parser.installed or parser.removed:
+            return ""
 
-        # Parse upgrade output for human-readable counts.
-        if "upgrade" in cmd[-1] or cmd[-1] == "dist-upgrade":
-            _parse_apt_summary(result.stdout, outcome)
+    try:
+        fingerprint.record_idle(current, mode, state_path)
+    except OSError as exc:
+        logger.warning("Could not record apt fingerprint: %s", exc)
+    return "simulation found nothing to upgrade or remove"
 
-    return outcome
 
+def security_upgrades(logger: logging.Logger) -> list[str] | None:
+    """Packages with an upgrade pending from a security pocket, by dpkg key.
 
-def _parse_apt_summary(stdout: str, outcome: UpdateOutcome) -> None:
-    match = _APT_SUMMARY_RE.search(stdout)
-    if match:
-        outcome.packages_upgraded = int(match.group(1))
-        outcome.packages_installed = int(match.group(2))
-        outcome.packages_removed = int(match.group(3))
+    Worked out from dpkg's status and apt's package indexes (see
+    core/apt_index.py), so call it after `apt-get update`. Held packages
+    are left alone. None if either can't be read.
+    """
+    pending = _pending_upgrades(logger, security_only=True)
+    return None if pending is None else [u.name for u in pending]
+
+
+def _pending_upgrades(
+    logger: logging.Logger, *, security_only: bool = False
+) -> list[apt_index.PendingUpgrade] | None:
+    installed = _installed_packages(logger)
+    if installed is None:
+        return None
+    lists_dir = fingerprint.APT_LISTS_DIR
+    try:
+        index, _ = apt_index.load(lists_dir, apt_index.DEFAULT_INDEX_CACHE, logger=logger)
+        pending, _held = apt_index.pending_upgrades(installed, index)
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not read package indexes in %s: %s", lists_dir, exc)
+        return None
+    return apt_index.security_only(pending) if security_only else pending
+
+
+def upgrade_args(
+    config: Config, *, security_only: bool = False, packages: Sequence[str] = ()
+) -> list[str]:
+    """The apt-get verb (and flags) for this host's upgrade step.
+
+    A security-only upgrade names its `packages` (see security_upgrades);
+    --only-upgrade keeps apt from installing any that aren't already.
+    """
+    if security_only:
+        # Unattended-upgrades handles this on most boxes; this path exists for
+        # operators who want sysmaint to own daily security patching too.
+        return _only_upgrade(packages)
+    if config.update.include_dist_upgrade:
+        # dist-upgrade is a superset of upgrade; no need to run both.
+        return ["dist-upgrade"]
+    return ["upgrade"]
+
+
+def _only_upgrade(packages: Sequence[str]) -> list[str]:
+    return ["install", "--only-upgrade", *packages]
+
+
+def _apply_parser(outcome: UpdateOutcome, *parsers: AptOutputParser) -> None:
+    """Counts and changes from the upgrade step(s), summed over batches."""
+    summarized = [p for p in parsers if p.summary_seen]
+    if summarized:
+        outcome.packages_upgraded = sum(p.upgraded for p in summarized)
+        outcome.packages_installed = sum(p.installed for p in summarized)
+        outcome.packages_removed = sum(p.removed for p in summarized)
+    changes = {name: c for p in parsers for name, c in p.changes.items()}
     # Best-effort list of package names (helps the operator see *what* changed).
-    names = sorted(set(_APT_INST_RE.findall(stdout)))
+    names = sorted({name for p in parsers for name in p.changed_names()})
     if names:
         outcome.upgraded_names = names
+    if changes:
+        outcome.package_changes = list(changes.values())
+
+
+def _describe_step(args: list[str], packages: list[str]) -> str:
+    return f"an upgrade batch of {len(packages)}" if packages else " ".join(args)
+
+
+def _apply_dpkg_diff(changes: list[PackageChange], outcome: UpdateOutcome) -> None:
+    """Replace the parser's view of what changed with dpkg's. The parser
+    still contributes what dpkg doesn't record: per-package timings."""
+    seconds = {c.name: c.seconds for c in outcome.package_changes}
+    for change in changes:
+        change.seconds = seconds.get(change.name.partition(":")[0])
+    outcome.package_changes = changes
+    outcome.packages_upgraded = sum(1 for c in changes if c.action == UPGRADE)
+    outcome.packages_installed = sum(1 for c in changes if c.action == INSTALL)
+    outcome.packages_removed = sum(1 for c in changes if c.action == REMOVE)
+    # dpkg keys Multi-Arch: same packages "name:arch"; the report, history
+    # and prefetch state use the plain name apt prints.
+    outcome.upgraded_names = list(
+        dict.fromkeys(c.name.partition(":")[0] for c in changes if c.action != REMOVE)
+    )
+
+
+def _prefetch_hits(changes: list[PackageChange]) -> int:
+    # Local import: the prefetch task builds its commands from this module.
+    from sysmaint.tasks import prefetch
+
+    return prefetch.cache_hits(
+        ((c.name, c.new_version) for c in changes if c.action != REMOVE and c.new_version),
+        prefetch.PREFETCH_STATE,
+    )
+
+
+def _parse_apt_summary(stdout: str, outcome: UpdateOutcome) -> None:
+    """Parse already-captured apt output (e.g. a recorded transcript)."""
+    parser = AptOutputParser()
+    for line in stdout.splitlines():
+        parser.feed(line)
+    _apply_parser(outcome, parser)
 
 
 def render_email(
-    config: Config, outcome: UpdateOutcome, host: system.HostInfo
+    config: Config,
+    outcome: UpdateOutcome,
+    host: system.HostInfo,
+    snapshot: HealthSnapshot | None = None,
 ) -> tuple[str, str]:
-    """Build (subject, body) for the summary email."""
-    reboot_needed = system.reboot_required()
-    over_threshold = system.disks_over_threshold(
-        system.get_disk_usage(), config.monitor.disk_threshold_percent
-    )
+    """Build (subject, body) for the summary email.
+
+    `snapshot` is collected here when the caller doesn't already have one.
+    """
+    if snapshot is None:
+        snapshot = collect_snapshot(
+            config.monitor.services, backend=config.monitor.systemd_backend
+        )
+    reboot_needed = snapshot.reboot_required
 
     # Subject is the at-a-glance signal: failures > reboot > package count > quiet.
     if outcome.any_failures:
@@ -156,13 +433,7 @@ def render_email(
         subject_state = "no changes"
     subject = f"sysmaint weekly: {subject_state}"
 
-    body = _render_body(
-        config=config,
-        outcome=outcome,
-        host=host,
-        reboot_needed=reboot_needed,
-        disks_over=over_threshold,
-    )
+    body = _render_body(config=config, outcome=outcome, host=host, snapshot=snapshot)
     return subject, body
 
 
@@ -171,9 +442,10 @@ def _render_body(
     config: Config,
     outcome: UpdateOutcome,
     host: system.HostInfo,
-    reboot_needed: bool,
-    disks_over: list[system.DiskUsage],
+    snapshot: HealthSnapshot,
 ) -> str:
+    threshold = config.monitor.disk_threshold_percent
+    disks_over = snapshot.disks_over(threshold)
     lines: list[str] = []
     lines.append("=== sysmaint weekly run ===")
     lines.append(f"Host:     {host.hostname} ({host.fqdn})")
@@ -194,11 +466,27 @@ def _render_body(
     lines.append("")
 
     lines.append("--- Package changes ---")
+    if outcome.skipped_reason:
+        lines.append(f"  upgrade/autoremove/autoclean skipped: {outcome.skipped_reason}")
+    if outcome.deferred_steps:
+        lines.append(
+            "  batch deadline reached, not run: " + ", ".join(outcome.deferred_steps)
+        )
+    if outcome.deferred:
+        lines.append(
+            f"  deferred to the next run (batch deadline reached): {len(outcome.deferred)} "
+            f"upgrade(s) — {', '.join(outcome.deferred[:20])}"
+        )
     lines.append(
         f"  upgraded:  {outcome.packages_upgraded}"
         f"   installed: {outcome.packages_installed}"
         f"   removed: {outcome.packages_removed}"
     )
+    if outcome.prefetched:
+        lines.append(
+            f"  prefetched: {outcome.prefetched} of {len(outcome.package_changes)} "
+            "downloaded ahead of the run"
+        )
     if outcome.upgraded_names:
         # Cap at 50 names so a big upgrade doesn't produce a wall of text.
         shown = outcome.upgraded_names[:50]
@@ -210,8 +498,8 @@ def _render_body(
     lines.append("")
 
     lines.append("--- Disk usage ---")
-    for disk in system.get_disk_usage():
-        flag = "  ALERT" if disk.used_percent >= config.monitor.disk_threshold_percent else ""
+    for disk in snapshot.disks:
+        flag = "  ALERT" if disk.used_percent >= threshold else ""
         lines.append(
             f"  {disk.mountpoint:10s} {disk.used_percent:3d}% "
             f"({disk.used_gb:.1f} / {disk.total_gb:.1f} GB){flag}"
@@ -220,22 +508,20 @@ def _render_body(
         lines.append("")
         lines.append(
             f"  WARNING: {len(disks_over)} mount(s) at or above "
-            f"{config.monitor.disk_threshold_percent}% threshold"
+            f"{threshold}% threshold"
         )
     lines.append("")
 
     lines.append("--- Service health ---")
-    for service in config.monitor.services:
-        svc_status = system.get_service_status(service)
+    for svc_status in snapshot.services:
         marker = "OK" if svc_status.active else "DOWN"
-        lines.append(f"  [{marker}] {service:20s} {svc_status.state}")
+        lines.append(f"  [{marker}] {svc_status.name:20s} {svc_status.state}")
     lines.append("")
 
-    if reboot_needed:
+    if snapshot.reboot_required:
         lines.append("--- REBOOT REQUIRED ---")
-        pkgs = system.reboot_required_packages()
-        if pkgs:
-            lines.append("  Triggered by: " + ", ".join(pkgs))
+        if snapshot.reboot_packages:
+            lines.append("  Triggered by: " + ", ".join(snapshot.reboot_packages))
         if config.update.auto_reboot:
             lines.append(
                 f"  auto_reboot=true — will reboot during "
@@ -251,12 +537,140 @@ def _render_body(
     return "\n".join(lines)
 
 
-def maybe_reboot(config: Config, logger: logging.Logger, *, now: dt.datetime | None = None) -> bool:
+def build_digest_record(
+    config: Config,
+    outcome: UpdateOutcome,
+    snapshot: HealthSnapshot,
+    *,
+    now: dt.datetime | None = None,
+) -> digest.HostRecord:
+    """The facts render_email() would show, as a record for the fleet digest."""
+    return digest.HostRecord(
+        host=snapshot.host.hostname,
+        fqdn=snapshot.host.fqdn,
+        finished=(now or dt.datetime.now()).isoformat(timespec="seconds"),
+        duration=round(outcome.total_duration, 1),
+        upgraded=outcome.packages_upgraded,
+        installed=outcome.packages_installed,
+        removed=outcome.packages_removed,
+        packages=tuple(outcome.upgraded_names),
+        failed_commands=tuple(
+            digest.FailedCommand(
+                command=r.pretty_command(),
+                returncode=r.returncode,
+                stderr=r.stderr.strip()[-400:],
+            )
+            for r in outcome.results
+            if not r.succeeded
+        ),
+        reboot_required=snapshot.reboot_required,
+        reboot_packages=snapshot.reboot_packages,
+        disks_over=tuple(
+            f"{d.mountpoint} {d.used_percent}%"
+            for d in snapshot.disks_over(config.monitor.disk_threshold_percent)
+        ),
+        services_down=tuple(s.name for s in snapshot.services if not s.active),
+    )
+
+
+def build_history_run(
+    outcome: UpdateOutcome,
+    snapshot: HealthSnapshot,
+    *,
+    started: float,
+    finished: float,
+    security_only: bool = False,
+) -> history.RunRecord:
+    """This run as a history row. Steps ran back to back, so each one's start
+    is the run's start plus the durations before it."""
+    steps = []
+    offset = started
+    for result in outcome.results:
+        steps.append(
+            history.StepRecord(
+                step=history.step_name(result.command),
+                command=result.pretty_command(),
+                started=offset,
+                duration=result.duration,
+                returncode=result.returncode,
+                timed_out=result.timed_out,
+            )
+        )
+        offset += result.duration
+    return history.RunRecord(
+        host=snapshot.host.hostname,
+        kind="security" if security_only else "update",
+        started=started,
+        finished=finished,
+        upgraded=outcome.packages_upgraded,
+        installed=outcome.packages_installed,
+        removed=outcome.packages_removed,
+        reboot_required=snapshot.reboot_required,
+        skipped_reason=outcome.skipped_reason,
+        steps=tuple(steps),
+        packages=tuple(outcome.package_changes),
+        disks=snapshot.disks,
+        services=snapshot.services,
+    )
+
+
+def _record_history(run: history.RunRecord, logger: logging.Logger) -> None:
+    """Best effort: a broken history database must not fail the update."""
+    path = history.DEFAULT_HISTORY_DB
+    try:
+        conn = history.connect(path)
+        try:
+            history.record_run(conn, run)
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError, history.HistoryError) as exc:
+        logger.warning("Could not record run history in %s: %s", path, exc)
+
+
+def _write_metrics(config: Config, run: history.RunRecord, logger: logging.Logger) -> None:
+    path = config.monitor.metrics_file
+    if path is None:
+        return
+    try:
+        if metrics.write_textfile(run, path):
+            logger.info("Wrote run metrics to %s", path)
+        else:
+            logger.debug("No %s directory (node_exporter not installed); metrics skipped", path.parent)
+    except OSError as exc:
+        logger.warning("Could not write run metrics to %s: %s", path, exc)
+
+
+def _write_digest(
+    config: Config,
+    outcome: UpdateOutcome,
+    snapshot: HealthSnapshot,
+    logger: logging.Logger,
+) -> bool:
+    """Spool this run for the digest collector. False means email instead."""
+    try:
+        path = digest.spool_record(
+            config.notify.digest_dir, build_digest_record(config, outcome, snapshot)
+        )
+    except OSError as exc:
+        # An unreachable spool must not hide a failure: fall back to email.
+        logger.error("Failed to write digest record, emailing directly: %s", exc)
+        return False
+    logger.info("Wrote digest record %s", path)
+    return True
+
+
+def maybe_reboot(
+    config: Config,
+    logger: logging.Logger,
+    *,
+    now: dt.datetime | None = None,
+    before_reboot: Callable[[], object] | None = None,
+) -> bool:
     """Reboot if all conditions are met: reboot needed, auto_reboot on, in window.
 
     Returns True if a reboot was triggered (the process will not return),
-    False otherwise. Caller is responsible for sending the email *before*
-    invoking this — once we reboot, the SMTP send is moot.
+    False otherwise. `before_reboot` runs only once the reboot is decided —
+    the caller uses it to give an in-flight summary email a bounded wait.
     """
     if not system.reboot_required():
         return False
@@ -279,6 +693,8 @@ def maybe_reboot(config: Config, logger: logging.Logger, *, now: dt.datetime | N
         )
         return False
 
+    if before_reboot is not None:
+        before_reboot()
     logger.warning("Triggering auto-reboot now (window=%s-%s)",
                    config.update.reboot_window_start,
                    config.update.reboot_window_end)
@@ -305,33 +721,55 @@ def execute(
 ) -> UpdateOutcome:
     """Top-level entry point used by the CLI.
 
-    Runs maintenance, sends the email (if policy allows), and optionally
-    reboots. Returns the outcome so the CLI can set an exit code.
+    Runs maintenance, sends the email (if policy allows) or writes the
+    digest record, and optionally reboots. Returns the outcome so the CLI can set an exit code.
     """
     logger.info("Starting sysmaint apt run (security_only=%s)", security_only)
-    outcome = run_apt_maintenance(config, logger, security_only=security_only)
-    host = system.get_host_info()
-
-    if should_send_email(config, outcome):
-        subject, body = render_email(config, outcome, host)
+    started = time.time()
+    with trace.span("apt maintenance", "apt"):
+        outcome = run_apt_maintenance(config, logger, security_only=security_only)
+    with trace.span("health snapshot", "systemd"):
+        snapshot = collect_snapshot(
+            config.monitor.services, backend=config.monitor.systemd_backend
+        )
+    run = build_history_run(
+        outcome, snapshot, started=started, finished=time.time(), security_only=security_only
+    )
+    delivery = mailqueue.PendingDelivery()
+    if config.notify.mode == "digest" and _write_digest(config, outcome, snapshot, logger):
+        pass  # the collector's fleet email covers this run
+    elif should_send_email(config, outcome):
+        with trace.span("render email", "report"):
+            subject, body = render_email(config, outcome, snapshot.host, snapshot)
         try:
-            email_mod.send_email(
-                from_addr=config.email.from_addr,
-                to_addr=config.email.to_addr,
-                smtp_server=config.email.smtp_server,
-                smtp_port=config.email.smtp_port,
-                password=config.email.password,
-                subject=subject,
-                body=body,
-                logger=logger,
+            # Spooled, then (in direct mode) sent on a background thread while
+            # we record the run and decide about the reboot.
+            delivery = mailqueue.deliver_in_background(
+                config, subject=subject, body=body, logger=logger
             )
-        except email_mod.EmailError as exc:
+        except OSError as exc:
             # Don't let an email failure mask the apt outcome — log and continue.
-            logger.error("Failed to send summary email: %s", exc)
+            logger.error("Failed to send or queue summary email: %s", exc)
     else:
         logger.info("Notify policy skipped email (no changes, on_no_changes=false)")
 
-    maybe_reboot(config, logger)
+    # Bookkeeping overlaps the SMTP round trip instead of delaying its start.
+    with trace.span("record run", "report"):
+        _record_history(run, logger)
+        _write_metrics(config, run, logger)
+        status_cache.mark_run_complete(status_cache.RUN_MARKER)
+
+    def wait_for_email(deadline: float) -> None:
+        if not delivery.wait(deadline):
+            logger.warning(
+                "Summary email still sending after %.0fs; it stays queued for mail flush",
+                deadline,
+            )
+
+    if not maybe_reboot(
+        config, logger, before_reboot=lambda: wait_for_email(_EMAIL_REBOOT_DEADLINE_SEC)
+    ):
+        wait_for_email(_EMAIL_EXIT_DEADLINE_SEC)
     logger.info(
         "Run complete: %d upgraded, %d failures, duration=%.0fs",
         outcome.packages_upgraded,
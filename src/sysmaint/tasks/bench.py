@@ -0,0 +1,337 @@
+"""`sysmaint bench` — micro-benchmarks for sysmaint's hot paths.
+
+The test suite proves the code is right; this proves it stayed fast. Each
+benchmark times one path the weekly run depends on, on inputs sized like a
+large box (thousands of packages, hundreds of services):
+
+  parse_apt_summary   _parse_apt_summary() over a 5,000-package transcript
+  render_body         the email body with 300 services, 60 disks, 2,000 packages
+  load_config         load_config() on a realistic config file
+  cli_startup         a fresh interpreter importing sysmaint.cli
+  run_command         run_command() on a do-nothing fake executable
+  run_command_stream  run_command(stream=True) on a fake printing 20,000 lines
+  version_compare     debversion.compare_many() over 5,000 cold (installed,
+                      candidate) pairs
+
+Results can be saved as JSON (`--save`) and compared against an earlier
+save (`--compare`); a benchmark more than `--threshold` times slower than
+its baseline fails the command, so CI can catch a regression before it
+ships to the fleet.
+
+Design notes:
+- Each benchmark is a setup function returning a zero-argument callable;
+  setup (writing fake executables, generating transcripts) is not timed.
+- Timing is timeit-style: the loop count is calibrated until one sample
+  takes at least `min_time`, then `repeat` samples are taken. Comparisons
+  use the fastest per-call time, which is the least noisy on a busy box.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import sysmaint
+from sysmaint import __version__
+from sysmaint.core import debversion, state
+from sysmaint.core.apt_output import AptOutputParser
+from sysmaint.core.config import load_config
+from sysmaint.core.health import HealthSnapshot
+from sysmaint.core.runner import CommandResult, run_command
+from sysmaint.core.system import DiskUsage, HostInfo, ServiceStatus
+from sysmaint.tasks.apt_update import UpdateOutcome, _parse_apt_summary, _render_body
+
+DEFAULT_THRESHOLD = 1.25
+_RESULTS_VERSION = 1
+
+Setup = Callable[[Path], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    best: float  # fastest per-call seconds
+    median: float  # median per-call seconds
+    loops: int  # calls per sample
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"best": self.best, "median": self.median, "loops": self.loops}
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+# --- Benchmarks ------------------------------------------------------------
+
+
+def apt_transcript(packages: int) -> str:
+    """A dist-upgrade transcript shaped like apt's, touching `packages` packages."""
+    lines = [
+        "Reading package lists...",
+        "Building dependency tree...",
+        "Reading state information...",
+        "Calculating upgrade...",
+        f"{packages} upgraded, 0 newly installed, 0 to remove and 0 not upgraded.",
+    ]
+    for i in range(packages):
+        lines.append(
+            f"Get:{i + 1} http://deb.debian.org/debian bookworm/main amd64 pkg{i} amd64 "
+            f"1.{i}-2 [{i % 900 + 10} kB]"
+        )
+    for i in range(packages):
+        lines.append(f"Preparing to unpack .../pkg{i}_1.{i}-2_amd64.deb ...")
+        lines.append(f"Unpacking pkg{i} (1.{i}-2) over (1.{i}-1) ...")
+    for i in range(packages):
+        lines.append(f"Setting up pkg{i} (1.{i}-2) ...")
+    lines.append("Processing triggers for libc-bin (2.36-9+deb12u7) ...")
+    return "\n".join(lines) + "\n"
+
+
+def _bench_parse_apt_summary(_tmp: Path) -> Callable[[], object]:
+    transcript = apt_transcript(5000)
+    return lambda: _parse_apt_summary(transcript, UpdateOutcome())
+
+
+def _bench_render_body(tmp: Path) -> Callable[[], object]:
+    config = load_config(_write_config(tmp))
+    outcome = UpdateOutcome(
+        results=[
+            CommandResult(("apt-get", step), 0, "", "", 12.5)
+            for step in ("update", "dist-upgrade", "autoremove", "autoclean")
+        ]
+    )
+    _parse_apt_summary(apt_transcript(2000), outcome)
+    host = HostInfo("bench", "bench.lan", "Debian 12", "6.1.0-21-amd64", "x86_64")
+    snapshot = HealthSnapshot(
+        host=host,
+        disks=tuple(DiskUsage(f"/srv/vol{i}", 1000.0, 10.0 * i, i) for i in range(60)),
+        services=tuple(ServiceStatus(f"svc{i}", i % 7 != 0, "active") for i in range(300)),
+        timers=(),
+        reboot_required=True,
+        reboot_packages=("linux-image-6.1.0-22-amd64",),
+    )
+    return lambda: _render_body(config=config, outcome=outcome, host=host, snapshot=snapshot)
+
+
+def _bench_load_config(tmp: Path) -> Callable[[], object]:
+    path = _write_config(tmp)
+    return lambda: load_config(path)
+
+
+def _bench_cli_startup(_tmp: Path) -> Callable[[], object]:
+    cmd = [sys.executable, "-c", "import sysmaint.cli"]
+    # Import this copy of sysmaint even when it isn't the installed one.
+    src = str(Path(sysmaint.__file__).resolve().parents[1])
+    path = os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))
+    env = {**os.environ, "PYTHONPATH": path}
+    return lambda: subprocess.run(cmd, check=True, env=env)
+
+
+def _bench_run_command(tmp: Path) -> Callable[[], object]:
+    fake = _fake_executable(tmp / "fake-true", "exit 0")
+    return lambda: run_command([str(fake)], timeout=10)
+
+
+def _bench_run_command_stream(tmp: Path) -> Callable[[], object]:
+    fake = _fake_executable(
+        tmp / "fake-apt",
+        'i=0; while [ $i -lt 20000 ]; do echo "Unpacking pkg$i (1.$i-2) ..."; i=$((i+1)); done',
+    )
+    return lambda: run_command(
+        [str(fake)], timeout=30, stream=True, line_consumers=[AptOutputParser()]
+    )
+
+
+def _bench_version_compare(_tmp: Path) -> Callable[[], object]:
+    pairs = [
+        (f"{i % 3}:{i}.{i % 97}~rc{i % 5}-{i % 11}+deb12u{i % 13}", f"{i}.{i % 97}-{i % 11}")
+        for i in range(5000)
+    ]
+
+    def compare_cold() -> object:
+        debversion.sort_key.cache_clear()  # time tokenizing, not just cache hits
+        return debversion.compare_many(pairs)
+
+    return compare_cold
+
+
+BENCHMARKS: dict[str, Setup] = {
+    "parse_apt_summary": _bench_parse_apt_summary,
+    "render_body": _bench_render_body,
+    "load_config": _bench_load_config,
+    "cli_startup": _bench_cli_startup,
+    "run_command": _bench_run_command,
+    "run_command_stream": _bench_run_command_stream,
+    "version_compare": _bench_version_compare,
+}
+
+
+def _fake_executable(path: Path, script: str) -> Path:
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(0o755)
+    return path
+
+
+def _write_config(tmp: Path) -> Path:
+    password = tmp / "smtp_password"
+    password.write_text("benchmark-password\n")
+    password.chmod(0o600)
+    path = tmp / "sysmaint.conf"
+    path.write_text(
+        "[email]\nfrom = box@example.com\nto = ops@example.com\n"
+        f"smtp_server = smtp.example.com\nsmtp_port = 587\npassword_file = {password}\n\n"
+        "[update]\nauto_reboot = false\nreboot_window_start = 03:00\n"
+        "reboot_window_end = 05:00\ninclude_dist_upgrade = true\n\n"
+        "[notify]\non_success = true\non_no_changes = false\n\n"
+        "[monitor]\ndisk_threshold_percent = 85\n"
+        "services = " + ",".join(f"svc{i}" for i in range(50)) + "\n"
+    )
+    return path
+
+
+# --- Timing, storage, comparison -------------------------------------------
+
+
+def measure(
+    name: str, fn: Callable[[], object], *, repeat: int = 5, min_time: float = 0.2
+) -> BenchResult:
+    """Time `fn` timeit-style; see the module docstring."""
+    loops = 1
+    while True:
+        elapsed = _sample(fn, loops)
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    samples = [elapsed / loops] + [_sample(fn, loops) / loops for _ in range(repeat - 1)]
+    return BenchResult(name, best=min(samples), median=statistics.median(samples), loops=loops)
+
+
+def _sample(fn: Callable[[], object], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter() - start
+
+
+def run(
+    names: Iterable[str] | None = None, *, repeat: int = 5, min_time: float = 0.2
+) -> list[BenchResult]:
+    """Run the named benchmarks (all by default) in a scratch directory."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="sysmaint-bench-") as tmp:
+        for name in names if names is not None else BENCHMARKS:
+            bench_dir = Path(tmp) / name
+            bench_dir.mkdir()
+            fn = BENCHMARKS[name](bench_dir)
+            results.append(measure(name, fn, repeat=repeat, min_time=min_time))
+    return results
+
+
+def save(path: Path, results: list[BenchResult]) -> None:
+    state.write_json(
+        path,
+        {
+            "version": _RESULTS_VERSION,
+            "sysmaint": __version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "recorded": dt.datetime.now().isoformat(timespec="seconds"),
+            "results": {r.name: r.to_dict() for r in results},
+        },
+    )
+
+
+def load(path: Path) -> dict[str, BenchResult]:
+    """Results from a save(). Raises OSError / ValueError if unreadable."""
+    data = state.read_json(path)
+    if data.get("version") != _RESULTS_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark results version {data.get('version')!r}")
+    return {
+        name: BenchResult(name, best=r["best"], median=r["median"], loops=r["loops"])
+        for name, r in data["results"].items()
+    }
+
+
+def compare(baseline: dict[str, BenchResult], current: list[BenchResult]) -> list[Comparison]:
+    """Pair each current result with its baseline (benchmarks new since are skipped)."""
+    return [
+        Comparison(r.name, baseline[r.name].best, r.best) for r in current if r.name in baseline
+    ]
+
+
+def render(results: list[BenchResult], comparisons: list[Comparison], threshold: float) -> str:
+    by_name = {c.name: c for c in comparisons}
+    lines = [f"sysmaint {__version__} benchmarks (python {platform.python_version()})", ""]
+    header = f"{'benchmark':<22} {'best':>11} {'median':>11} {'loops':>7}"
+    lines.append(header + (f" {'baseline':>11} {'change':>8}" if comparisons else ""))
+    for r in results:
+        line = f"{r.name:<22} {_fmt(r.best):>11} {_fmt(r.median):>11} {r.loops:>7}"
+        c = by_name.get(r.name)
+        if c:
+            flag = "  REGRESSION" if c.ratio > threshold else ""
+            line += f" {_fmt(c.baseline):>11} {c.ratio - 1:>+8.0%}{flag}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def execute(
+    *,
+    names: list[str] | None = None,
+    save_path: Path | None = None,
+    compare_path: Path | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+    repeat: int = 5,
+) -> int:
+    """CLI entry point. Returns 1 if a benchmark regressed past `threshold`."""
+    unknown = sorted(set(names or ()) - set(BENCHMARKS))
+    if unknown:
+        print(f"sysmaint: unknown benchmark(s): {', '.join(unknown)}", file=sys.stderr)
+        print(f"  available: {', '.join(BENCHMARKS)}", file=sys.stderr)
+        return 2
+    baseline: dict[str, BenchResult] = {}
+    if compare_path:
+        try:
+            baseline = load(compare_path)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            print(f"sysmaint: cannot read baseline {compare_path}: {exc}", file=sys.stderr)
+            return 2
+
+    results = run(names, repeat=repeat)
+    comparisons = compare(baseline, results)
+    print(render(results, comparisons, threshold))
+    if save_path:
+        save(save_path, results)
+        print(f"\nSaved results to {save_path}")
+    regressed = [c.name for c in comparisons if c.ratio > threshold]
+    if regressed:
+        print(
+            f"\n{len(regressed)} benchmark(s) more than {threshold:.2f}x slower than "
+            f"{compare_path}: {', '.join(regressed)}"
+        )
+        return 1
+    return 0
@@ -0,0 +1,63 @@
+"""`sysmaint cache-serve` — run the fleet's shared apt cache on this node.
+
+Point the other hosts at it with [update] apt_proxy = http://<this host>:3142.
+Runs in the foreground until interrupted (or stopped by systemd). List the
+fleet's mirrors with --mirror to proxy only those.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+
+from sysmaint.core import aptcache
+
+
+def execute(
+    logger: logging.Logger,
+    *,
+    listen: str = "0.0.0.0",
+    port: int = aptcache.DEFAULT_PORT,
+    cache_dir: Path = aptcache.DEFAULT_CACHE_DIR,
+    max_age_days: float = aptcache.DEFAULT_MAX_AGE_DAYS,
+    mirrors: Sequence[str] = (),
+) -> int:
+    """Serve until interrupted. Returns 0 on a clean stop, 1 if the port can't be
+    bound, 2 if a mirror isn't a valid host[:port]."""
+    try:
+        cache = aptcache.AptCache(cache_dir, logger=logger, mirrors=mirrors)
+    except ValueError as exc:
+        logger.error("%s", exc)
+        return 2
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        server = aptcache.make_server(cache, listen, port)
+    except OSError as exc:
+        logger.error("Cannot serve apt cache on %s:%d (%s): %s", listen, port, cache_dir, exc)
+        return 1
+
+    pruned = cache.prune(max_age_days)
+    if pruned:
+        logger.info("Pruned %d package(s) unused for %g days", pruned, max_age_days)
+    logger.info("Serving apt cache from %s on http://%s:%d/", cache_dir, listen, port)
+    if mirrors:
+        logger.info("Proxying only to: %s", ", ".join(sorted(cache.mirrors)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = cache.stats
+        logger.info(
+            "apt cache stopped: %d hit(s), %d miss(es), %d revalidated, %d stale; "
+            "%d bytes from upstream, %d bytes served",
+            stats.hits,
+            stats.misses,
+            stats.revalidated,
+            stats.stale,
+            stats.bytes_upstream,
+            stats.bytes_served,
+        )
+    return 0
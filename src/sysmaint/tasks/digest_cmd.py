@@ -0,0 +1,53 @@
+"""`sysmaint digest send` — merge the fleet's spooled run records into one email."""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+
+from sysmaint.core import digest
+from sysmaint.core import email as email_mod
+from sysmaint.core.config import Config
+
+
+def execute(config: Config, logger: logging.Logger, *, keep: bool = False) -> int:
+    """Send the digest. Returns 0 on success, 1 if the email failed.
+
+    Records are removed after a successful send unless `keep` is set; on
+    failure they go back to the spool so the next attempt includes them.
+    """
+    spool = config.notify.digest_dir
+    try:
+        records, paths = digest.claim_records(spool, logger)
+    except OSError as exc:
+        logger.error("Cannot claim digest records in %s: %s", spool, exc)
+        print(f"Failed: {exc}")
+        return 1
+    logger.info("Digest: %d host record(s) in %s", len(records), spool)
+
+    subject, body = digest.render_digest(records)
+    try:
+        email_mod.send_email(
+            from_addr=config.email.from_addr,
+            to_addr=config.email.to_addr,
+            smtp_server=config.email.smtp_server,
+            smtp_port=config.email.smtp_port,
+            password=config.email.password,
+            subject=subject,
+            body=body,
+            logger=logger,
+        )
+    except email_mod.EmailError as exc:
+        logger.error("Failed to send digest email: %s", exc)
+        print(f"Failed: {exc}")
+        digest.release_records(paths, spool)
+        return 1
+
+    if keep:
+        digest.release_records(paths, spool)
+    else:
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+    print(f"Sent digest for {len(records)} host(s) to {config.email.to_addr}")
+    return 0
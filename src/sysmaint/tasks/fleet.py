@@ -0,0 +1,327 @@
+"""`sysmaint fleet update` — drive `sysmaint update` across many hosts over SSH.
+
+The per-host timer spreads load with a 2h `RandomizedDelaySec`; that keeps
+a fleet from stampeding the mirror but makes a fleet-wide run slow and
+hard to watch. This command runs the update as a controlled wave instead:
+
+- hosts come from an inventory file (one per line, `#` comments),
+- at most `concurrency` hosts run at once,
+- hosts are taken in rolling batches; each batch finishes before the next
+  starts, so a bad package shows up on the first batch, not on all of them,
+- once more than `max_failures` hosts fail, no new hosts are started
+  (in-flight ones are allowed to finish) and the rest are reported skipped.
+
+Every host gets the same remote command the timer would run, so per-host
+behavior (locking, email, reboot window) is unchanged. Runs from any box
+with SSH access; it does not need a local sysmaint config.
+
+A host that auto-reboots at the end of its run drops the SSH session, and
+ssh exits 255 just as it does for a host it never reached. The remote
+run's "Triggering auto-reboot" log line tells the two apart; such a host
+is then polled until it answers with an uptime younger than this run and
+reported "rebooted", or "unreachable" if it doesn't come back in time.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import shlex
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sysmaint.core.runner import CommandResult, run_command
+
+DEFAULT_SSH = "ssh -o BatchMode=yes -o ConnectTimeout=15"
+REMOTE_UPDATE = ("sudo", "-n", "sysmaint", "update")
+# Matches TimeoutStartSec in sysmaint-update.service.
+DEFAULT_HOST_TIMEOUT_SEC = 2 * 60 * 60
+# How long a host that rebooted itself gets to come back.
+DEFAULT_REBOOT_WAIT_SEC = 10 * 60
+_REBOOT_POLL_SEC = 15
+_PROBE_TIMEOUT_SEC = 60
+# apt_update.maybe_reboot logs this (on stderr, which ssh relays) right
+# before it runs `systemctl reboot`.
+_REBOOT_LOG = "Triggering auto-reboot now"
+
+OK = "ok"
+REBOOTED = "rebooted"
+FAILED = "failed"
+BUSY = "busy"
+CONFIG_ERROR = "config-error"
+UNREACHABLE = "unreachable"
+TIMEOUT = "timeout"
+SKIPPED = "skipped"
+
+# Remote exit codes → status. 1/2/3 are `sysmaint`'s own (see cli.py);
+# 255 is ssh's "couldn't connect or authenticate".
+_EXIT_STATUS = {0: OK, 1: FAILED, 2: CONFIG_ERROR, 3: BUSY, 255: UNREACHABLE}
+# Statuses that count toward --max-failures. BUSY means another run is
+# already in progress on that host, which is not a failure of this wave.
+_FAILURE_STATUSES = frozenset({FAILED, CONFIG_ERROR, UNREACHABLE, TIMEOUT})
+
+
+@dataclass(frozen=True)
+class HostResult:
+    host: str
+    status: str
+    returncode: int | None = None
+    duration: float = 0.0
+    detail: str = ""  # last line of remote output, for the summary table
+
+    @property
+    def failed(self) -> bool:
+        return self.status in _FAILURE_STATUSES
+
+
+@dataclass
+class FleetResult:
+    hosts: list[HostResult] = field(default_factory=list)
+    aborted: bool = False
+    duration: float = 0.0
+
+    @property
+    def failures(self) -> list[HostResult]:
+        return [h for h in self.hosts if h.failed]
+
+    def count(self, status: str) -> int:
+        return sum(1 for h in self.hosts if h.status == status)
+
+
+def load_inventory(path: Path | str) -> list[str]:
+    """Read hosts (or `user@host` targets) from an inventory file.
+
+    One target per line; blank lines and `#` comments are ignored and
+    duplicates keep their first position.
+    """
+    hosts: list[str] = []
+    seen: set[str] = set()
+    for raw in Path(path).read_text().splitlines():
+        host = raw.split("#", 1)[0].strip()
+        if host and host not in seen:
+            seen.add(host)
+            hosts.append(host)
+    return hosts
+
+
+def run_fleet(
+    hosts: Sequence[str],
+    *,
+    remote_command: Sequence[str] = REMOTE_UPDATE,
+    ssh_command: Sequence[str] = tuple(shlex.split(DEFAULT_SSH)),
+    concurrency: int = 10,
+    batch_size: int | None = None,
+    max_failures: int | None = None,
+    timeout: int = DEFAULT_HOST_TIMEOUT_SEC,
+    reboot_wait: float = DEFAULT_REBOOT_WAIT_SEC,
+    logger: logging.Logger | None = None,
+    on_result: Callable[[HostResult], None] | None = None,
+) -> FleetResult:
+    """Run `remote_command` on every host and aggregate the outcome.
+
+    Args:
+        concurrency: Hosts running at the same time.
+        batch_size: Hosts per rolling batch (default: one batch of everything).
+        max_failures: Stop starting hosts once more than this many have
+            failed. None never aborts.
+        reboot_wait: Seconds a host that rebooted itself has to answer again.
+        on_result: Called (from the calling thread) as each host finishes.
+    """
+    start = time.monotonic()
+    fleet = FleetResult()
+    size = batch_size or len(hosts) or 1
+    batches = [list(hosts[i : i + size]) for i in range(0, len(hosts), size)]
+
+    def record(result: HostResult) -> None:
+        fleet.hosts.append(result)
+        if on_result:
+            on_result(result)
+
+    def over_limit() -> bool:
+        return max_failures is not None and len(fleet.failures) > max_failures
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, concurrency), thread_name_prefix="sysmaint-fleet"
+    ) as pool:
+        for number, batch in enumerate(batches, start=1):
+            if fleet.aborted:
+                for host in batch:
+                    record(HostResult(host=host, status=SKIPPED))
+                continue
+            if logger:
+                logger.info("Batch %d/%d: %d host(s)", number, len(batches), len(batch))
+
+            queue = list(batch)
+            running: dict[Future[HostResult], str] = {}
+            while queue or running:
+                while queue and len(running) < concurrency and not fleet.aborted:
+                    host = queue.pop(0)
+                    future = pool.submit(
+                        _run_host, host, ssh_command, remote_command, timeout, reboot_wait, logger
+                    )
+                    running[future] = host
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    record(future.result())
+                if not fleet.aborted and over_limit():
+                    fleet.aborted = True
+                    if logger:
+                        logger.error(
+                            "Aborting fleet run: %d failure(s) exceeds max_failures=%d",
+                            len(fleet.failures),
+                            max_failures,
+                        )
+            for host in queue:
+                record(HostResult(host=host, status=SKIPPED))
+
+    fleet.duration = time.monotonic() - start
+    return fleet
+
+
+def _run_host(
+    host: str,
+    ssh_command: Sequence[str],
+    remote_command: Sequence[str],
+    timeout: int,
+    reboot_wait: float,
+    logger: logging.Logger | None,
+) -> HostResult:
+    if logger:
+        logger.info("%s: starting", host)
+    started = time.monotonic()
+    try:
+        result = run_command(
+            # "--": an inventory entry can't be taken for an ssh option.
+            [*ssh_command, "--", host, *remote_command],
+            timeout=timeout,
+            check=False,
+            stream=True,
+            capture_lines=20,
+        )
+    except OSError as exc:
+        # The ssh binary itself couldn't be executed.
+        return HostResult(host=host, status=UNREACHABLE, detail=str(exc))
+
+    status = TIMEOUT if result.timed_out else _EXIT_STATUS.get(result.returncode, FAILED)
+    detail = _last_line(result)
+    if status == UNREACHABLE and _REBOOT_LOG in result.stderr:
+        if logger:
+            logger.info("%s: rebooting; waiting up to %.0fs for it", host, reboot_wait)
+        status, detail = _await_reboot(host, ssh_command, started, reboot_wait)
+    host_result = HostResult(
+        host=host,
+        status=status,
+        returncode=None if result.timed_out else result.returncode,
+        duration=time.monotonic() - started if status == REBOOTED else result.duration,
+        detail=detail,
+    )
+    if logger:
+        log = logger.error if host_result.failed else logger.info
+        log("%s: %s in %.0fs", host, host_result.status, host_result.duration)
+    return host_result
+
+
+def _await_reboot(
+    host: str, ssh_command: Sequence[str], started: float, wait: float
+) -> tuple[str, str]:
+    """(status, detail) for a host that rebooted itself after `started`."""
+    deadline = time.monotonic() + wait
+    while True:
+        probe = run_command(
+            [*ssh_command, "--", host, "cat", "/proc/uptime"],
+            timeout=_PROBE_TIMEOUT_SEC,
+            check=False,
+        )
+        if probe.returncode == 0:
+            # Up for less time than this run took: it did reboot, and is back.
+            with contextlib.suppress(ValueError, IndexError):
+                if float(probe.stdout.split()[0]) < time.monotonic() - started:
+                    return REBOOTED, "rebooted and back up"
+        if time.monotonic() >= deadline:
+            return UNREACHABLE, f"rebooted and not back after {wait:.0f}s"
+        time.sleep(_REBOOT_POLL_SEC)
+
+
+def _last_line(result: CommandResult) -> str:
+    for text in (result.stderr, result.stdout):
+        lines = [line for line in text.splitlines() if line.strip()]
+        if lines:
+            return lines[-1].strip()[:200]
+    return ""
+
+
+def render_summary(fleet: FleetResult) -> str:
+    """Plain-text table: failures first, then everything else by host name."""
+    order = {
+        TIMEOUT: 0, UNREACHABLE: 0, FAILED: 0, CONFIG_ERROR: 0,
+        BUSY: 1, SKIPPED: 2, OK: 3, REBOOTED: 3,
+    }
+    rows = sorted(fleet.hosts, key=lambda h: (order.get(h.status, 0), h.host))
+    width = max((len(h.host) for h in rows), default=4)
+
+    lines = [
+        f"=== sysmaint fleet update: {len(fleet.hosts)} host(s) in {fleet.duration:.0f}s ===",
+        "  "
+        + "   ".join(
+            f"{status}: {fleet.count(status)}"
+            for status in (OK, REBOOTED, FAILED, UNREACHABLE, TIMEOUT, CONFIG_ERROR, BUSY, SKIPPED)
+            if fleet.count(status)
+        ),
+    ]
+    if fleet.aborted:
+        lines.append("  ABORTED: failure threshold exceeded; remaining hosts were skipped")
+    lines.append("")
+    for h in rows:
+        took = f"{h.duration:6.0f}s" if h.status != SKIPPED else "      -"
+        detail = f"  {h.detail}" if h.detail and h.status not in (OK, REBOOTED) else ""
+        lines.append(f"  [{h.status:12s}] {h.host:{width}s} {took}{detail}")
+    return "\n".join(lines)
+
+
+def execute(
+    logger: logging.Logger,
+    *,
+    inventory: Path,
+    concurrency: int,
+    batch_size: int | None,
+    max_failures: int | None,
+    ssh: str,
+    timeout: int,
+    security_only: bool = False,
+) -> int:
+    """CLI entry point. Returns 0 when every host succeeded (or was busy)."""
+    try:
+        hosts = load_inventory(inventory)
+    except OSError as exc:
+        print(f"sysmaint: cannot read inventory {inventory}: {exc}")
+        return 2
+    if not hosts:
+        print(f"sysmaint: inventory {inventory} lists no hosts")
+        return 2
+
+    remote = [*REMOTE_UPDATE, "--security-only"] if security_only else list(REMOTE_UPDATE)
+    logger.info(
+        "Fleet update: %d host(s), concurrency=%d, batch_size=%s, max_failures=%s",
+        len(hosts),
+        concurrency,
+        batch_size or "all",
+        "none" if max_failures is None else max_failures,
+    )
+    fleet = run_fleet(
+        hosts,
+        remote_command=remote,
+        ssh_command=shlex.split(ssh),
+        concurrency=concurrency,
+        batch_size=batch_size,
+        max_failures=max_failures,
+        timeout=timeout,
+        logger=logger,
+    )
+    print(render_summary(fleet))
+    return 1 if fleet.failures or fleet.aborted else 0
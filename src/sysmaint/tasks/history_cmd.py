@@ -0,0 +1,93 @@
+"""`sysmaint history` — step-duration and package-count trends from past runs.
+
+Reads /var/lib/sysmaint/history.db read-only and prints, per apt step,
+how many runs it appeared in, how many failed, and p50/p95/max duration,
+plus the same percentiles for packages touched per run. Like `status`, it
+needs no config and never touches SMTP.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+import sys
+from pathlib import Path
+
+from sysmaint.core import history
+
+
+def execute(
+    *,
+    db: Path = history.DEFAULT_HISTORY_DB,
+    step: str | None = None,
+    since: dt.date | None = None,
+    until: dt.date | None = None,
+    failures_only: bool = False,
+) -> int:
+    """Print the report. Returns 0, or 1 if the database can't be read."""
+    if not db.exists():
+        print(f"No run history yet ({db} does not exist).")
+        return 0
+    window = (
+        _epoch(since) if since else 0.0,
+        # --until is inclusive: everything before the next midnight.
+        _epoch(until + dt.timedelta(days=1)) if until else float("inf"),
+    )
+    try:
+        conn = history.connect(db, readonly=True)
+        try:
+            stats = history.step_stats(
+                conn, step=step, since=window[0], until=window[1], failures_only=failures_only
+            )
+            packages = history.package_stats(
+                conn, since=window[0], until=window[1], failures_only=failures_only
+            )
+        finally:
+            conn.close()
+    except (sqlite3.Error, history.HistoryError) as exc:
+        print(f"sysmaint: cannot read {db}: {exc}", file=sys.stderr)
+        return 1
+    print(render(stats, packages, since=since, until=until, failures_only=failures_only))
+    return 0
+
+
+def render(
+    stats: list[history.StepStats],
+    packages: history.Distribution,
+    *,
+    since: dt.date | None = None,
+    until: dt.date | None = None,
+    failures_only: bool = False,
+) -> str:
+    window = f"{since or 'first run'} to {until or 'today'}"
+    title = f"sysmaint history: {packages.count} run(s), {window}"
+    if failures_only:
+        title += " (failures only)"
+    lines = [title, ""]
+    if not stats and not packages.count:
+        lines.append("No runs match.")
+        return "\n".join(lines)
+
+    lines.append(f"{'step':<30} {'runs':>5} {'fail':>5} {'p50':>8} {'p95':>8} {'max':>8}")
+    for s in stats:
+        d = s.duration
+        lines.append(
+            f"{s.step:<30} {d.count:>5} {s.failures:>5} "
+            f"{_secs(d.p50):>8} {_secs(d.p95):>8} {_secs(d.max):>8}"
+        )
+    if not stats:
+        lines.append("  (no matching steps)")
+    lines.append("")
+    lines.append(
+        f"{'packages per run':<30} {packages.count:>5} {'':>5} "
+        f"{packages.p50:>8.0f} {packages.p95:>8.0f} {packages.max:>8.0f}"
+    )
+    return "\n".join(lines)
+
+
+def _secs(value: float) -> str:
+    return f"{value:.1f}s"
+
+
+def _epoch(day: dt.date) -> float:
+    return dt.datetime.combine(day, dt.time()).timestamp()
@@ -147,6 +147,9 @@ to = {to_addr}
 smtp_server = {smtp_server}
 smtp_port = {smtp_port}
 password_file = {DEFAULT_PASSWORD_PATH}
+# queued: reports go to /var/spool/sysmaint/outbox and sysmaint-mail-flush.timer
+# delivers them with backoff. direct: send right away (queued on failure).
+delivery = direct
 
 [update]
 # When true, will reboot after an upgrade if /var/run/reboot-required exists
@@ -156,6 +159,17 @@ auto_reboot = {'true' if auto_reboot else 'false'}
 reboot_window_start = 03:00
 reboot_window_end = 05:00
 include_dist_upgrade = true
+# Skip upgrade/autoremove/autoclean when a simulation finds nothing pending.
+skip_if_unchanged = true
+# Fetch packages through a fleet node running `sysmaint cache-serve`, e.g.
+# http://cache1.lan:3142. Empty = straight to the mirror.
+apt_proxy =
+# Upgrade in batches of at most this many packages (plus whatever they
+# depend on), releasing the dpkg lock between batches. 0 = one transaction.
+batch_size = 0
+# With batch_size: start no batch after this many minutes; what's left is
+# upgraded next run. 0 = no deadline.
+batch_deadline_min = 0
 
 [notify]
 # Always emails on failure or reboot-required. These toggles only affect
@@ -179,6 +193,11 @@ def _install_systemd_units(logger: logging.Logger) -> None:
         "sysmaint-update.timer",
         "sysmaint-pihole.service",
         "sysmaint-pihole.timer",
+        "sysmaint-mail-flush.service",
+        "sysmaint-mail-flush.timer",
+        "sysmaint-prefetch.service",
+        "sysmaint-prefetch.timer",
+        "sysmaint-cache-serve.service",
     ]
     for name in units:
         src_path = resources.files("sysmaint.data.systemd").joinpath(name)
@@ -191,16 +210,21 @@ def _install_systemd_units(logger: logging.Logger) -> None:
 
 
 def _enable_default_timers(logger: logging.Logger) -> None:
-    """Turn on the weekly update timer. Pi-hole timer stays disabled."""
+    """Turn on the weekly update and mail-flush timers. Pi-hole timer stays disabled."""
     run_command(
-        ["systemctl", "enable", "--now", "sysmaint-update.timer"],
+        ["systemctl", "enable", "--now", "sysmaint-update.timer", "sysmaint-mail-flush.timer"],
         timeout=30,
         logger=logger,
     )
     print()
     print("Enabled: sysmaint-update.timer (weekly, Sun ~03:00 + jitter)")
+    print("Enabled: sysmaint-mail-flush.timer (delivers queued email every 15 min)")
     print("Not enabled: sysmaint-pihole.timer (only enable on DNS boxes)")
     print("  → sudo systemctl enable --now sysmaint-pihole.timer")
+    print("Not enabled: sysmaint-prefetch.timer (downloads upgrades Saturday night;")
+    print("  worth it on slow links) → sudo systemctl enable --now sysmaint-prefetch.timer")
+    print("Not enabled: sysmaint-cache-serve.service (shared apt cache; one node per fleet)")
+    print("  → sudo systemctl enable --now sysmaint-cache-serve.service")
 
 
 def _send_test_email(logger: logging.Logger) -> None:
@@ -257,6 +281,11 @@ def uninstall(logger: logging.Logger) -> int:
         "sysmaint-update.service",
         "sysmaint-pihole.timer",
         "sysmaint-pihole.service",
+        "sysmaint-mail-flush.timer",
+        "sysmaint-mail-flush.service",
+        "sysmaint-prefetch.timer",
+        "sysmaint-prefetch.service",
+        "sysmaint-cache-serve.service",
     ]
     for name in units:
         # Best-effort disable; ignore failures (unit may already be gone).
@@ -0,0 +1,24 @@
+"""`sysmaint mail flush` — deliver the queued outbound mail that is due."""
+
+from __future__ import annotations
+
+import logging
+
+from sysmaint.core import mailqueue
+from sysmaint.core.config import Config
+
+
+def flush(config: Config, logger: logging.Logger, *, force: bool = False) -> int:
+    """Returns 0 when the outbox is empty afterwards or only holds deferred
+    messages, 1 when the server rejected the credentials.
+
+    Deferred messages are the queue working as intended (the next timer fire
+    retries them), so they don't fail the unit.
+    """
+    result = mailqueue.flush(config, logger, force=force)
+    remaining = len(mailqueue.queued(mailqueue.DEFAULT_OUTBOX))
+    print(
+        f"Sent {result.sent}, deferred {result.deferred}, expired {result.expired}; "
+        f"{remaining} message(s) left in {mailqueue.DEFAULT_OUTBOX}"
+    )
+    return 1 if result.auth_failed else 0
@@ -10,7 +10,7 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
-from sysmaint.core import email as email_mod
+from sysmaint.core import mailqueue
 from sysmaint.core.config import Config
 from sysmaint.core.runner import CommandError, run_command
 
@@ -47,17 +47,8 @@ def execute(config: Config, logger: logging.Logger) -> bool:
         )
 
     try:
-        email_mod.send_email(
-            from_addr=config.email.from_addr,
-            to_addr=config.email.to_addr,
-            smtp_server=config.email.smtp_server,
-            smtp_port=config.email.smtp_port,
-            password=config.email.password,
-            subject=subject,
-            body=body,
-            logger=logger,
-        )
-    except email_mod.EmailError as exc:
-        logger.error("Failed to send Pi-hole notification: %s", exc)
+        mailqueue.deliver(config, subject=subject, body=body, logger=logger)
+    except OSError as exc:
+        logger.error("Failed to send or queue Pi-hole notification: %s", exc)
 
     return result.succeeded
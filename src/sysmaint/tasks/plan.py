@@ -0,0 +1,70 @@
+"""`sysmaint update --plan` — what an upgrade would change, without apt.
+
+Compares dpkg's installed versions with the candidates in apt's package
+indexes (core/apt_index.py) and prints the pending upgrades. Nothing is
+locked, downloaded or installed, and no config is needed, so it is safe
+to run as any user at any time; with a warm index cache it answers in a
+fraction of a second.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from sysmaint.core import apt_index, dpkg, fingerprint
+
+
+def execute(*, security_only: bool = False) -> int:
+    """Print the plan (just the security upgrades with `security_only`).
+
+    Returns 0, or 1 if dpkg's database or apt's indexes can't be read.
+    """
+    started = time.perf_counter()
+    try:
+        installed = dpkg.read_status(dpkg.DPKG_STATUS)
+    except OSError as exc:
+        print(f"sysmaint: cannot read installed packages: {exc}", file=sys.stderr)
+        return 1
+    lists_dir = fingerprint.APT_LISTS_DIR
+    try:
+        index, cached = apt_index.load(lists_dir, apt_index.DEFAULT_INDEX_CACHE)
+    except OSError as exc:
+        print(f"sysmaint: cannot read package indexes: {exc}", file=sys.stderr)
+        return 1
+    pending, held = apt_index.pending_upgrades(installed, index)
+    if security_only:
+        pending, held = apt_index.security_only(pending), apt_index.security_only(held)
+    elapsed = time.perf_counter() - started
+
+    if not len(index):
+        print(f"No package indexes in {lists_dir}; run `sudo apt-get update` first.")
+        return 0
+    print(render(pending, held))
+    print()
+    print(
+        f"Computed in {elapsed:.2f}s from {len(installed)} installed and {len(index)} "
+        f"available packages ({'cached' if cached else 'freshly built'} index)."
+    )
+    if apt_index.pins_configured(apt_index.APT_PREFERENCES):
+        print("Note: apt pins in /etc/apt/preferences are not applied to this plan.")
+    return 0
+
+
+def render(
+    pending: list[apt_index.PendingUpgrade], held: list[apt_index.PendingUpgrade]
+) -> str:
+    lines = [f"{len(pending)} upgrade(s) pending"]
+    if pending:
+        lines.append("")
+        lines.extend(_row(u) for u in pending)
+    if held:
+        lines.append("")
+        lines.append(f"Held back by `apt-mark hold` ({len(held)}):")
+        lines.extend(_row(u) for u in held)
+    return "\n".join(lines)
+
+
+def _row(upgrade: apt_index.PendingUpgrade) -> str:
+    suite = upgrade.release.suite or "(unknown suite)"
+    return f"  {upgrade.name:<32} {upgrade.installed} -> {upgrade.candidate}  [{suite}]"
@@ -0,0 +1,162 @@
+"""`sysmaint update --prefetch-only` — download this week's upgrades ahead of time.
+
+On a slow link most of a weekly run is `dist-upgrade` downloading debs
+while dpkg holds its lock. The prefetch stage (sysmaint-prefetch.timer,
+hours before the update timer) runs `apt-get update` and the host's
+upgrade command with `-d`, which only fills /var/cache/apt/archives. The
+real run then finds every deb already cached and only unpacks.
+
+Both apt steps run at idle IO priority and lowest CPU priority so a
+prefetch never competes with the box's real workload. What was fetched is
+recorded in PREFETCH_STATE; the weekly run reads it to report how much of
+its upgrade came from the warm cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sysmaint.core import state
+from sysmaint.core.apt_output import AptOutputParser
+from sysmaint.core.config import Config
+from sysmaint.core.runner import APT_ENV, CommandResult, apt_command, run_command
+from sysmaint.tasks.apt_update import security_upgrades, upgrade_args
+
+PREFETCH_STATE = state.STATE_DIR / "prefetch.json"
+_PREFETCH_TIMEOUT_SEC = 2 * 60 * 60  # slow links are the point; be patient
+# A prefetch older than this describes a different week's upgrades.
+_MAX_AGE_SEC = 7 * 24 * 60 * 60
+
+
+@dataclass
+class PrefetchOutcome:
+    results: list[CommandResult] = field(default_factory=list)
+    pending: int = 0  # packages the upgrade would touch
+    fetched: dict[str, str] = field(default_factory=dict)  # name -> version
+
+    @property
+    def succeeded(self) -> bool:
+        return all(r.succeeded for r in self.results)
+
+
+def low_priority(cmd: list[str]) -> list[str]:
+    """Wrap `cmd` in `ionice -c3` (idle IO) and `nice -n19` where available."""
+    wrapped = list(cmd)
+    if shutil.which("nice"):
+        wrapped = ["nice", "-n", "19", *wrapped]
+    if shutil.which("ionice"):
+        wrapped = ["ionice", "-c", "3", *wrapped]
+    return wrapped
+
+
+def run_prefetch(
+    config: Config, logger: logging.Logger, *, security_only: bool = False
+) -> PrefetchOutcome:
+    """Refresh the lists and download (without installing) pending upgrades.
+
+    A security-only prefetch downloads just the security upgrades the
+    refreshed lists offer, as the run itself will install them.
+    """
+    outcome = PrefetchOutcome()
+    parser = AptOutputParser()
+    proxy = config.update.apt_proxy
+    outcome.results.append(_run_low_priority(apt_command(["update"], proxy=proxy), logger))
+    if not outcome.succeeded:
+        return outcome  # stale lists would fetch the wrong versions
+
+    if security_only:
+        packages = security_upgrades(logger)
+        if not packages:
+            return outcome
+        upgrade = upgrade_args(config, security_only=True, packages=packages)
+    else:
+        upgrade = upgrade_args(config)
+    outcome.results.append(
+        _run_low_priority(apt_command(["-d", *upgrade], proxy=proxy), logger, parser)
+    )
+    outcome.pending = parser.upgraded + parser.installed
+    outcome.fetched = dict(parser.downloaded)
+    return outcome
+
+
+def _run_low_priority(
+    cmd: list[str], logger: logging.Logger, parser: AptOutputParser | None = None
+) -> CommandResult:
+    return run_command(
+        low_priority(cmd),
+        timeout=_PREFETCH_TIMEOUT_SEC,
+        env=APT_ENV,
+        check=False,
+        logger=logger,
+        stream=True,
+        line_consumers=[parser] if parser else (),
+    )
+
+
+def save_state(outcome: PrefetchOutcome, path: Path = PREFETCH_STATE) -> None:
+    """Record this prefetch, keeping what an earlier one this week fetched.
+
+    A second prefetch downloads nothing that's already cached, so without
+    the merge it would erase the record of the first.
+    """
+    previous = load_state(path) or {}
+    fetched = {**previous.get("fetched", {}), **outcome.fetched}
+    state.write_json(
+        path,
+        {
+            "finished": time.time(),
+            "succeeded": outcome.succeeded,
+            "pending": outcome.pending,
+            "fetched": fetched,
+        },
+    )
+
+
+def cache_hits(changes: Iterable[tuple[str, str]], path: Path = PREFETCH_STATE) -> int:
+    """How many of `changes` ((name, new version) pairs) a recent prefetch fetched.
+
+    Names may carry dpkg's ":arch" qualifier; the state is keyed by the
+    plain name apt's Get: lines show.
+    """
+    record = load_state(path)
+    if not record:
+        return 0
+    fetched = record.get("fetched", {})
+    return sum(
+        1 for name, version in changes if fetched.get(name.partition(":")[0]) == version
+    )
+
+
+def load_state(path: Path = PREFETCH_STATE, *, now: float | None = None) -> dict[str, Any] | None:
+    """The last prefetch's record, or None if missing, unreadable, or stale."""
+    try:
+        data = state.read_json(path)
+        finished = float(data["finished"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if (time.time() if now is None else now) - finished > _MAX_AGE_SEC:
+        return None
+    return dict(data)
+
+
+def execute(config: Config, logger: logging.Logger, *, security_only: bool = False) -> int:
+    """CLI entry point. Returns 0 if the lists refreshed and the download succeeded."""
+    logger.info("Starting sysmaint prefetch (security_only=%s)", security_only)
+    outcome = run_prefetch(config, logger, security_only=security_only)
+    try:
+        save_state(outcome)
+    except OSError as exc:
+        logger.warning("Could not record prefetch state in %s: %s", PREFETCH_STATE, exc)
+    logger.info(
+        "Prefetch complete: %d package(s) pending, %d downloaded now, %s",
+        outcome.pending,
+        len(outcome.fetched),
+        "ok" if outcome.succeeded else "FAILED",
+    )
+    return 0 if outcome.succeeded else 1
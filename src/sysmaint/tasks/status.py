@@ -3,58 +3,96 @@
 This is the "ssh in, type one command" tool. It prints to stdout and
 does NOT touch SMTP. Safe to run as any user (some fields may be empty
 when run unprivileged).
+
+Repeated calls within a minute are answered from a cache under /run
+(see core/status_cache.py); `--fresh` always re-checks. The probing
+modules (subprocess, the health snapshot) are imported only when a
+report is actually rendered, so a cache hit stays cheap.
 """
 
 from __future__ import annotations
 
-import subprocess
-
-from sysmaint.core import system
+from sysmaint.core import status_cache
 from sysmaint.core.config import DEFAULT_CONFIG_PATH, ConfigError, load_config
 
 UPDATE_TIMER = "sysmaint-update.timer"
 UPDATE_SERVICE = "sysmaint-update.service"
-
-
-def execute() -> int:
-    """Print a status report. Returns 0 always (informational command)."""
-    print(_render())
+PIHOLE_TIMER = "sysmaint-pihole.timer"
+
+
+def execute(*, fresh: bool = False, max_age: float = status_cache.DEFAULT_TTL_SEC) -> int:
+    """Print a status report. Returns 0 always (informational command).
+
+    A report cached less than `max_age` seconds ago, against the current
+    config and last completed update, is reused unless `fresh`.
+    """
+    path = status_cache.cache_path()
+    # Taken before rendering: a change made meanwhile makes this entry stale.
+    key = status_cache.validity_key(DEFAULT_CONFIG_PATH, status_cache.RUN_MARKER)
+    cached = None
+    if path is not None and not fresh:
+        cached = status_cache.load(path, key, max_age=max_age)
+    if cached is not None:
+        print(cached.text)
+        print(f"\n(cached {cached.age():.0f}s ago; `sysmaint status --fresh` to re-check)")
+        return 0
+
+    report = _render()
+    if path is not None:
+        status_cache.store(path, key, report)
+    print(report)
     return 0
 
 
 def _render() -> str:
-    lines: list[str] = []
-    host = system.get_host_info()
-    lines.append(f"sysmaint status — {host.hostname} ({host.fqdn})")
-    lines.append(f"{host.distro} — kernel {host.kernel} ({host.architecture})")
-    lines.append("")
+    from sysmaint.core.health import collect_snapshot
 
-    # Config
-    lines.append("--- Configuration ---")
+    lines: list[str] = []
+    # Config first: it decides which services the snapshot probes.
+    config_lines: list[str] = []
     if DEFAULT_CONFIG_PATH.exists():
-        lines.append(f"  config:        {DEFAULT_CONFIG_PATH}  (present)")
+        config_lines.append(f"  config:        {DEFAULT_CONFIG_PATH}  (present)")
         try:
             cfg = load_config()
-            lines.append(f"  notify to:     {cfg.email.to_addr}")
-            lines.append(f"  smtp:          {cfg.email.smtp_server}:{cfg.email.smtp_port}")
-            lines.append(f"  auto_reboot:   {cfg.update.auto_reboot}")
-            lines.append(f"  dist_upgrade:  {cfg.update.include_dist_upgrade}")
+            config_lines.append(f"  notify to:     {cfg.email.to_addr}")
+            config_lines.append(f"  smtp:          {cfg.email.smtp_server}:{cfg.email.smtp_port}")
+            config_lines.append(f"  auto_reboot:   {cfg.update.auto_reboot}")
+            config_lines.append(f"  dist_upgrade:  {cfg.update.include_dist_upgrade}")
             services_str = ", ".join(cfg.monitor.services) or "(none)"
-            lines.append(f"  watch:         {services_str}")
+            config_lines.append(f"  watch:         {services_str}")
         except ConfigError as exc:
-            lines.append(f"  config error:  {exc}")
+            config_lines.append(f"  config error:  {exc}")
             cfg = None
     else:
-        lines.append(f"  config:        {DEFAULT_CONFIG_PATH}  (MISSING — run `sudo sysmaint install`)")
+        config_lines.append(f"  config:        {DEFAULT_CONFIG_PATH}  (MISSING — run `sudo sysmaint install`)")
         cfg = None
+
+    snapshot = collect_snapshot(
+        cfg.monitor.services if cfg else (),
+        timers=(UPDATE_TIMER, PIHOLE_TIMER),
+        backend=cfg.monitor.systemd_backend if cfg else "auto",
+    )
+    host = snapshot.host
+    lines.append(f"sysmaint status — {host.hostname} ({host.fqdn})")
+    lines.append(f"{host.distro} — kernel {host.kernel} ({host.architecture})")
+    lines.append("")
+
+    # Config
+    lines.append("--- Configuration ---")
+    lines.extend(config_lines)
     lines.append("")
 
     # Timers
     lines.append("--- Scheduled timers ---")
-    for timer in (UPDATE_TIMER, "sysmaint-pihole.timer"):
-        lines.append(f"  {timer}")
-        info = _timer_info(timer)
-        for key, value in info.items():
+    for timer in snapshot.timers:
+        lines.append(f"  {timer.name}")
+        for key, value in (
+            ("state", timer.state),
+            ("loaded", timer.loaded),
+            ("next", timer.next),
+            ("last", timer.last),
+            ("result", timer.result),
+        ):
             lines.append(f"    {key:14s} {value}")
     lines.append("")
 
@@ -67,7 +105,7 @@ def _render() -> str:
     # Disk
     lines.append("--- Disks ---")
     threshold = cfg.monitor.disk_threshold_percent if cfg else 85
-    for disk in system.get_disk_usage():
+    for disk in snapshot.disks:
         flag = "  ALERT" if disk.used_percent >= threshold else ""
         lines.append(
             f"  {disk.mountpoint:10s} {disk.used_percent:3d}% "
@@ -78,60 +116,25 @@ def _render() -> str:
     # Services
     if cfg:
         lines.append("--- Services ---")
-        for svc in cfg.monitor.services:
-            status = system.get_service_status(svc)
+        for status in snapshot.services:
             marker = "OK" if status.active else "DOWN"
-            lines.append(f"  [{marker}] {svc:20s} {status.state}")
+            lines.append(f"  [{marker}] {status.name:20s} {status.state}")
         lines.append("")
 
     # Reboot
-    if system.reboot_required():
+    if snapshot.reboot_required:
         lines.append("*** REBOOT REQUIRED ***")
-        pkgs = system.reboot_required_packages()
-        if pkgs:
-            lines.append("    Triggered by: " + ", ".join(pkgs))
+        if snapshot.reboot_packages:
+            lines.append("    Triggered by: " + ", ".join(snapshot.reboot_packages))
     else:
         lines.append("Reboot: not required")
     return "\n".join(lines)
 
 
-def _timer_info(timer: str) -> dict[str, str]:
-    """Pull a few interesting fields from `systemctl show <timer>`."""
-    try:
-        proc = subprocess.run(
-            [
-                "systemctl",
-                "show",
-                timer,
-                "--property=ActiveState,LoadState,NextElapseUSecRealtime,LastTriggerUSec,Result",
-            ],
-            capture_output=True,
-            text=True,
-            timeout=10,
-            check=False,
-        )
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return {"state": "no-systemd"}
-
-    info: dict[str, str] = {}
-    for line in proc.stdout.splitlines():
-        if "=" not in line:
-            continue
-        key, _, value = line.partition("=")
-        info[key.lower()] = value or "(empty)"
-
-    # Map to friendlier labels.
-    summary: dict[str, str] = {}
-    summary["state"] = info.get("activestate", "?")
-    summary["loaded"] = info.get("loadstate", "?")
-    summary["next"] = info.get("nextelapseusecrealtime", "(not scheduled)")
-    summary["last"] = info.get("lasttriggerusec", "(never)")
-    summary["result"] = info.get("result", "?")
-    return summary
-
-
 def _last_journal_line(unit: str) -> str:
     """Tail the most recent journal entries for a unit (best-effort)."""
+    import subprocess
+
     try:
         proc = subprocess.run(
             ["journalctl", "-u", unit, "-n", "1", "--no-pager", "-o", "short"],
@@ -7,6 +7,7 @@ from pathlib import Path
 
 import pytest
 
+from sysmaint.core import dpkg
 from sysmaint.core.config import (
     Config,
     EmailConfig,
@@ -16,6 +17,13 @@ from sysmaint.core.config import (
 )
 
 
+@pytest.fixture(autouse=True)
+def _no_host_dpkg_status(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests must never read this machine's dpkg database; tests that need
+    one write their own and point dpkg.DPKG_STATUS at it."""
+    monkeypatch.setattr(dpkg, "DPKG_STATUS", tmp_path / "no-dpkg-status")
+
+
 @pytest.fixture
 def silent_logger() -> logging.Logger:
     """A logger that has a handler but writes to nowhere visible to tests."""
@@ -47,6 +55,7 @@ def example_config() -> Config:
         monitor=MonitorConfig(
             disk_threshold_percent=85,
             services=("sshd", "postfix"),
+            metrics_file=None,
         ),
     )
 
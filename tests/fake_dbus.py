@@ -0,0 +1,127 @@
+"""A tiny stand-in for the D-Bus system bus + systemd, for tests.
+
+Speaks the real wire protocol (via sysmaint.core.dbus's marshalling) on a
+Unix socket: SASL EXTERNAL, Hello, and org.freedesktop.DBus.Properties.GetAll
+on systemd unit object paths. Units are described as plain dicts:
+
+    FakeSystemdBus(path, units={
+        "ssh.service": {"LoadState": "loaded", "ActiveState": "active"},
+        "sysmaint-update.timer": {..., "NextElapseUSecRealtime": 1761361200000000},
+    })
+
+Unknown units answer like systemd does — LoadState=not-found, inactive.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import socket
+import threading
+from pathlib import Path
+from typing import Any
+
+from sysmaint.core import dbus
+from sysmaint.core.system import unit_object_path
+
+_TIMER_PROPERTIES = {"NextElapseUSecRealtime", "LastTriggerUSec", "Result"}
+
+
+def _variant(value: Any) -> tuple[str, Any]:
+    if isinstance(value, bool):
+        return ("b", value)
+    if isinstance(value, int):
+        return ("t", value)
+    return ("s", str(value))
+
+
+class FakeSystemdBus:
+    def __init__(self, path: Path, units: dict[str, dict[str, Any]]) -> None:
+        self.path = path
+        self.address = f"unix:path={path}"
+        self._paths = {unit_object_path(name): (name, props) for name, props in units.items()}
+        self.connections = 0
+        self.calls: list[tuple[str, str]] = []  # (member, object path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(str(path))
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self) -> FakeSystemdBus:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        with contextlib.suppress(OSError):
+            self._server.shutdown(socket.SHUT_RDWR)  # wakes the blocked accept()
+        self._server.close()
+        self._thread.join(timeout=2)
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn, contextlib.suppress(OSError):
+            buf = b""
+            # SASL: NUL byte, AUTH line, then BEGIN.
+            while b"\r\n" not in buf:
+                buf += conn.recv(4096)
+            line, _, buf = buf.partition(b"\r\n")
+            if not line.startswith(b"\0AUTH EXTERNAL "):
+                conn.sendall(b"REJECTED EXTERNAL\r\n")
+                return
+            conn.sendall(b"OK 0123456789abcdef0123456789abcdef\r\n")
+            while b"BEGIN\r\n" not in buf:
+                buf += conn.recv(4096)
+            buf = buf.partition(b"BEGIN\r\n")[2]
+
+            serial = 0
+            while True:
+                while len(buf) < 16 or len(buf) < dbus.message_length(buf):
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        return
+                    buf += chunk
+                size = dbus.message_length(buf)
+                msg, buf = dbus.decode_message(buf[:size]), buf[size:]
+                serial += 1
+                conn.sendall(self._reply(msg, serial))
+
+    def _reply(self, msg: dbus.Message, serial: int) -> bytes:
+        member = msg.fields.get(dbus.FIELD_MEMBER)
+        path = msg.fields.get(dbus.FIELD_PATH, "")
+        self.calls.append((str(member), str(path)))
+        reply_fields = {dbus.FIELD_REPLY_SERIAL: msg.serial}
+        if member == "Hello":
+            return dbus.encode_message(dbus.METHOD_RETURN, serial, reply_fields, "s", [":1.42"])
+        if member == "GetAll" and path in self._paths:
+            name, props = self._paths[path]
+            return self._properties(serial, reply_fields, msg.body[0], name, props)
+        if member == "GetAll" and str(path).startswith("/org/freedesktop/systemd1/unit/"):
+            if msg.body[0].endswith(".Timer"):
+                return self._error(serial, reply_fields, "org.freedesktop.DBus.Error.UnknownInterface")
+            not_found = {"LoadState": "not-found", "ActiveState": "inactive", "SubState": "dead"}
+            return self._properties(serial, reply_fields, msg.body[0], "?", not_found)
+        return self._error(serial, reply_fields, "org.freedesktop.DBus.Error.UnknownMethod")
+
+    @staticmethod
+    def _properties(
+        serial: int, fields: dict[int, Any], interface: str, name: str, props: dict[str, Any]
+    ) -> bytes:
+        on_timer = interface.endswith(".Timer")
+        values = {"Id": ("s", name)} if not on_timer else {}
+        for key, value in props.items():
+            if (key in _TIMER_PROPERTIES) == on_timer:
+                values[key] = _variant(value)
+        return dbus.encode_message(dbus.METHOD_RETURN, serial, fields, "a{sv}", [values])
+
+    @staticmethod
+    def _error(serial: int, fields: dict[int, Any], name: str) -> bytes:
+        return dbus.encode_message(
+            dbus.ERROR, serial, {**fields, dbus.FIELD_ERROR_NAME: name}, "s", ["nope"]
+        )
@@ -0,0 +1,238 @@
+"""Tests for sysmaint.core.apt_index and `sysmaint update --plan`."""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+from sysmaint.core import apt_index, dpkg, fingerprint
+from sysmaint.tasks import plan
+
+_DEB = "deb.debian.org_debian_dists_"
+
+
+def _packages(*entries: tuple[str, str, str]) -> str:
+    return "".join(
+        f"Package: {name}\nVersion: {version}\nArchitecture: {arch}\n"
+        f"Description: {name}\n long text\n\n"
+        for name, version, arch in entries
+    )
+
+
+def _release(suite: str, *, not_automatic: bool = False) -> str:
+    text = f"Origin: Debian\nLabel: Debian\nSuite: {suite}\nCodename: {suite}\n"
+    if not_automatic:
+        text += "NotAutomatic: yes\n"
+    return text + "SHA256:\n 0123 100 main/binary-amd64/Packages\n"
+
+
+@pytest.fixture
+def lists(tmp_path: Path) -> Path:
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / f"{_DEB}bookworm_InRelease").write_text(_release("stable"))
+    (lists / f"{_DEB}bookworm_main_binary-amd64_Packages").write_text(
+        _packages(
+            ("curl", "7.88.1-10+deb12u5", "amd64"),
+            ("libc6", "2.36-9+deb12u7", "amd64"),
+            ("tzdata", "2024a-0+deb12u1", "all"),
+            ("pinned", "2.0-1", "amd64"),
+        )
+    )
+    (lists / f"{_DEB}bookworm-security_InRelease").write_text(_release("stable-security"))
+    (lists / f"{_DEB}bookworm-security_main_binary-amd64_Packages").write_text(
+        _packages(("curl", "7.88.1-10+deb12u8", "amd64"), ("curl", "7.88.1-10+deb12u6", "amd64"))
+    )
+    (lists / f"{_DEB}bookworm-backports_InRelease").write_text(
+        _release("stable-backports", not_automatic=True)
+    )
+    (lists / f"{_DEB}bookworm-backports_main_binary-amd64_Packages").write_text(
+        _packages(("curl", "8.11.1-1~bpo12+1", "amd64"))
+    )
+    (lists / "repo.example.com_._Packages").write_text(_packages(("tool", "1.1", "amd64")))
+    return lists
+
+
+def _installed(*entries: tuple[str, str, str, str]) -> dict[str, dpkg.InstalledPackage]:
+    packages = {}
+    for name, version, arch, want in entries:
+        package = dpkg.InstalledPackage(name, version, arch, "installed", want=want)
+        packages[package.key] = package
+    return packages
+
+
+INSTALLED = _installed(
+    ("curl", "7.88.1-10+deb12u5", "amd64", "install"),
+    ("libc6", "2.36-9+deb12u7", "amd64", "install"),
+    ("tzdata", "2023c-5", "all", "install"),
+    ("pinned", "1.0-1", "amd64", "hold"),
+    ("tool", "1.0", "amd64", "install"),
+    ("local-only", "0.1", "amd64", "install"),
+)
+
+
+class TestBuild:
+    def test_highest_version_and_release_win(self, lists: Path) -> None:
+        index = apt_index.build(lists)
+        curl = index.candidate("curl:amd64")
+        assert curl is not None
+        assert curl.version == "7.88.1-10+deb12u8"
+        assert curl.release.suite == "stable-security"
+
+    def test_not_automatic_suites_are_not_candidates(self, lists: Path) -> None:
+        curl = apt_index.build(lists).candidate("curl:amd64")
+        assert curl is not None and "bpo" not in curl.version
+
+    def test_lists_without_release_are_indexed(self, lists: Path) -> None:
+        tool = apt_index.build(lists).candidate("tool:amd64")
+        assert tool is not None and tool.release.suite == ""
+
+    def test_malformed_versions_are_skipped(
+        self, lists: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        (lists / "third.party_._Packages").write_text(
+            _packages(("curl", "a:1.0", "amd64"), ("extra", "1:2.0", "amd64"), ("bad", "x:1", "all"))
+        )
+        index = apt_index.build(lists, logger=logging.getLogger("test"))
+        curl, extra = index.candidate("curl:amd64"), index.candidate("extra:amd64")
+        assert curl is not None and curl.version == "7.88.1-10+deb12u8"
+        assert extra is not None and extra.version == "1:2.0"
+        assert index.candidate("bad:all") is None
+        assert sum("invalid epoch" in r.getMessage() for r in caplog.records) == 2
+
+    def test_version_also_in_security_pocket_is_attributed_to_it(self, lists: Path) -> None:
+        # Read before the security list (names sort first), same version.
+        (lists / "aa.example.org_debian_dists_bookworm_main_binary-amd64_Packages").write_text(
+            _packages(("curl", "7.88.1-10+deb12u8", "amd64"))
+        )
+        curl = apt_index.build(lists).candidate("curl:amd64")
+        assert curl is not None and curl.release.security
+
+
+class TestSecurityPockets:
+    @pytest.mark.parametrize(
+        ("release", "security"),
+        [
+            (apt_index.Release("", suite="stable-security", codename="bookworm-security"), True),
+            (apt_index.Release("", suite="noble-security", label="Ubuntu"), True),
+            (apt_index.Release("", suite="oldoldstable", codename="stretch/updates"), True),
+            (apt_index.Release("", suite="oldoldstable", label="Debian-Security"), True),
+            (apt_index.Release("", suite="stable-updates", codename="bookworm-updates"), False),
+            (apt_index.Release("", suite="stable", codename="bookworm"), False),
+        ],
+    )
+    def test_classification(self, release: apt_index.Release, security: bool) -> None:
+        assert release.security is security
+
+    def test_security_only_keeps_security_candidates(self, lists: Path) -> None:
+        pending, _ = apt_index.pending_upgrades(INSTALLED, apt_index.build(lists))
+        assert [u.name for u in apt_index.security_only(pending)] == ["curl"]
+
+
+class TestPendingUpgrades:
+    def test_upgradable_and_held(self, lists: Path) -> None:
+        pending, held = apt_index.pending_upgrades(INSTALLED, apt_index.build(lists))
+        assert [(u.name, u.candidate) for u in pending] == [
+            ("curl", "7.88.1-10+deb12u8"),
+            ("tool", "1.1"),
+            ("tzdata", "2024a-0+deb12u1"),
+        ]
+        assert [u.name for u in held] == ["pinned"]
+
+
+class TestDependencies:
+    def test_names_from_the_wanted_version_only(self, tmp_path: Path) -> None:
+        lists = tmp_path / "lists"
+        lists.mkdir()
+        (lists / f"{_DEB}bookworm_main_binary-amd64_Packages").write_text(
+            "Package: curl\nVersion: 7.88.1-10+deb12u5\nDepends: libold\n\n"
+            "Package: curl\nVersion: 7.88.1-10+deb12u8\n"
+            "Depends: libc6 (>= 2.34), libcurl4 (= 7.88.1-10+deb12u8), zlib1g:any | zlib-ng\n"
+            "Pre-Depends: dpkg (>= 1.15)\n\n"
+            "Package: tzdata\nVersion: 2024a-0+deb12u1\n\n"
+        )
+        wanted = {"curl": "7.88.1-10+deb12u8", "tzdata": "2024a-0+deb12u1"}
+        assert apt_index.dependencies(wanted, lists) == {
+            "curl": {"libc6", "libcurl4", "zlib1g", "zlib-ng", "dpkg"},
+            "tzdata": set(),
+        }
+
+
+class TestCache:
+    def test_cache_hit_until_a_list_changes(self, lists: Path, tmp_path: Path) -> None:
+        cache = tmp_path / "cache" / "apt-index.json"
+        first, cached = apt_index.load(lists, cache)
+        assert not cached
+        second, cached = apt_index.load(lists, cache)
+        assert cached
+        assert second.candidate("curl:amd64") == first.candidate("curl:amd64")
+        assert len(second) == len(first)
+
+        security = lists / f"{_DEB}bookworm-security_main_binary-amd64_Packages"
+        security.write_text(_packages(("curl", "7.88.1-10+deb12u9", "amd64")))
+        st = security.stat()
+        os.utime(security, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        third, cached = apt_index.load(lists, cache)
+        assert not cached
+        curl = third.candidate("curl:amd64")
+        assert curl is not None and curl.version == "7.88.1-10+deb12u9"
+
+    def test_corrupt_cache_is_rebuilt(self, lists: Path, tmp_path: Path) -> None:
+        cache = tmp_path / "apt-index.json"
+        cache.write_text("{]")
+        index, cached = apt_index.load(lists, cache)
+        assert not cached and len(index) == 5
+
+
+class TestPlanCommand:
+    def test_prints_pending_upgrades(
+        self,
+        lists: Path,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        status = tmp_path / "status"
+        status.write_text(
+            "Package: curl\nStatus: install ok installed\nArchitecture: amd64\n"
+            "Version: 7.88.1-10+deb12u5\n\n"
+            "Package: pinned\nStatus: hold ok installed\nArchitecture: amd64\nVersion: 1.0-1\n"
+        )
+        monkeypatch.setattr(dpkg, "DPKG_STATUS", status)
+        monkeypatch.setattr(fingerprint, "APT_LISTS_DIR", lists)
+        monkeypatch.setattr(apt_index, "DEFAULT_INDEX_CACHE", tmp_path / "apt-index.json")
+        monkeypatch.setattr(apt_index, "APT_PREFERENCES", ())
+
+        assert plan.execute() == 0
+        out = capsys.readouterr().out
+        assert "1 upgrade(s) pending" in out
+        assert "curl" in out and "7.88.1-10+deb12u8  [stable-security]" in out
+        assert "Held back by `apt-mark hold` (1)" in out
+        assert "freshly built index" in out
+
+    def test_security_only_plan(
+        self,
+        lists: Path,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        status = tmp_path / "status"
+        status.write_text(
+            "Package: curl\nStatus: install ok installed\nArchitecture: amd64\n"
+            "Version: 7.88.1-10+deb12u5\n\n"
+            "Package: tzdata\nStatus: install ok installed\nArchitecture: all\n"
+            "Version: 2023c-5\n"
+        )
+        monkeypatch.setattr(dpkg, "DPKG_STATUS", status)
+        monkeypatch.setattr(fingerprint, "APT_LISTS_DIR", lists)
+        monkeypatch.setattr(apt_index, "DEFAULT_INDEX_CACHE", tmp_path / "apt-index.json")
+        monkeypatch.setattr(apt_index, "APT_PREFERENCES", ())
+
+        assert plan.execute(security_only=True) == 0
+        out = capsys.readouterr().out
+        assert "1 upgrade(s) pending" in out
+        assert "curl" in out and "tzdata" not in out
@@ -0,0 +1,107 @@
+"""Tests for sysmaint.core.apt_output — the streaming apt output parser."""
+
+from __future__ import annotations
+
+import itertools
+
+from sysmaint.core.apt_output import INSTALL, REMOVE, UPGRADE, AptOutputParser
+
+# Trimmed from a real `apt-get dist-upgrade` on Ubuntu 24.04.
+_DIST_UPGRADE = """\
+Reading package lists...
+Building dependency tree...
+Reading state information...
+Calculating upgrade...
+The following NEW packages will be installed:
+  linux-image-6.8.0-45-generic
+The following packages will be upgraded:
+  libssl3t64 openssl
+2 upgraded, 1 newly installed, 1 to remove and 0 not upgraded.
+Need to get 3,114 kB of archives.
+Get:1 http://archive.ubuntu.com/ubuntu noble-updates/main amd64 libssl3t64 amd64 3.0.13-0ubuntu3.4 [1,940 kB]
+Fetched 3,114 kB in 1s (3,020 kB/s)
+(Reading database ... 201934 files and directories currently installed.)
+Preparing to unpack .../0-libssl3t64_3.0.13-0ubuntu3.4_amd64.deb ...
+Unpacking libssl3t64:amd64 (3.0.13-0ubuntu3.4) over (3.0.13-0ubuntu3.1) ...
+Preparing to unpack .../1-openssl_3.0.13-0ubuntu3.4_amd64.deb ...
+Unpacking openssl (3.0.13-0ubuntu3.4) over (3.0.13-0ubuntu3.1) ...
+Selecting previously unselected package linux-image-6.8.0-45-generic.
+Preparing to unpack .../2-linux-image-6.8.0-45-generic_6.8.0-45.45_amd64.deb ...
+Unpacking linux-image-6.8.0-45-generic (6.8.0-45.45) ...
+Removing linux-image-6.8.0-31-generic (6.8.0-31.31) ...
+Setting up libssl3t64:amd64 (3.0.13-0ubuntu3.4) ...
+Setting up openssl (3.0.13-0ubuntu3.4) ...
+Setting up linux-image-6.8.0-45-generic (6.8.0-45.45) ...
+Processing triggers for libc-bin (2.39-0ubuntu8.3) ...
+"""
+
+
+def _feed(parser: AptOutputParser, text: str) -> AptOutputParser:
+    for line in text.splitlines():
+        parser.feed(line)
+    return parser
+
+
+class TestAptOutputParser:
+    def test_summary_counts(self) -> None:
+        parser = _feed(AptOutputParser(), _DIST_UPGRADE)
+        assert parser.summary_seen
+        assert (parser.upgraded, parser.installed, parser.removed) == (2, 1, 1)
+
+    def test_versions_and_actions(self) -> None:
+        parser = _feed(AptOutputParser(), _DIST_UPGRADE)
+        ssl = parser.changes["libssl3t64"]  # ":amd64" qualifier stripped
+        assert ssl.action == UPGRADE
+        assert (ssl.old_version, ssl.new_version) == ("3.0.13-0ubuntu3.1", "3.0.13-0ubuntu3.4")
+        assert parser.changes["linux-image-6.8.0-45-generic"].action == INSTALL
+        removed = parser.changes["linux-image-6.8.0-31-generic"]
+        assert removed.action == REMOVE
+        assert removed.old_version == "6.8.0-31.31"
+        assert parser.changed_names() == [
+            "libssl3t64",
+            "linux-image-6.8.0-45-generic",
+            "openssl",
+        ]
+
+    def test_download_lines(self) -> None:
+        parser = _feed(
+            AptOutputParser(),
+            _DIST_UPGRADE
+            + "Get:2 http://deb.debian.org/debian bookworm/main amd64 Packages [8,786 kB]\n"
+            + "Get:3 http://deb.debian.org/debian bookworm-updates InRelease [55.4 kB]\n"
+            + "Get:4 http://deb.debian.org/debian bookworm/main amd64 tzdata all 2024a-0+deb12u1 [255 kB]\n",
+        )
+        # Index downloads are not packages.
+        assert parser.downloaded == {
+            "libssl3t64": "3.0.13-0ubuntu3.4",
+            "tzdata": "2024a-0+deb12u1",
+        }
+
+    def test_per_package_timing_uses_clock(self) -> None:
+        ticks = itertools.count()
+        parser = _feed(AptOutputParser(clock=lambda: float(next(ticks))), _DIST_UPGRADE)
+        for name in ("libssl3t64", "openssl", "linux-image-6.8.0-45-generic"):
+            seconds = parser.changes[name].seconds
+            assert seconds is not None and seconds > 0
+
+    def test_simulation_format(self) -> None:
+        parser = _feed(
+            AptOutputParser(),
+            "Inst libssl3 [3.0.10-1ubuntu2] (3.0.10-1ubuntu3 Ubuntu:24.04/noble-updates [amd64])\n"
+            "Inst newpkg (1.0-1 Ubuntu:24.04/noble [all])\n"
+            "Conf libssl3 (3.0.10-1ubuntu3 Ubuntu:24.04/noble-updates [amd64])\n"
+            "Remv oldpkg [0.9-2]\n",
+        )
+        assert parser.changes["libssl3"].old_version == "3.0.10-1ubuntu2"
+        assert parser.changes["libssl3"].new_version == "3.0.10-1ubuntu3"
+        assert parser.changes["newpkg"].action == INSTALL
+        assert parser.changes["oldpkg"].action == REMOVE
+        assert parser.changes["libssl3"].seconds is None
+
+    def test_logs_progress_per_package(self, silent_logger, caplog) -> None:
+        silent_logger.propagate = True
+        with caplog.at_level("INFO", logger=silent_logger.name):
+            _feed(AptOutputParser(silent_logger), _DIST_UPGRADE)
+        messages = [r.getMessage() for r in caplog.records]
+        assert any(m.startswith("Upgraded openssl 3.0.13-0ubuntu3.1 -> 3.0.13-0ubuntu3.4") for m in messages)
+        assert any(m.startswith("Removed linux-image-6.8.0-31-generic") for m in messages)
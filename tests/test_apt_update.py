@@ -5,22 +5,37 @@ We exercise:
   total failure, no-changes).
 - Auto-reboot decision logic across (reboot_required, auto_reboot, in-window).
 - The notify policy (should_send_email).
+- The skip-if-unchanged fast path in run_apt_maintenance.
+- Package changes taken from dpkg's status before vs after the run.
+- Security-only runs installing just the security pocket's upgrades.
+- Batched upgrades ([update] batch_size) and their deadline.
+- execute() starting the email before recording the run.
 """
 
 from __future__ import annotations
 
 import datetime as dt
+import functools
 import logging
+import time
+from collections.abc import Callable
 from dataclasses import replace
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
+
+from sysmaint.core import apt_index, dpkg, fingerprint, state
+from sysmaint.core.health import HealthSnapshot
 from sysmaint.core.runner import CommandResult
-from sysmaint.core.system import HostInfo
+from sysmaint.core.system import HostInfo, ServiceStatus
+from sysmaint.tasks import apt_update, prefetch
 from sysmaint.tasks.apt_update import (
     UpdateOutcome,
     _parse_apt_summary,
     maybe_reboot,
     render_email,
+    run_apt_maintenance,
     should_send_email,
 )
 
@@ -33,6 +48,10 @@ _HOST = HostInfo(
 )
 
 
+def _active(names: tuple[str, ...], **_kwargs) -> list[ServiceStatus]:
+    return [ServiceStatus(name=n, active=True, state="active") for n in names]
+
+
 def _result(cmd: tuple[str, ...], rc: int = 0, stdout: str = "", duration: float = 1.0) -> CommandResult:
     return CommandResult(command=cmd, returncode=rc, stdout=stdout, stderr="", duration=duration)
 
@@ -91,10 +110,8 @@ class TestRenderEmailQuadrants:
         with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
             "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
         ), patch(
-            "sysmaint.tasks.apt_update.system.get_service_status"
-        ) as mock_svc:
-            mock_svc.return_value.active = True
-            mock_svc.return_value.state = "active"
+            "sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active
+        ):
             subject, body = render_email(example_config, self._outcome(changes=12), _HOST)
         assert "12 upgraded" in subject
         assert "FAIL" not in body  # all commands succeeded
@@ -103,7 +120,7 @@ class TestRenderEmailQuadrants:
     def test_success_with_one_failure(self, example_config) -> None:
         with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
             "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
-        ), patch("sysmaint.tasks.apt_update.system.get_service_status"):
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
             subject, body = render_email(example_config, self._outcome(fails=True, changes=3), _HOST)
         assert "FAILED" in subject
         assert "FAIL exit=1" in body
@@ -114,7 +131,7 @@ class TestRenderEmailQuadrants:
         )
         with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
             "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
-        ), patch("sysmaint.tasks.apt_update.system.get_service_status"):
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
             subject, _ = render_email(example_config, outcome, _HOST)
         assert "FAILED" in subject
 
@@ -122,7 +139,7 @@ class TestRenderEmailQuadrants:
         outcome = UpdateOutcome(results=[_result(("apt-get", "update"))])
         with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
             "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
-        ), patch("sysmaint.tasks.apt_update.system.get_service_status"):
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
             subject, _ = render_email(example_config, outcome, _HOST)
         assert "no changes" in subject
 
@@ -130,7 +147,7 @@ class TestRenderEmailQuadrants:
         with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=True), patch(
             "sysmaint.tasks.apt_update.system.reboot_required_packages", return_value=["linux-image"]
         ), patch("sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]), patch(
-            "sysmaint.tasks.apt_update.system.get_service_status"
+            "sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active
         ):
             subject, body = render_email(example_config, self._outcome(changes=4), _HOST)
         assert "REBOOT REQUIRED" in subject
@@ -213,3 +230,479 @@ class TestMaybeReboot:
             assert maybe_reboot(cfg, silent_logger, now=inside) is True
             mock_run.assert_called_once()
             assert "reboot" in mock_run.call_args[0][0]
+
+    def test_before_reboot_hook_runs_only_when_rebooting(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        cfg = replace(
+            example_config, update=replace(example_config.update, auto_reboot=True)
+        )
+        calls: list[str] = []
+        with patch(
+            "sysmaint.tasks.apt_update.system.reboot_required", return_value=True
+        ), patch("sysmaint.tasks.apt_update.run_command") as mock_run:
+            mock_run.side_effect = lambda *_a, **_k: calls.append("reboot")
+            outside = dt.datetime(2025, 1, 1, 12, 0, 0)
+            maybe_reboot(cfg, silent_logger, now=outside, before_reboot=lambda: calls.append("wait"))
+            assert calls == []
+
+            inside = dt.datetime(2025, 1, 1, 3, 30, 0)
+            maybe_reboot(cfg, silent_logger, now=inside, before_reboot=lambda: calls.append("wait"))
+            assert calls == ["wait", "reboot"]
+
+
+def _fake_apt(calls: list[tuple[str, ...]], *, pending: bool, simulation_rc: int = 0):
+    """run_command stand-in: simulations report `pending` work or none."""
+    summary = f"{1 if pending else 0} upgraded, 0 newly installed, 0 to remove and 0 not upgraded."
+
+    def run(cmd, *, line_consumers=(), **_kwargs):
+        calls.append(tuple(cmd))
+        for consumer in line_consumers:
+            consumer(summary)
+        return _result(tuple(cmd), rc=simulation_rc if "-s" in cmd else 0)
+
+    return run
+
+
+class TestSkipIfUnchanged:
+    @staticmethod
+    def _run(
+        example_config, logger, state: Path, *, pending: bool, simulation_rc: int = 0
+    ) -> tuple[UpdateOutcome, list]:
+        calls: list[tuple[str, ...]] = []
+        fake = _fake_apt(calls, pending=pending, simulation_rc=simulation_rc)
+        with patch("sysmaint.tasks.apt_update.run_command", side_effect=fake), patch.object(fingerprint, "apt_fingerprint", return_value="fp1"), patch.object(
+            fingerprint, "FINGERPRINT_STATE", state
+        ), patch(
+            "sysmaint.tasks.apt_update._prefetch_hits", return_value=0
+        ):
+            return run_apt_maintenance(example_config, logger), calls
+
+    def test_nothing_pending_skips_and_remembers_fingerprint(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        state = tmp_path / "fp.json"
+        outcome, calls = self._run(example_config, silent_logger, state, pending=False)
+
+        assert outcome.skipped_reason
+        assert all("-s" in c for c in calls[1:])
+        assert fingerprint.is_known_idle("fp1", "dist-upgrade", state)
+
+        # Same fingerprint next time: not even a simulation.
+        outcome, calls = self._run(example_config, silent_logger, state, pending=False)
+        assert "unchanged" in outcome.skipped_reason
+        assert len(calls) == 1
+        with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
+            "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
+            _, body = render_email(example_config, outcome, _HOST)
+        assert "skipped: apt lists and dpkg status unchanged" in body
+
+    def test_pending_upgrade_runs_full_sequence(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        state = tmp_path / "fp.json"
+        outcome, calls = self._run(example_config, silent_logger, state, pending=True)
+
+        assert outcome.skipped_reason == ""
+        assert [c[-1] for c in calls[-3:]] == ["dist-upgrade", "autoremove", "autoclean"]
+        assert not state.exists()
+        # The dry run is not a step of the run.
+        assert [r.command[-1] for r in outcome.results] == [
+            "update", "dist-upgrade", "autoremove", "autoclean",
+        ]
+        assert [r.command[-2:] for r in outcome.simulations] == [("-s", "dist-upgrade")]
+
+    def test_failed_simulation_is_not_a_failed_run(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        outcome, _ = self._run(
+            example_config, silent_logger, tmp_path / "fp.json", pending=False, simulation_rc=100
+        )
+        assert outcome.skipped_reason == ""
+        assert not outcome.any_failures
+        assert outcome.simulations[0].returncode == 100
+
+    def test_disabled_never_simulates(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        cfg = replace(example_config, update=replace(example_config.update, skip_if_unchanged=False))
+        _, calls = self._run(cfg, silent_logger, tmp_path / "fp.json", pending=False)
+        assert not any("-s" in c for c in calls)
+
+
+def _stanza(
+    name: str, version: str, state: str = "installed", *, arch: str = "amd64", multi_arch: str = ""
+) -> str:
+    return (
+        f"Package: {name}\nStatus: install ok {state}\nArchitecture: {arch}\n"
+        + (f"Multi-Arch: {multi_arch}\n" if multi_arch else "")
+        + f"Version: {version}\nDescription: {name}\n {name} does things\n\n"
+    )
+
+
+class TestDpkgDiff:
+    def test_changes_come_from_dpkg_status_including_autoremove(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        example_config,
+        silent_logger: logging.Logger,
+    ) -> None:
+        status = tmp_path / "status"
+        status.write_text(_stanza("curl", "7.88.1-10") + _stanza("oldlib", "1.0"))
+        monkeypatch.setattr(dpkg, "DPKG_STATUS", status)
+        cfg = replace(example_config, update=replace(example_config.update, skip_if_unchanged=False))
+
+        def apt(cmd, *, line_consumers=(), **_kwargs):
+            step = cmd[-1]
+            if step == "dist-upgrade":
+                # apt's output claims one upgrade; dpkg records two changes.
+                for consumer in line_consumers:
+                    consumer("1 upgraded, 0 newly installed, 0 to remove and 0 not upgraded.")
+                    consumer("Unpacking curl (7.88.1-10+deb12u5) over (7.88.1-10) ...")
+                    consumer("Setting up curl (7.88.1-10+deb12u5) ...")
+                status.write_text(
+                    _stanza("curl", "7.88.1-10+deb12u5")
+                    + _stanza("oldlib", "1.0")
+                    + _stanza("newdep", "2.0")
+                )
+            elif step == "autoremove":
+                status.write_text(
+                    _stanza("curl", "7.88.1-10+deb12u5")
+                    + _stanza("oldlib", "1.0", state="config-files")
+                    + _stanza("newdep", "2.0")
+                )
+            return _result(tuple(cmd))
+
+        with patch("sysmaint.tasks.apt_update.run_command", side_effect=apt), patch(
+            "sysmaint.tasks.apt_update._prefetch_hits", return_value=0
+        ):
+            outcome = run_apt_maintenance(cfg, silent_logger)
+
+        assert (outcome.packages_upgraded, outcome.packages_installed) == (1, 1)
+        assert outcome.packages_removed == 1
+        assert outcome.upgraded_names == ["curl", "newdep"]
+        curl = next(c for c in outcome.package_changes if c.name == "curl")
+        assert (curl.old_version, curl.new_version) == ("7.88.1-10", "7.88.1-10+deb12u5")
+        assert curl.seconds is not None
+
+    def test_multi_arch_packages_use_the_plain_name(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        example_config,
+        silent_logger: logging.Logger,
+    ) -> None:
+        status = tmp_path / "status"
+        libc = functools.partial(_stanza, "libc6", multi_arch="same")
+        status.write_text(libc("2.36-9") + libc("2.36-9", arch="i386"))
+        monkeypatch.setattr(dpkg, "DPKG_STATUS", status)
+        prefetched = tmp_path / "prefetch.json"
+        state.write_json(prefetched, {"finished": time.time(), "fetched": {"libc6": "2.36-9+deb12u4"}})
+        monkeypatch.setattr(prefetch, "PREFETCH_STATE", prefetched)
+        cfg = replace(example_config, update=replace(example_config.update, skip_if_unchanged=False))
+
+        def apt(cmd, **_kwargs):
+            if cmd[-1] == "dist-upgrade":
+                status.write_text(
+                    libc("2.36-9+deb12u4") + libc("2.36-9+deb12u4", arch="i386")
+                )
+            return _result(tuple(cmd))
+
+        with patch("sysmaint.tasks.apt_update.run_command", side_effect=apt):
+            outcome = run_apt_maintenance(cfg, silent_logger)
+
+        assert sorted(c.name for c in outcome.package_changes) == ["libc6:amd64", "libc6:i386"]
+        assert outcome.upgraded_names == ["libc6"]
+        assert outcome.prefetched == 2
+
+
+def _lists(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, suites: dict[str, str]) -> None:
+    """Point the run at apt lists with one Packages file per suite."""
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    prefix = "deb.debian.org_debian_dists_"
+    for suite, packages in suites.items():
+        (lists / f"{prefix}{suite}_InRelease").write_text(f"Suite: {suite}\n")
+        (lists / f"{prefix}{suite}_main_binary-amd64_Packages").write_text(packages)
+    monkeypatch.setattr(fingerprint, "APT_LISTS_DIR", lists)
+    monkeypatch.setattr(apt_index, "DEFAULT_INDEX_CACHE", tmp_path / "apt-index.json")
+    monkeypatch.setattr(dpkg, "DPKG_STATUS", tmp_path / "status")
+
+
+def _available(name: str, version: str, depends: str = "") -> str:
+    text = f"Package: {name}\nVersion: {version}\nArchitecture: amd64\n"
+    return text + (f"Depends: {depends}\n" if depends else "") + "\n"
+
+
+class TestSecurityOnly:
+    @pytest.fixture(autouse=True)
+    def _host(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A host with curl fixed in bookworm-security and tzdata in bookworm."""
+        _lists(
+            tmp_path,
+            monkeypatch,
+            {
+                "bookworm": _available("tzdata", "2024a-0+deb12u1"),
+                "bookworm-security": _available("curl", "7.88.1-10+deb12u8"),
+            },
+        )
+
+    @staticmethod
+    def _run(example_config, logger: logging.Logger) -> tuple[UpdateOutcome, list]:
+        calls: list[tuple[str, ...]] = []
+
+        def apt(cmd, **_kwargs):
+            calls.append(tuple(cmd))
+            return _result(tuple(cmd))
+
+        with patch("sysmaint.tasks.apt_update.run_command", side_effect=apt), patch(
+            "sysmaint.tasks.apt_update._prefetch_hits", return_value=0
+        ):
+            return run_apt_maintenance(example_config, logger, security_only=True), calls
+
+    def test_installs_only_security_upgrades(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        (tmp_path / "status").write_text(
+            _stanza("curl", "7.88.1-10+deb12u5") + _stanza("tzdata", "2023c-5")
+        )
+        outcome, calls = self._run(example_config, silent_logger)
+
+        assert outcome.skipped_reason == ""
+        assert calls[1][-3:] == ("install", "--only-upgrade", "curl")
+        assert not any("-s" in c or "dist-upgrade" in c for c in calls)
+        assert [c[-1] for c in calls[2:]] == ["autoremove", "autoclean"]
+
+    def test_nothing_from_security_skips_the_run(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        (tmp_path / "status").write_text(
+            _stanza("curl", "7.88.1-10+deb12u8") + _stanza("tzdata", "2023c-5")
+        )
+        outcome, calls = self._run(example_config, silent_logger)
+
+        assert outcome.skipped_reason == "no security upgrades pending"
+        assert [c[-1] for c in calls] == ["update"]
+
+    def test_malformed_version_in_a_list_is_skipped(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        (tmp_path / "lists" / "third.party_._Packages").write_text(_available("curl", "a:1.0"))
+        (tmp_path / "status").write_text(
+            _stanza("curl", "7.88.1-10+deb12u5") + _stanza("tzdata", "2023c-5")
+        )
+        outcome, calls = self._run(example_config, silent_logger)
+        assert outcome.skipped_reason == ""
+        assert calls[1][-3:] == ("install", "--only-upgrade", "curl")
+
+    def test_malformed_installed_version_skips_instead_of_crashing(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        (tmp_path / "status").write_text(_stanza("curl", "b:1.0"))
+        outcome, calls = self._run(example_config, silent_logger)
+        assert "could not read" in outcome.skipped_reason
+        assert len(calls) == 1
+
+    def test_unreadable_dpkg_status_never_falls_back_to_full_upgrade(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        outcome, calls = self._run(example_config, silent_logger)
+        assert "could not read" in outcome.skipped_reason
+        assert len(calls) == 1
+
+
+class TestBatching:
+    @pytest.fixture(autouse=True)
+    def _host(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """curl needs the new libcurl4; tzdata stands alone."""
+        _lists(
+            tmp_path,
+            monkeypatch,
+            {
+                "bookworm": _available(
+                    "curl", "7.88.1-10+deb12u8", "libc6, libcurl4 (= 7.88.1-10+deb12u8)"
+                )
+                + _available("libcurl4", "7.88.1-10+deb12u8", "libc6 (>= 2.34)")
+                + _available("tzdata", "2024a-0+deb12u1"),
+            },
+        )
+        (tmp_path / "status").write_text(
+            _stanza("curl", "7.88.1-10+deb12u5")
+            + _stanza("libcurl4", "7.88.1-10+deb12u5")
+            + _stanza("tzdata", "2023c-5")
+        )
+
+    @staticmethod
+    def _run(
+        example_config,
+        logger: logging.Logger,
+        *,
+        minutes_per_step: float = 0.0,
+        on_step: Callable[[tuple[str, ...], Callable[[str], None]], None] | None = None,
+        **update,
+    ) -> tuple[UpdateOutcome, list]:
+        cfg = replace(
+            example_config,
+            update=replace(example_config.update, skip_if_unchanged=False, **update),
+        )
+        calls: list[tuple[str, ...]] = []
+        clock = [0.0]
+
+        def apt(cmd, *, line_consumers=(), **_kwargs):
+            calls.append(tuple(cmd))
+            clock[0] += minutes_per_step * 60
+            if on_step:
+                on_step(tuple(cmd), lambda line: [c(line) for c in line_consumers])
+            return _result(tuple(cmd))
+
+        with patch("sysmaint.tasks.apt_update.run_command", side_effect=apt), patch(
+            "sysmaint.tasks.apt_update.time.monotonic", side_effect=lambda: clock[0]
+        ), patch("sysmaint.tasks.apt_update._prefetch_hits", return_value=0):
+            return run_apt_maintenance(cfg, logger), calls
+
+    def test_dependency_closed_batches_then_full_upgrade(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        outcome, calls = self._run(example_config, silent_logger, batch_size=1)
+        assert [c[c.index("install") :] if "install" in c else c[-1:] for c in calls[1:]] == [
+            ("install", "--only-upgrade", "curl", "libcurl4"),
+            ("install", "--only-upgrade", "tzdata"),
+            ("dist-upgrade",),
+            ("autoremove",),
+            ("autoclean",),
+        ]
+        assert outcome.deferred == []
+
+    def test_deadline_stops_cleanly_and_defers_the_rest(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        outcome, calls = self._run(
+            example_config,
+            silent_logger,
+            minutes_per_step=10,
+            batch_size=1,
+            batch_deadline_min=15,
+        )
+        # update + the first batch fit in 15 minutes; nothing starts after.
+        assert len(calls) == 2
+        assert calls[1][-2:] == ("curl", "libcurl4")
+        assert outcome.deferred == ["tzdata"]
+        with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
+            "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
+            _, body = render_email(example_config, outcome, _HOST)
+        assert "deferred to the next run (batch deadline reached): 1 upgrade(s) — tzdata" in body
+
+    def test_deadline_before_final_upgrade_reports_skipped_steps(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        outcome, calls = self._run(
+            example_config,
+            silent_logger,
+            minutes_per_step=5,
+            batch_size=1,
+            batch_deadline_min=15,
+        )
+        assert len(calls) == 3  # update and both batches
+        assert outcome.deferred == []
+        assert outcome.deferred_steps == ["dist-upgrade", "autoremove", "autoclean"]
+        with patch("sysmaint.tasks.apt_update.system.reboot_required", return_value=False), patch(
+            "sysmaint.tasks.apt_update.system.get_disk_usage", return_value=[]
+        ), patch("sysmaint.tasks.apt_update.system.get_service_statuses", side_effect=_active):
+            _, body = render_email(example_config, outcome, _HOST)
+        assert "batch deadline reached, not run: dist-upgrade, autoremove, autoclean" in body
+
+    def test_apt_counts_are_summed_across_batches(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        def on_step(cmd: tuple[str, ...], emit: Callable[[str], None]) -> None:
+            if "install" in cmd:
+                # dpkg's status becomes unreadable: apt's counts are the fallback.
+                (tmp_path / "status").unlink(missing_ok=True)
+                count = len(cmd) - cmd.index("--only-upgrade") - 1
+                emit(f"{count} upgraded, 0 newly installed, 0 to remove and 0 not upgraded.")
+            elif "dist-upgrade" in cmd:
+                emit("0 upgraded, 0 newly installed, 0 to remove and 0 not upgraded.")
+
+        outcome, _ = self._run(example_config, silent_logger, on_step=on_step, batch_size=1)
+        assert outcome.packages_upgraded == 3
+
+    def test_without_batch_size_one_transaction(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        _, calls = self._run(example_config, silent_logger)
+        assert [c[-1] for c in calls] == ["update", "dist-upgrade", "autoremove", "autoclean"]
+
+
+class TestAptFingerprint:
+    def test_changes_with_lists_and_dpkg_status(self, tmp_path: Path) -> None:
+        lists = tmp_path / "lists"
+        lists.mkdir()
+        (lists / "deb.debian.org_Packages").write_text("a")
+        (lists / "lock").write_text("")
+        status = tmp_path / "status"
+        status.write_text("Package: a")
+
+        first = fingerprint.apt_fingerprint(lists, status)
+        (lists / "lock").write_text("held")
+        assert fingerprint.apt_fingerprint(lists, status) == first
+
+        status.write_text("Package: a\nPackage: b")
+        assert fingerprint.apt_fingerprint(lists, status) != first
+
+    def test_defaults_are_looked_up_at_call_time(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        lists = tmp_path / "lists"
+        lists.mkdir()
+        status = tmp_path / "status"
+        status.write_text("Package: a")
+        monkeypatch.setattr(fingerprint, "APT_LISTS_DIR", lists)
+        monkeypatch.setattr(dpkg, "DPKG_STATUS", status)
+        assert fingerprint.apt_fingerprint() == fingerprint.apt_fingerprint(lists, status)
+        status.write_text("Package: a\nPackage: b")
+        assert fingerprint.apt_fingerprint() == fingerprint.apt_fingerprint(lists, status)
+
+
+class TestExecute:
+    def test_email_starts_before_the_run_is_recorded(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        order: list[str] = []
+        outcome = UpdateOutcome(results=[_result(("apt-get", "update"), rc=100)])
+        snapshot = HealthSnapshot(
+            host=_HOST,
+            disks=(),
+            services=(),
+            timers=(),
+            reboot_required=False,
+            reboot_packages=(),
+        )
+
+        class Delivery:
+            def wait(self, _deadline: float) -> bool:
+                order.append("wait")
+                return True
+
+        def deliver(*_args, **_kwargs) -> Delivery:
+            order.append("deliver")
+            return Delivery()
+
+        with patch.object(apt_update, "run_apt_maintenance", return_value=outcome), patch.object(
+            apt_update, "collect_snapshot", return_value=snapshot
+        ), patch.object(apt_update, "maybe_reboot", return_value=False), patch.object(
+            apt_update.mailqueue, "deliver_in_background", side_effect=deliver
+        ), patch.object(
+            apt_update, "_record_history", side_effect=lambda *_a: order.append("history")
+        ), patch.object(
+            apt_update, "_write_metrics", side_effect=lambda *_a: order.append("metrics")
+        ), patch.object(
+            apt_update.status_cache,
+            "mark_run_complete",
+            side_effect=lambda *_a: order.append("marker"),
+        ):
+            apt_update.execute(example_config, silent_logger)
+
+        assert order == ["deliver", "history", "metrics", "marker", "wait"]
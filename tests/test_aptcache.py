@@ -0,0 +1,270 @@
+"""Tests for sysmaint.core.aptcache, run against a local fake mirror."""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+from sysmaint.core import aptcache
+
+_DEB = "pool/main/c/curl/curl_8.5.0-2_amd64.deb"
+_RELEASE = "dists/bookworm/Release"
+
+
+class _Mirror:
+    """A directory served over HTTP that counts the GETs it answers."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.requests: list[str] = []
+        self.redirects: dict[str, str] = {}
+        mirror = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self) -> None:
+                mirror.requests.append(self.path)
+                if self.path in mirror.redirects:
+                    self.send_response(302)
+                    self.send_header("Location", mirror.redirects[self.path])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+            def log_message(self, *_args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(Handler, directory=str(root))
+        )
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def publish(self, path: str, content: bytes, *, mtime: float = 1_700_000_000) -> None:
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        os.utime(target, (mtime, mtime))
+
+
+@contextlib.contextmanager
+def _serving(server: ThreadingHTTPServer) -> Iterator[None]:
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def mirror(tmp_path: Path) -> Iterator[_Mirror]:
+    m = _Mirror(tmp_path / "mirror")
+    m.publish(_DEB, b"deb-bytes" * 1000)
+    m.publish(_RELEASE, b"Suite: stable v1\n")
+    with _serving(m.server):
+        yield m
+
+
+@pytest.fixture
+def cache(tmp_path: Path, mirror: _Mirror) -> aptcache.AptCache:
+    # The fake mirror is on loopback, so it has to be allowlisted.
+    return aptcache.AptCache(tmp_path / "cache", timeout=5, mirrors=[urlsplit(mirror.url).netloc])
+
+
+@pytest.fixture
+def proxy(cache: aptcache.AptCache) -> Iterator[str]:
+    server = aptcache.make_server(cache, "127.0.0.1", 0)
+    with _serving(server):
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _get(proxy: str, url: str) -> bytes:
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({"http": proxy}))
+    with opener.open(url, timeout=5) as response:
+        data: bytes = response.read()
+        return data
+
+
+class TestProxy:
+    def test_concurrent_requests_fetch_package_once(
+        self, mirror: _Mirror, proxy: str, cache: aptcache.AptCache
+    ) -> None:
+        url = f"{mirror.url}/{_DEB}"
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            bodies = list(pool.map(lambda _: _get(proxy, url), range(8)))
+
+        assert all(body == b"deb-bytes" * 1000 for body in bodies)
+        assert mirror.requests == [f"/{_DEB}"]
+        assert (cache.stats.misses, cache.stats.hits) == (1, 7)
+
+    def test_indexes_are_revalidated(
+        self, mirror: _Mirror, proxy: str, cache: aptcache.AptCache
+    ) -> None:
+        url = f"{mirror.url}/{_RELEASE}"
+        assert _get(proxy, url) == b"Suite: stable v1\n"
+        assert _get(proxy, url) == b"Suite: stable v1\n"
+        assert cache.stats.revalidated == 1
+
+        mirror.publish(_RELEASE, b"Suite: stable v2\n", mtime=1_800_000_000)
+        assert _get(proxy, url) == b"Suite: stable v2\n"
+        assert len(mirror.requests) == 3
+
+    def test_mirror_outage_serves_cached_indexes_only(
+        self, mirror: _Mirror, proxy: str, cache: aptcache.AptCache
+    ) -> None:
+        release = f"{mirror.url}/{_RELEASE}"
+        _get(proxy, release)
+        mirror.server.shutdown()
+        mirror.server.server_close()
+
+        assert _get(proxy, release) == b"Suite: stable v1\n"
+        assert cache.stats.stale == 1
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _get(proxy, f"{mirror.url}/pool/main/o/openssl/openssl_3.0_amd64.deb")
+        assert exc.value.code == 502
+
+    def test_refuses_non_apt_paths(self, mirror: _Mirror, proxy: str) -> None:
+        mirror.publish("index.html", b"<html>")
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _get(proxy, f"{mirror.url}/index.html")
+        assert exc.value.code == 403
+        assert mirror.requests == []
+
+    def test_refuses_hosts_outside_the_allowlist(self, mirror: _Mirror, proxy: str) -> None:
+        for url in (
+            "http://169.254.169.254/latest/dists/x",
+            "http://deb.debian.org/debian/dists/bookworm/Release",
+            f"{mirror.url}/{_RELEASE}?x=1",
+        ):
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                _get(proxy, url)
+            assert exc.value.code == 403, url
+        assert mirror.requests == []
+
+    def test_redirects_are_checked_before_following(
+        self, tmp_path: Path, mirror: _Mirror, cache: aptcache.AptCache
+    ) -> None:
+        internal = _Mirror(tmp_path / "internal")
+        internal.publish("latest/dists/meta-data/iam", b"secret")
+        mirror.redirects[f"/{_RELEASE}"] = f"{internal.url}/latest/dists/meta-data/iam"
+        with _serving(internal.server):
+            status, path = cache.fetch(f"{mirror.url}/{_RELEASE}")
+
+        assert (status, path) == (403, None)
+        assert internal.requests == []
+        assert not cache.path_for(f"{mirror.url}/{_RELEASE}").exists()
+
+    def test_redirect_within_the_allowlist_is_followed(
+        self, mirror: _Mirror, cache: aptcache.AptCache
+    ) -> None:
+        moved = "dists/bookworm/InRelease"
+        mirror.publish(moved, b"moved")
+        mirror.redirects[f"/{_RELEASE}"] = f"{mirror.url}/{moved}"
+        status, path = cache.fetch(f"{mirror.url}/{_RELEASE}")
+        assert status == 200 and path is not None
+        assert path.read_bytes() == b"moved"
+
+    def test_connects_to_the_address_that_was_checked(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # DNS rebinding: public when refusal() looks, loopback a moment later.
+        answers = iter(["93.184.216.34", "127.0.0.1"])
+
+        def getaddrinfo(host: str, port: int, *_args: object, **_kwargs: object) -> list:
+            address = next(answers)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+        connected: list[tuple[str, int]] = []
+
+        def create_connection(address: tuple[str, int], *_args: object) -> socket.socket:
+            connected.append(address)
+            raise ConnectionRefusedError("test")
+
+        monkeypatch.setattr(aptcache.socket, "getaddrinfo", getaddrinfo)
+        monkeypatch.setattr(aptcache.socket, "create_connection", create_connection)
+        cache = aptcache.AptCache(tmp_path / "cache", timeout=5)
+
+        assert cache.fetch("http://mirror.example/debian/dists/bookworm/Release") == (502, None)
+        assert connected == []
+
+    def test_upstream_404_is_passed_through_and_not_cached(
+        self, mirror: _Mirror, proxy: str, cache: aptcache.AptCache
+    ) -> None:
+        url = f"{mirror.url}/pool/main/n/nope/nope_1_all.deb"
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _get(proxy, url)
+        assert exc.value.code == 404
+        assert not cache.path_for(url).exists()
+
+
+class TestRefusal:
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "http://169.254.169.254/latest/dists/meta-data",  # link-local (cloud metadata)
+            "http://127.0.0.1/debian/dists/bookworm/Release",  # loopback
+            "http://10.0.0.5/debian/dists/bookworm/Release",  # private
+            "http://[::1]/debian/dists/bookworm/Release",
+            "http://localhost/debian/dists/bookworm/Release",
+            "http://8.8.8.8:8080/debian/dists/bookworm/Release",  # not port 80
+            "http://8.8.8.8/debian/dists/bookworm/Release?redirect=1",  # query string
+            "http://8.8.8.8/index.html",  # not an apt path
+        ],
+    )
+    def test_refused_without_allowlist(self, url: str) -> None:
+        refused = aptcache.refusal(url)
+        assert refused is not None and refused[0] == 403
+
+    def test_public_port_80_is_allowed(self) -> None:
+        assert aptcache.refusal("http://8.8.8.8/debian/dists/bookworm/Release") is None
+
+    def test_allowlist(self) -> None:
+        mirrors = aptcache.mirror_keys(["Mirror.lan:8080", "deb.debian.org:80"])
+        assert mirrors == {"mirror.lan:8080", "deb.debian.org"}
+        assert aptcache.refusal("http://mirror.lan:8080/debian/dists/x", mirrors) is None
+        assert aptcache.refusal("http://deb.debian.org/debian/dists/x", mirrors) is None
+        assert aptcache.refusal("http://mirror.lan/debian/dists/x", mirrors) is not None
+        assert aptcache.refusal("http://evil.example/debian/dists/x", mirrors) is not None
+        with pytest.raises(ValueError):
+            aptcache.mirror_keys([":8080"])
+
+    def test_not_absolute_http(self) -> None:
+        assert aptcache.refusal("/debian/dists/x") == (400, "Only absolute http:// URLs are proxied")
+
+
+class TestCacheFiles:
+    def test_path_stays_inside_cache_dir(self, cache: aptcache.AptCache) -> None:
+        path = cache.path_for("http://deb.debian.org:80/debian/../../etc/dists/passwd")
+        assert path == cache.cache_dir / "deb.debian.org_80" / "debian" / "etc" / "dists" / "passwd"
+
+    def test_query_strings_are_not_cacheable(self, cache: aptcache.AptCache) -> None:
+        with pytest.raises(ValueError):
+            cache.path_for("http://deb.debian.org/debian/dists/bookworm/Release?v=2")
+
+    def test_prune_removes_only_old_packages(self, cache: aptcache.AptCache) -> None:
+        old = cache.cache_dir / "mirror" / _DEB
+        fresh = cache.cache_dir / "mirror" / "pool" / "main" / "fresh_1_all.deb"
+        index = cache.cache_dir / "mirror" / _RELEASE
+        for path in (old, fresh, index):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x")
+        os.utime(old, (0, 0))
+        os.utime(index, (0, 0))
+
+        assert cache.prune(30) == 1
+        assert not old.exists()
+        assert fresh.exists()
+        assert index.exists()
@@ -0,0 +1,49 @@
+"""Tests for sysmaint.tasks.bench — the harness, not the numbers."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from sysmaint.core.apt_output import AptOutputParser
+from sysmaint.tasks import bench
+
+
+class TestHarness:
+    def test_every_benchmark_sets_up_and_runs_once(self, tmp_path: Path) -> None:
+        for name, setup in bench.BENCHMARKS.items():
+            (tmp_path / name).mkdir()
+            setup(tmp_path / name)()
+
+    def test_transcript_parses_like_apt_output(self) -> None:
+        parser = AptOutputParser()
+        for line in bench.apt_transcript(50).splitlines():
+            parser.feed(line)
+        assert parser.upgraded == 50
+        assert len(parser.changes) == 50
+        assert len(parser.downloaded) == 50
+
+    def test_measure_calibrates_loops(self) -> None:
+        result = bench.measure("noop", lambda: None, repeat=3, min_time=0.001)
+        assert result.loops > 1
+        assert 0 < result.best <= result.median
+
+
+class TestSaveAndCompare:
+    def test_round_trip_and_regression_exit(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        baseline = tmp_path / "baseline.json"
+        bench.save(baseline, [bench.BenchResult("load_config", best=0.001, median=0.001, loops=8)])
+        assert bench.load(baseline)["load_config"].best == 0.001
+
+        slow = [bench.BenchResult("load_config", best=0.002, median=0.002, loops=8)]
+        monkeypatch.setattr(bench, "run", lambda *a, **k: slow)
+        assert bench.execute(names=["load_config"], compare_path=baseline) == 1
+        assert "REGRESSION" in capsys.readouterr().out
+
+        assert bench.execute(names=["load_config"], compare_path=baseline, threshold=3.0) == 0
+
+    def test_unknown_benchmark_is_a_usage_error(self) -> None:
+        assert bench.execute(names=["nope"]) == 2
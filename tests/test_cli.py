@@ -3,9 +3,35 @@ that argparse is wired up correctly and that --help renders without errors."""
 
 from __future__ import annotations
 
+import os
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
-from sysmaint.cli import _build_parser
+import sysmaint
+from sysmaint.cli import _build_parser, _requested_command
+from sysmaint.core import status_cache
+
+# `import sysmaint.cli` measures ~0.05s (best of several runs); the margin
+# absorbs a loaded CI runner but not a heavy module creeping back in, which
+# used to take it to ~0.1-0.2s.
+STARTUP_BUDGET_SEC = 0.08
+# Stdlib modules only some commands need; importing any of them at startup
+# slows every `sysmaint status`.
+_DEFERRED_MODULES = (
+    "smtplib",
+    "ssl",
+    "email.mime.text",
+    "sqlite3",
+    "http.server",
+    "urllib.request",
+    "logging.handlers",
+    "subprocess",
+    "socket",
+    "platform",
+)
 
 
 def test_parser_builds() -> None:
@@ -23,8 +49,12 @@ def test_parser_requires_subcommand() -> None:
     "args",
     [
         ["status"],
+        ["status", "--fresh"],
+        ["status", "--max-age", "300"],
         ["update"],
         ["update", "--security-only"],
+        ["update", "--prefetch-only"],
+        ["update", "--plan"],
         ["pihole"],
         ["postfix", "setup"],
         ["postfix", "purge"],
@@ -35,12 +65,48 @@ def test_parser_requires_subcommand() -> None:
         ["install", "--non-interactive"],
         ["migrate-from-legacy"],
         ["uninstall"],
+        ["mail", "flush"],
+        ["mail", "flush", "--force"],
+        ["digest", "send"],
+        ["digest", "send", "--keep"],
+        ["cache-serve"],
+        ["history"],
+        ["bench"],
+        ["bench", "load_config", "--save", "b.json", "--compare", "a.json", "--threshold", "1.5"],
+        ["history", "--step", "dist-upgrade", "--since", "2025-01-01", "--failures-only"],
+        ["cache-serve", "--listen", "127.0.0.1", "--port", "8080", "--cache-dir", "/tmp/c"],
+        ["fleet", "update", "--inventory", "hosts.txt"],
+        ["fleet", "update", "--inventory", "hosts.txt", "--concurrency", "20",
+         "--batch-size", "50", "--max-failures", "3", "--security-only"],
     ],
 )
 def test_all_subcommands_parse(args: list[str]) -> None:
     parser = _build_parser()
     ns = parser.parse_args(args)
     assert ns.command == args[0]
+    # The single-subcommand parser main() builds must parse identically.
+    assert _build_parser(_requested_command(args)).parse_args(args) == ns
+
+
+def test_status_max_age_defaults_to_the_cache_ttl() -> None:
+    assert _build_parser("status").parse_args(["status"]).max_age == status_cache.DEFAULT_TTL_SEC
+
+
+@pytest.mark.parametrize(
+    ("argv", "expected"),
+    [
+        (["status"], "status"),
+        (["--config", "/tmp/c.conf", "update", "--security-only"], "update"),
+        (["--config=/tmp/status", "status"], "status"),
+        (["--trace", "t.json", "history"], "history"),
+        (["--help"], None),
+        (["--version"], None),
+        (["no-such-command"], None),
+        ([], None),
+    ],
+)
+def test_requested_command(argv: list[str], expected: str | None) -> None:
+    assert _requested_command(argv) == expected
 
 
 def test_postfix_requires_action() -> None:
@@ -49,8 +115,37 @@ def test_postfix_requires_action() -> None:
         parser.parse_args(["postfix"])
 
 
+def test_fleet_rejects_zero_concurrency() -> None:
+    parser = _build_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args(["fleet", "update", "--inventory", "h", "--concurrency", "0"])
+
+
 def test_version_flag() -> None:
     parser = _build_parser()
     with pytest.raises(SystemExit) as exc_info:
         parser.parse_args(["--version"])
     assert exc_info.value.code == 0
+
+
+def _python(code: str) -> subprocess.CompletedProcess[str]:
+    src = str(Path(sysmaint.__file__).resolve().parents[1])
+    env = {**os.environ, "PYTHONPATH": src}
+    return subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def test_startup_defers_heavy_imports() -> None:
+    loaded = _python(
+        "import sys, sysmaint.cli, sysmaint.tasks.status\n"
+        f"print(' '.join(m for m in {_DEFERRED_MODULES!r} if m in sys.modules))"
+    ).stdout.split()
+    assert loaded == []
+
+
+def test_startup_within_budget() -> None:
+    code = "import time; t = time.perf_counter(); import sysmaint.cli; print(time.perf_counter() - t)"
+    # Best of three: the fastest run is the least disturbed by other load.
+    best = min(float(_python(code).stdout) for _ in range(3))
+    assert best < STARTUP_BUDGET_SEC
@@ -2,11 +2,17 @@
 
 from __future__ import annotations
 
+import configparser
+import re
 from pathlib import Path
 
 import pytest
 
-from sysmaint.core.config import ConfigError, load_config
+import sysmaint
+from sysmaint.core.config import ConfigError, EmailConfig, load_config
+from sysmaint.tasks import install
+
+SAMPLE_CONFIG = Path(sysmaint.__file__).parent / "data" / "config.sample.conf"
 
 
 def _write_config(
@@ -142,3 +148,106 @@ class TestLoadConfigErrors:
         )
         with pytest.raises(ConfigError, match="disk_threshold_percent"):
             load_config(cfg_path)
+
+    def test_unknown_systemd_backend_rejected(
+        self, tmp_path: Path, tmp_password_file: Path
+    ) -> None:
+        cfg_path = _write_config(
+            tmp_path, tmp_password_file, section_to_drop="monitor"
+        )
+        cfg_path.write_text(
+            cfg_path.read_text() + "\n[monitor]\nsystemd_backend = varlink\n"
+        )
+        with pytest.raises(ConfigError, match="systemd_backend"):
+            load_config(cfg_path)
+
+    def test_notify_digest_mode(self, tmp_path: Path, tmp_password_file: Path) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file, section_to_drop="notify")
+        cfg_path.write_text(
+            cfg_path.read_text() + "\n[notify]\nmode = digest\ndigest_dir = /srv/spool\n"
+        )
+        notify = load_config(cfg_path).notify
+        assert notify.mode == "digest"
+        assert notify.digest_dir == Path("/srv/spool")
+
+    def test_unknown_notify_mode_rejected(
+        self, tmp_path: Path, tmp_password_file: Path
+    ) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file, section_to_drop="notify")
+        cfg_path.write_text(cfg_path.read_text() + "\n[notify]\nmode = pager\n")
+        with pytest.raises(ConfigError, match="mode"):
+            load_config(cfg_path)
+
+    def test_unknown_email_delivery_rejected(
+        self, tmp_path: Path, tmp_password_file: Path
+    ) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file)
+        cfg_path.write_text(cfg_path.read_text().replace("[email]", "[email]\ndelivery = pigeon", 1))
+        with pytest.raises(ConfigError, match="delivery"):
+            load_config(cfg_path)
+
+    def test_apt_proxy_must_be_http(self, tmp_path: Path, tmp_password_file: Path) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file)
+        text = cfg_path.read_text()
+        cfg_path.write_text(text.replace("[update]", "[update]\napt_proxy = http://cache1:3142", 1))
+        assert load_config(cfg_path).update.apt_proxy == "http://cache1:3142"
+
+        cfg_path.write_text(text.replace("[update]", "[update]\napt_proxy = cache1:3142", 1))
+        with pytest.raises(ConfigError, match="apt_proxy"):
+            load_config(cfg_path)
+
+    def test_batching_options(self, tmp_path: Path, tmp_password_file: Path) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file)
+        text = cfg_path.read_text()
+        assert load_config(cfg_path).update.batch_size == 0
+        cfg_path.write_text(
+            text.replace("[update]", "[update]\nbatch_size = 40\nbatch_deadline_min = 20", 1)
+        )
+        update = load_config(cfg_path).update
+        assert (update.batch_size, update.batch_deadline_min) == (40, 20)
+
+        cfg_path.write_text(text.replace("[update]", "[update]\nbatch_size = -1", 1))
+        with pytest.raises(ConfigError, match="batch_size"):
+            load_config(cfg_path)
+
+    def test_empty_metrics_file_disables_metrics(
+        self, tmp_path: Path, tmp_password_file: Path
+    ) -> None:
+        cfg_path = _write_config(tmp_path, tmp_password_file)
+        assert load_config(cfg_path).monitor.metrics_file is not None
+        cfg_path.write_text(cfg_path.read_text().replace("[monitor]", "[monitor]\nmetrics_file =", 1))
+        assert load_config(cfg_path).monitor.metrics_file is None
+
+
+class TestSampleConfig:
+    def test_sample_loads_with_the_loader_defaults(
+        self, tmp_path: Path, tmp_password_file: Path
+    ) -> None:
+        text = re.sub(
+            r"^password_file = .*$",
+            f"password_file = {tmp_password_file}",
+            SAMPLE_CONFIG.read_text(),
+            flags=re.M,
+        )
+        cfg_path = tmp_path / "sysmaint.conf"
+        cfg_path.write_text(text)
+        cfg = load_config(cfg_path)
+        # A config that leaves `delivery` out must behave like the sample.
+        assert cfg.email.delivery == EmailConfig("", "", "", 0, "").delivery
+
+    def test_sample_documents_every_option_install_writes(self) -> None:
+        sample = configparser.ConfigParser()
+        sample.read(SAMPLE_CONFIG)
+        generated = configparser.ConfigParser()
+        generated.read_string(
+            install._render_config(
+                from_addr="box@example.com",
+                to_addr="ops@example.com",
+                smtp_server="smtp.example.com",
+                smtp_port="587",
+                auto_reboot=False,
+                services="sshd",
+            )
+        )
+        for section in generated.sections():
+            assert set(generated[section]) <= set(sample[section]), section
@@ -0,0 +1,134 @@
+"""Tests for sysmaint.core.dbus and the D-Bus systemd backend in core.system.
+
+The backend is exercised end to end against tests/fake_dbus.py, a local
+stand-in bus that speaks the real wire protocol.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sysmaint.core import dbus
+from sysmaint.core.system import (
+    get_service_statuses,
+    get_timer_statuses,
+    unit_object_path,
+)
+from tests.fake_dbus import FakeSystemdBus
+
+_NEXT_RUN_USEC = 1_761_361_200_000_000
+
+
+@pytest.fixture
+def fake_bus(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    units = {
+        "ssh.service": {"LoadState": "loaded", "ActiveState": "active", "SubState": "running"},
+        "postfix.service": {"LoadState": "loaded", "ActiveState": "failed", "SubState": "failed"},
+        "sysmaint-update.timer": {
+            "LoadState": "loaded",
+            "ActiveState": "active",
+            "NextElapseUSecRealtime": _NEXT_RUN_USEC,
+            "LastTriggerUSec": 0,
+            "Result": "success",
+        },
+    }
+    with FakeSystemdBus(tmp_path / "bus", units) as bus:
+        monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", bus.address)
+        yield bus
+
+
+class TestMarshalling:
+    @pytest.mark.parametrize(
+        "signature, value",
+        [
+            ("y", 7),
+            ("b", True),
+            ("n", -3),
+            ("u", 4_000_000_000),
+            ("x", -(2**40)),
+            ("t", 2**64 - 1),
+            ("d", 1.5),
+            ("s", "héllo"),
+            ("o", "/org/freedesktop/systemd1"),
+            ("g", "a{sv}"),
+            ("as", ["a", "bb", ""]),
+            ("a{st}", {"x": 1, "y": 2}),
+            ("(sut)", ("a", 1, 2)),
+            ("a(yv)", [(1, ("s", "v"))]),
+        ],
+    )
+    def test_round_trip(self, signature: str, value) -> None:
+        wire = dbus.encode_message(dbus.METHOD_RETURN, 9, {dbus.FIELD_REPLY_SERIAL: 1}, signature, [value])
+        assert dbus.message_length(wire) == len(wire)
+        msg = dbus.decode_message(wire)
+        assert msg.serial == 9
+        assert msg.signature == signature
+        expected = [(1, "v")] if signature == "a(yv)" else value  # variants unwrap
+        assert msg.body == [expected]
+
+    def test_split_signature(self) -> None:
+        assert dbus.split_signature("sa{sv}(ii)u") == ["s", "a{sv}", "(ii)", "u"]
+
+    def test_truncated_message_raises_dbus_error(self) -> None:
+        wire = dbus.encode_message(dbus.METHOD_RETURN, 1, {}, "s", ["hello"])
+        with pytest.raises(dbus.DBusError):
+            dbus.decode_message(wire[:-4])
+
+    def test_socket_address(self) -> None:
+        assert dbus.socket_address("unix:path=/run/dbus/system_bus_socket,guid=x") == (
+            "/run/dbus/system_bus_socket"
+        )
+        assert dbus.socket_address("tcp:host=x;unix:abstract=bus") == "\0bus"
+        with pytest.raises(dbus.DBusError):
+            dbus.socket_address("tcp:host=localhost,port=1")
+
+
+def test_unit_object_path_escaping() -> None:
+    assert unit_object_path("ssh.service") == "/org/freedesktop/systemd1/unit/ssh_2eservice"
+    assert unit_object_path("php8.2-fpm.service") == (
+        "/org/freedesktop/systemd1/unit/php8_2e2_2dfpm_2eservice"
+    )
+    assert unit_object_path("1x") == "/org/freedesktop/systemd1/unit/_31x"
+
+
+class TestDBusBackend:
+    def test_services_resolved_over_one_connection_without_forking(self, fake_bus) -> None:
+        with patch("sysmaint.core.system.subprocess.run") as run:
+            statuses = get_service_statuses(["ssh", "postfix", "ghost"])
+        run.assert_not_called()
+        assert [(s.name, s.active, s.state) for s in statuses] == [
+            ("ssh", True, "active"),
+            ("postfix", False, "failed"),
+            ("ghost", False, "not-installed"),
+        ]
+        assert fake_bus.connections == 1
+        assert [member for member, _ in fake_bus.calls] == ["Hello", "GetAll", "GetAll", "GetAll"]
+
+    def test_timer_properties_are_formatted_like_systemctl(self, fake_bus) -> None:
+        (timer, missing) = get_timer_statuses(["sysmaint-update.timer", "sysmaint-pihole.timer"])
+        expected_next = time.strftime(
+            "%a %Y-%m-%d %H:%M:%S %Z", time.localtime(_NEXT_RUN_USEC / 1_000_000)
+        )
+        assert (timer.state, timer.loaded, timer.result) == ("active", "loaded", "success")
+        assert timer.next == expected_next
+        assert timer.last == "(never)"
+        assert missing.loaded == "not-found"
+
+    def test_falls_back_to_systemctl_without_a_bus(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", f"unix:path={tmp_path / 'absent'}")
+        with patch("sysmaint.core.system.subprocess.run", side_effect=FileNotFoundError) as run:
+            (status,) = get_service_statuses(["ssh"])
+        run.assert_called_once()
+        assert status.state == "no-systemd"
+
+    def test_systemctl_backend_never_touches_the_bus(self, fake_bus) -> None:
+        with patch("sysmaint.core.system.subprocess.run", side_effect=FileNotFoundError):
+            (status,) = get_service_statuses(["ssh"], backend="systemctl")
+        assert status.state == "no-systemd"
+        assert fake_bus.connections == 0
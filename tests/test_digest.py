@@ -0,0 +1,229 @@
+"""Tests for the fleet digest: spooled host records and the collector."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sysmaint.core import digest
+from sysmaint.core.email import EmailError
+from sysmaint.core.health import HealthSnapshot
+from sysmaint.core.runner import CommandResult
+from sysmaint.core.system import DiskUsage, HostInfo, ServiceStatus
+from sysmaint.tasks import apt_update, digest_cmd
+
+
+def _record(host: str, **overrides) -> digest.HostRecord:
+    base = digest.HostRecord(
+        host=host, fqdn=f"{host}.lan", finished="2025-06-01T03:12:00", duration=42.0
+    )
+    return replace(base, **overrides)
+
+
+def _snapshot(host: str = "web1") -> HealthSnapshot:
+    return HealthSnapshot(
+        host=HostInfo(
+            hostname=host, fqdn=f"{host}.lan", distro="Debian", kernel="6.1", architecture="x86_64"
+        ),
+        disks=(DiskUsage("/", 100.0, 91.0, 91), DiskUsage("/boot", 1.0, 0.2, 20)),
+        services=(
+            ServiceStatus("sshd", True, "active"),
+            ServiceStatus("postfix", False, "failed"),
+        ),
+        timers=(),
+        reboot_required=True,
+        reboot_packages=("linux-image-6.1.0-22-amd64",),
+    )
+
+
+class TestSpool:
+    def test_round_trip_through_spool(self, tmp_path: Path) -> None:
+        record = _record(
+            "web1",
+            upgraded=3,
+            packages=("curl", "openssl"),
+            failed_commands=(digest.FailedCommand("apt-get autoclean", 100, "E: lock"),),
+        )
+        path = digest.spool_record(tmp_path, record)
+
+        assert path == tmp_path / "web1.json"
+        records, paths = digest.load_records(tmp_path)
+        assert records == [record]
+        assert paths == [path]
+
+    def test_rewrite_replaces_the_hosts_record(self, tmp_path: Path) -> None:
+        digest.spool_record(tmp_path, _record("web1", upgraded=1))
+        digest.spool_record(tmp_path, _record("web1", upgraded=7))
+        records, _ = digest.load_records(tmp_path)
+        assert [r.upgraded for r in records] == [7]
+        assert [p.name for p in tmp_path.iterdir()] == ["web1.json"]
+
+    def test_unreadable_records_are_skipped_and_kept(
+        self, tmp_path: Path, silent_logger: logging.Logger
+    ) -> None:
+        digest.spool_record(tmp_path, _record("web1"))
+        (tmp_path / "junk.json").write_text("{not json")
+        (tmp_path / "future.json").write_text('{"version": 99, "host": "x"}')
+
+        records, paths = digest.load_records(tmp_path, silent_logger)
+        assert [r.host for r in records] == ["web1"]
+        assert [p.name for p in paths] == ["web1.json"]
+
+        records, paths = digest.claim_records(tmp_path, silent_logger)
+        assert [p.name for p in paths] == ["web1.json"]
+        assert sorted(p.name for p in tmp_path.glob("*.json")) == ["future.json", "junk.json"]
+
+    def test_missing_spool_is_empty(self, tmp_path: Path) -> None:
+        assert digest.load_records(tmp_path / "nope") == ([], [])
+
+
+class TestRenderDigest:
+    def test_failures_and_reboots_first(self) -> None:
+        records = [
+            _record("alpha", upgraded=2),
+            _record("zulu", failed_commands=(digest.FailedCommand("apt-get update", 100),)),
+            _record("mike", reboot_required=True, upgraded=5),
+            _record("bravo"),
+        ]
+        subject, body = digest.render_digest(records)
+
+        assert subject == "sysmaint fleet digest: 4 hosts, 1 FAILED, 1 REBOOT REQUIRED, 7 upgraded"
+        order = [body.index(f"] {h}") for h in ("zulu", "mike", "alpha", "bravo")]
+        assert order == sorted(order)
+        assert "FAIL exit=100: apt-get update" in body
+
+    def test_empty_spool_still_renders(self) -> None:
+        subject, body = digest.render_digest([])
+        assert subject.startswith("sysmaint fleet digest: 0 hosts")
+        assert "no host records" in body
+
+
+class TestDigestMode:
+    @pytest.fixture(autouse=True)
+    def _history_db(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(apt_update.history, "DEFAULT_HISTORY_DB", tmp_path / "history.db")
+        monkeypatch.setattr(apt_update.status_cache, "RUN_MARKER", tmp_path / "last-run")
+
+    def test_update_writes_record_instead_of_emailing(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        cfg = replace(
+            example_config,
+            notify=replace(example_config.notify, mode="digest", digest_dir=tmp_path),
+        )
+        outcome = apt_update.UpdateOutcome(
+            results=[
+                CommandResult(("apt-get", "update"), 100, "", "E: mirror down", 2.0),
+                CommandResult(("apt-get", "dist-upgrade"), 0, "", "", 30.0),
+            ],
+            packages_upgraded=4,
+            upgraded_names=["curl"],
+        )
+        with patch.object(apt_update, "run_apt_maintenance", return_value=outcome), patch.object(
+            apt_update, "collect_snapshot", return_value=_snapshot()
+        ), patch.object(apt_update, "maybe_reboot"), patch.object(
+            apt_update.mailqueue, "deliver_in_background"
+        ) as send:
+            apt_update.execute(cfg, silent_logger)
+
+        send.assert_not_called()
+        (record,), _ = digest.load_records(tmp_path)
+        assert record.host == "web1"
+        assert record.status == digest.FAILED
+        assert record.failed_commands[0].stderr == "E: mirror down"
+        assert record.disks_over == ("/ 91%",)
+        assert record.services_down == ("postfix",)
+        assert record.duration == 32.0
+
+    def test_unwritable_spool_falls_back_to_email(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cfg = replace(
+            example_config,
+            notify=replace(example_config.notify, mode="digest", digest_dir=blocker / "spool"),
+        )
+        failed = apt_update.UpdateOutcome(
+            results=[CommandResult(("apt-get", "update"), 100, "", "", 1.0)]
+        )
+        with patch.object(apt_update, "run_apt_maintenance", return_value=failed), patch.object(
+            apt_update, "collect_snapshot", return_value=_snapshot()
+        ), patch.object(apt_update, "maybe_reboot"), patch.object(
+            apt_update.mailqueue, "deliver_in_background"
+        ) as send:
+            apt_update.execute(cfg, silent_logger)
+
+        send.assert_called_once()
+
+
+class TestCollector:
+    @pytest.fixture
+    def digest_config(self, tmp_path: Path, example_config):
+        return replace(
+            example_config, notify=replace(example_config.notify, digest_dir=tmp_path)
+        )
+
+    def test_sends_one_email_and_clears_spool(
+        self, tmp_path: Path, digest_config, silent_logger: logging.Logger
+    ) -> None:
+        for host in ("web1", "web2", "db1"):
+            digest.spool_record(tmp_path, _record(host))
+
+        with patch.object(digest_cmd.email_mod, "send_email") as send:
+            assert digest_cmd.execute(digest_config, silent_logger) == 0
+
+        send.assert_called_once()
+        assert send.call_args.kwargs["subject"].startswith("sysmaint fleet digest: 3 hosts")
+        assert list(tmp_path.glob("*.json")) == []
+
+    def test_failed_send_keeps_records(
+        self, tmp_path: Path, digest_config, silent_logger: logging.Logger
+    ) -> None:
+        digest.spool_record(tmp_path, _record("web1"))
+        with patch.object(
+            digest_cmd.email_mod, "send_email", side_effect=EmailError("relay down")
+        ):
+            assert digest_cmd.execute(digest_config, silent_logger) == 1
+        assert [p.name for p in tmp_path.glob("*.json")] == ["web1.json"]
+        assert list((tmp_path / digest.SENDING_DIR).iterdir()) == []
+
+    def test_keep_leaves_records_in_the_spool(
+        self, tmp_path: Path, digest_config, silent_logger: logging.Logger
+    ) -> None:
+        digest.spool_record(tmp_path, _record("web1"))
+        with patch.object(digest_cmd.email_mod, "send_email"):
+            assert digest_cmd.execute(digest_config, silent_logger, keep=True) == 0
+        assert [p.name for p in tmp_path.glob("*.json")] == ["web1.json"]
+
+    def test_record_rewritten_during_send_survives(
+        self, tmp_path: Path, digest_config, silent_logger: logging.Logger
+    ) -> None:
+        digest.spool_record(tmp_path, _record("web1", upgraded=1))
+        digest.spool_record(tmp_path, _record("web2", upgraded=1))
+
+        def send_email(**_kwargs: object) -> None:
+            digest.spool_record(tmp_path, _record("web1", upgraded=9))
+
+        with patch.object(digest_cmd.email_mod, "send_email", side_effect=send_email):
+            assert digest_cmd.execute(digest_config, silent_logger) == 0
+        records, _ = digest.load_records(tmp_path)
+        assert [(r.host, r.upgraded) for r in records] == [("web1", 9)]
+
+    def test_newer_record_wins_over_a_failed_send(
+        self, tmp_path: Path, digest_config, silent_logger: logging.Logger
+    ) -> None:
+        digest.spool_record(tmp_path, _record("web1", upgraded=1))
+
+        def send_email(**_kwargs: object) -> None:
+            digest.spool_record(tmp_path, _record("web1", upgraded=9))
+            raise EmailError("relay down")
+
+        with patch.object(digest_cmd.email_mod, "send_email", side_effect=send_email):
+            assert digest_cmd.execute(digest_config, silent_logger) == 1
+        records, _ = digest.load_records(tmp_path)
+        assert [r.upgraded for r in records] == [9]
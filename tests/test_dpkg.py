@@ -0,0 +1,88 @@
+"""Tests for sysmaint.core.dpkg — the dpkg status reader and snapshot diff."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from sysmaint.core import dpkg
+from sysmaint.core.apt_output import INSTALL, REMOVE, UPGRADE
+
+STATUS = """\
+Package: libc6
+Status: install ok installed
+Priority: optional
+Architecture: amd64
+Multi-Arch: same
+Version: 2.36-9+deb12u7
+Description: GNU C Library: Shared libraries
+ Package: not-a-field
+ Version: also not a field
+Conffiles:
+ /etc/ld.so.conf.d/x86_64-linux-gnu.conf 593ad12389ab2b6f952e7ede67b8fbbf
+
+Package: libc6
+Status: install ok installed
+Architecture: i386
+Multi-Arch: same
+Version: 2.36-9+deb12u7
+
+Package: curl
+Status: install ok installed
+Architecture: amd64
+Version: 7.88.1-10+deb12u5
+
+Package: removed-but-configured
+Status: deinstall ok config-files
+Architecture: all
+Version: 1.0
+
+Package: half-done
+Status: install reinstreq half-configured
+Architecture: amd64
+Version: 3.1-1
+"""
+
+
+def _status(tmp_path: Path, text: str) -> Path:
+    path = tmp_path / "status"
+    path.write_text(text)
+    return path
+
+
+class TestReadStatus:
+    def test_indexes_installed_packages(self, tmp_path: Path) -> None:
+        packages = dpkg.read_status(_status(tmp_path, STATUS))
+        assert sorted(packages) == ["curl", "half-done", "libc6:amd64", "libc6:i386"]
+        assert packages["curl"].version == "7.88.1-10+deb12u5"
+        assert packages["libc6:i386"].architecture == "i386"
+        assert packages["half-done"].state == "half-configured"
+
+    def test_continuation_lines_are_not_fields(self, tmp_path: Path) -> None:
+        packages = dpkg.read_status(_status(tmp_path, STATUS))
+        assert packages["libc6:amd64"].version == "2.36-9+deb12u7"
+        assert "not-a-field" not in packages
+
+    def test_empty_and_unterminated_files(self, tmp_path: Path) -> None:
+        assert dpkg.read_status(_status(tmp_path, "")) == {}
+        last = "Package: zsh\nStatus: install ok installed\nVersion: 5.9-4"
+        assert dpkg.read_status(_status(tmp_path, last))["zsh"].version == "5.9-4"
+
+
+class TestDiff:
+    def test_upgrade_install_remove(self, tmp_path: Path) -> None:
+        before = dpkg.parse_status(STATUS.encode())
+        after_text = STATUS.replace("7.88.1-10+deb12u5", "7.88.1-10+deb12u6").replace(
+            "Package: half-done", "Package: brand-new"
+        )
+        after = dpkg.parse_status(after_text.encode())
+
+        changes = {c.name: c for c in dpkg.diff(before, after)}
+        assert set(changes) == {"curl", "brand-new", "half-done"}
+        assert changes["curl"].action == UPGRADE
+        assert changes["curl"].old_version == "7.88.1-10+deb12u5"
+        assert changes["brand-new"].action == INSTALL
+        assert changes["half-done"].action == REMOVE
+
+    def test_identical_snapshots_have_no_changes(self) -> None:
+        snapshot = dpkg.parse_status(STATUS.encode())
+        assert dpkg.diff(snapshot, dict(snapshot)) == []
@@ -11,7 +11,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from sysmaint.core.email import EmailError, send_email
+from sysmaint.core.email import EmailError, OutgoingEmail, SMTPSession, send_email
 
 
 def _kwargs(**overrides):
@@ -116,3 +116,75 @@ class TestSendEmailRetry:
             with pytest.raises(EmailError, match="after 3 attempts"):
                 send_email(**_kwargs())
         assert no_sleep.call_count == 2
+
+
+def _session(**overrides) -> SMTPSession:
+    base = dict(
+        from_addr="from@example.com",
+        smtp_server="smtp.example.com",
+        smtp_port=587,
+        password="hunter2",
+    )
+    base.update(overrides)
+    return SMTPSession(**base)
+
+
+class TestSMTPSession:
+    def test_one_handshake_for_many_messages(self, no_sleep) -> None:
+        smtp_instance = MagicMock()
+        with patch("sysmaint.core.email.smtplib.SMTP") as smtp_cls:
+            smtp_cls.return_value.__enter__.return_value = smtp_instance
+            with _session() as session:
+                for i in range(3):
+                    session.send(to_addr="to@example.com", subject=f"msg {i}", body="b")
+
+        assert smtp_cls.call_count == 1
+        assert session.handshakes == 1
+        smtp_instance.login.assert_called_once()
+        assert smtp_instance.sendmail.call_count == 3
+        # Leaving the session closes (QUITs) the connection.
+        smtp_cls.return_value.__exit__.assert_called_once()
+
+    def test_dropped_connection_reconnects_without_backoff(self, no_sleep) -> None:
+        first, second = MagicMock(), MagicMock()
+        first.sendmail.side_effect = [None, smtplib.SMTPServerDisconnected("idle timeout")]
+        cms = [MagicMock(), MagicMock()]
+        cms[0].__enter__.return_value = first
+        cms[1].__enter__.return_value = second
+        with patch("sysmaint.core.email.smtplib.SMTP", side_effect=cms), _session() as session:
+            session.send(to_addr="to@example.com", subject="one", body="b")
+            session.send(to_addr="to@example.com", subject="two", body="b")
+
+        assert session.handshakes == 2
+        second.sendmail.assert_called_once()
+        assert no_sleep.call_count == 0
+
+    def test_send_many_reports_failures_and_continues(self, no_sleep) -> None:
+        smtp_instance = MagicMock()
+        smtp_instance.sendmail.side_effect = lambda _f, to, _m: (
+            (_ for _ in ()).throw(smtplib.SMTPRecipientsRefused({to[0]: (550, b"no")}))
+            if to[0] == "bad@example.com"
+            else None
+        )
+        messages = [
+            OutgoingEmail("a@example.com", "s", "b"),
+            OutgoingEmail("bad@example.com", "s", "b"),
+            OutgoingEmail("c@example.com", "s", "b"),
+        ]
+        with patch("sysmaint.core.email.smtplib.SMTP") as smtp_cls:
+            smtp_cls.return_value.__enter__.return_value = smtp_instance
+            with _session(max_attempts=1) as session:
+                failed = session.send_many(messages)
+
+        assert [m.to_addr for m, _ in failed] == ["bad@example.com"]
+        sent_to = [c.args[1][0] for c in smtp_instance.sendmail.call_args_list]
+        assert sent_to == ["a@example.com", "bad@example.com", "c@example.com"]
+
+    def test_send_many_stops_on_auth_failure(self, no_sleep) -> None:
+        with patch("sysmaint.core.email.smtplib.SMTP") as smtp_cls:
+            smtp_cls.return_value.__enter__.return_value.login.side_effect = (
+                smtplib.SMTPAuthenticationError(535, b"Bad password")
+            )
+            with _session() as session, pytest.raises(EmailError, match="authentication"):
+                session.send_many([OutgoingEmail("a@example.com", "s", "b")] * 3)
+        assert smtp_cls.call_count == 1
@@ -0,0 +1,184 @@
+"""Tests for sysmaint.tasks.fleet, driven through a fake `ssh` script."""
+
+from __future__ import annotations
+
+import logging
+import stat
+import time
+from pathlib import Path
+
+import pytest
+
+from sysmaint.tasks import fleet
+
+# Stands in for ssh: "--", then the host; the host name picks the outcome.
+# reboot* hosts drop the session like `systemctl reboot` and then answer
+# with a fresh uptime; gone* hosts never come back.
+_FAKE_SSH = """#!/bin/sh
+[ "$1" = "--" ] || {{ echo "fake-ssh: host not after --" >&2; exit 64; }}
+host="$2"; shift 2
+echo "$host $*" >> "{log}"
+case "$host $*" in
+  "reboot"*" cat /proc/uptime") echo "0.00 0.00"; exit 0 ;;
+  "gone"*" cat /proc/uptime") exit 255 ;;
+esac
+case "$host" in
+  bad*)   echo "E: dpkg was interrupted" >&2; exit 1 ;;
+  down*)  echo "ssh: connect to host $host port 22: No route to host" >&2; exit 255 ;;
+  busy*)  exit 3 ;;
+  slow*)  sleep 5 ;;
+  reboot*|gone*)
+    echo "WARNING: Triggering auto-reboot now (window=03:00-05:00)" >&2
+    echo "Connection to $host closed by remote host." >&2
+    exit 255 ;;
+esac
+sleep {delay}
+echo "updated $host"
+"""
+
+
+@pytest.fixture
+def fake_ssh(tmp_path: Path) -> tuple[list[str], Path]:
+    log = tmp_path / "calls.log"
+    script = tmp_path / "fake-ssh"
+    script.write_text(_FAKE_SSH.format(log=log, delay=0.2))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return [str(script)], log
+
+
+class TestLoadInventory:
+    def test_skips_comments_blanks_and_duplicates(self, tmp_path: Path) -> None:
+        inv = tmp_path / "hosts.txt"
+        inv.write_text("# web tier\nweb1\nweb2  # canary\n\nadmin@db1\nweb1\n")
+        assert fleet.load_inventory(inv) == ["web1", "web2", "admin@db1"]
+
+
+class TestRunFleet:
+    def test_runs_remote_command_on_every_host(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, log = fake_ssh
+        result = fleet.run_fleet(["h1", "h2", "h3"], ssh_command=ssh, concurrency=3)
+
+        assert sorted(h.host for h in result.hosts) == ["h1", "h2", "h3"]
+        assert all(h.status == fleet.OK for h in result.hosts)
+        assert sorted(log.read_text().splitlines()) == [
+            f"h{i} sudo -n sysmaint update" for i in (1, 2, 3)
+        ]
+
+    def test_hosts_run_concurrently(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, _ = fake_ssh
+        start = time.monotonic()
+        fleet.run_fleet([f"h{i}" for i in range(8)], ssh_command=ssh, concurrency=8)
+        # 8 x 0.2s serially would be 1.6s.
+        assert time.monotonic() - start < 1.2
+
+    def test_maps_exit_codes_to_statuses(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, _ = fake_ssh
+        result = fleet.run_fleet(["ok1", "bad1", "down1", "busy1"], ssh_command=ssh)
+        by_host = {h.host: h for h in result.hosts}
+
+        assert by_host["ok1"].status == fleet.OK
+        assert by_host["bad1"].status == fleet.FAILED
+        assert by_host["bad1"].detail == "E: dpkg was interrupted"
+        assert by_host["down1"].status == fleet.UNREACHABLE
+        assert by_host["busy1"].status == fleet.BUSY
+        # Busy hosts are reported but don't count as failures.
+        assert {h.host for h in result.failures} == {"bad1", "down1"}
+
+    def test_per_host_timeout(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, _ = fake_ssh
+        result = fleet.run_fleet(["slow1"], ssh_command=ssh, timeout=1)
+        assert result.hosts[0].status == fleet.TIMEOUT
+
+    def test_batches_run_in_order(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, log = fake_ssh
+        fleet.run_fleet(
+            ["a1", "a2", "b1", "b2", "c1"], ssh_command=ssh, concurrency=5, batch_size=2
+        )
+        started = [line.split()[0] for line in log.read_text().splitlines()]
+        assert sorted(started[:2]) == ["a1", "a2"]
+        assert sorted(started[2:4]) == ["b1", "b2"]
+        assert started[4] == "c1"
+
+    def test_aborts_after_max_failures(self, fake_ssh: tuple[list[str], Path]) -> None:
+        ssh, log = fake_ssh
+        hosts = ["bad1", "bad2", "h1", "h2", "h3", "h4"]
+        result = fleet.run_fleet(
+            hosts, ssh_command=ssh, concurrency=1, batch_size=3, max_failures=1
+        )
+
+        assert result.aborted
+        assert [h.host for h in result.hosts if h.status == fleet.SKIPPED] == [
+            "h1", "h2", "h3", "h4",
+        ]
+        assert len(log.read_text().splitlines()) == 2
+        assert len(result.hosts) == len(hosts)
+
+    def test_host_that_rebooted_itself_is_not_unreachable(
+        self, fake_ssh: tuple[list[str], Path], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(fleet, "_REBOOT_POLL_SEC", 0)
+        ssh, log = fake_ssh
+        result = fleet.run_fleet(["reboot1", "gone1"], ssh_command=ssh, reboot_wait=0.2)
+        by_host = {h.host: h for h in result.hosts}
+
+        assert by_host["reboot1"].status == fleet.REBOOTED
+        assert by_host["gone1"].status == fleet.UNREACHABLE
+        assert "not back" in by_host["gone1"].detail
+        assert {h.host for h in result.failures} == {"gone1"}
+        assert "reboot1 cat /proc/uptime" in log.read_text().splitlines()
+
+    def test_host_is_passed_after_end_of_options(
+        self, fake_ssh: tuple[list[str], Path]
+    ) -> None:
+        ssh, log = fake_ssh
+        result = fleet.run_fleet(["-oProxyCommand=touch /tmp/x"], ssh_command=ssh)
+        # The fake ssh exits 64 unless the host follows "--".
+        assert result.hosts[0].status == fleet.OK
+        assert log.read_text().startswith("-oProxyCommand=touch /tmp/x ")
+
+    def test_missing_ssh_binary_is_unreachable(self, tmp_path: Path) -> None:
+        result = fleet.run_fleet(["h1"], ssh_command=[str(tmp_path / "no-such-ssh")])
+        assert result.hosts[0].status == fleet.UNREACHABLE
+
+
+class TestExecute:
+    def test_summary_lists_failures_first_and_exit_code(
+        self,
+        tmp_path: Path,
+        fake_ssh: tuple[list[str], Path],
+        silent_logger: logging.Logger,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        inv = tmp_path / "hosts.txt"
+        inv.write_text("alpha\nbad-zeta\n")
+
+        rc = fleet.execute(
+            silent_logger,
+            inventory=inv,
+            concurrency=2,
+            batch_size=None,
+            max_failures=None,
+            ssh=fake_ssh[0][0],
+            timeout=30,
+        )
+
+        out = capsys.readouterr().out
+        assert rc == 1
+        assert "ok: 1   failed: 1" in out
+        assert out.index("bad-zeta") < out.index("alpha")
+
+    def test_empty_inventory_is_usage_error(
+        self, tmp_path: Path, silent_logger: logging.Logger
+    ) -> None:
+        inv = tmp_path / "hosts.txt"
+        inv.write_text("# nothing yet\n")
+        rc = fleet.execute(
+            silent_logger,
+            inventory=inv,
+            concurrency=1,
+            batch_size=None,
+            max_failures=None,
+            ssh="ssh",
+            timeout=30,
+        )
+        assert rc == 2
@@ -0,0 +1,57 @@
+"""Tests for sysmaint.core.health — the concurrent host snapshot."""
+
+from __future__ import annotations
+
+import time
+from unittest.mock import patch
+
+from sysmaint.core.health import collect_snapshot
+from sysmaint.core.system import DiskUsage, ServiceStatus, TimerStatus
+
+
+def _slow(value):
+    def probe(*args, **_kwargs):
+        time.sleep(0.3)
+        return value(*args) if callable(value) else value
+
+    return probe
+
+
+def _services(names: tuple[str, ...]) -> list[ServiceStatus]:
+    return [ServiceStatus(name=n, active=n != "down", state="active") for n in names]
+
+
+def _timers(names: tuple[str, ...]) -> list[TimerStatus]:
+    return [
+        TimerStatus(name=n, state="active", loaded="loaded", next="n", last="l", result="success")
+        for n in names
+    ]
+
+
+class TestCollectSnapshot:
+    def test_probes_run_concurrently_and_keep_order(self) -> None:
+        services = ["sshd", "postfix", "down"]
+        with patch(
+            "sysmaint.core.system.get_service_statuses", side_effect=_slow(_services)
+        ), patch("sysmaint.core.system.get_timer_statuses", side_effect=_slow(_timers)), patch(
+            "sysmaint.core.system.get_disk_usage", side_effect=_slow([])
+        ):
+            start = time.monotonic()
+            snap = collect_snapshot(services, timers=["a.timer", "b.timer"])
+            elapsed = time.monotonic() - start
+        # Three 0.3s probes: serial would be 0.9s.
+        assert elapsed < 0.75
+        assert [s.name for s in snap.services] == services
+        assert not snap.services[-1].active
+        assert [t.name for t in snap.timers] == ["a.timer", "b.timer"]
+
+    def test_snapshot_carries_disks_and_reboot_state(self) -> None:
+        disks = [DiskUsage("/", 100.0, 90.0, 90), DiskUsage("/home", 100.0, 10.0, 10)]
+        with patch("sysmaint.core.system.get_disk_usage", return_value=disks), patch(
+            "sysmaint.core.system.reboot_required", return_value=True
+        ), patch("sysmaint.core.system.reboot_required_packages", return_value=["libc6"]):
+            snap = collect_snapshot()
+        assert snap.services == ()
+        assert snap.reboot_required is True
+        assert snap.reboot_packages == ("libc6",)
+        assert [d.mountpoint for d in snap.disks_over(85)] == ["/"]
@@ -0,0 +1,198 @@
+"""Tests for sysmaint.core.history — the SQLite run history."""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from sysmaint.core import history
+from sysmaint.core.apt_output import UPGRADE, PackageChange
+from sysmaint.core.health import HealthSnapshot
+from sysmaint.core.runner import CommandResult, apt_command
+from sysmaint.core.system import DiskUsage, HostInfo, ServiceStatus
+from sysmaint.tasks import apt_update, history_cmd
+
+_T0 = 1_750_000_000.0
+
+
+def _snapshot() -> HealthSnapshot:
+    return HealthSnapshot(
+        host=HostInfo(
+            hostname="web1", fqdn="web1.lan", distro="Debian", kernel="6.1", architecture="x86_64"
+        ),
+        disks=(DiskUsage("/", 100.0, 40.0, 40),),
+        services=(ServiceStatus("sshd", True, "active"),),
+        timers=(),
+        reboot_required=False,
+        reboot_packages=(),
+    )
+
+
+def _outcome() -> apt_update.UpdateOutcome:
+    return apt_update.UpdateOutcome(
+        results=[
+            CommandResult(tuple(apt_command(["update"])), 0, "", "", 10.0),
+            CommandResult(tuple(apt_command(["dist-upgrade"])), 100, "", "E: x", 50.0),
+        ],
+        packages_upgraded=1,
+        package_changes=[PackageChange("curl", UPGRADE, "8.5.0-1", "8.5.0-2", 3.5)],
+    )
+
+
+class TestStepName:
+    def test_strips_fixed_apt_options(self) -> None:
+        assert history.step_name(apt_command(["dist-upgrade"])) == "dist-upgrade"
+        assert history.step_name(apt_command(["-s", "autoremove"], proxy="http://c:3142")) == (
+            "-s autoremove"
+        )
+
+    def test_step_name_leaves_out_package_names(self) -> None:
+        cmd = apt_command(["install", "--only-upgrade", "curl", "libcurl4", "openssl"])
+        assert history.step_name(cmd) == "install --only-upgrade"
+        assert history.step_name(apt_command(["install", "--only-upgrade", "tzdata"])) == (
+            "install --only-upgrade"
+        )
+
+
+def _populate(conn: sqlite3.Connection, weeks: int) -> None:
+    """One run a week; dist-upgrade takes `week` seconds and fails every 10th week."""
+    week = 7 * 24 * 3600
+    for n in range(1, weeks + 1):
+        start = _T0 + n * week
+        history.record_run(
+            conn,
+            history.RunRecord(
+                host="web1",
+                kind="update",
+                started=start,
+                finished=start + n + 1,
+                upgraded=n % 7,
+                steps=(
+                    history.StepRecord("update", "apt-get update", start, 1.0, 0),
+                    history.StepRecord(
+                        "dist-upgrade", "apt-get dist-upgrade", start + 1, float(n),
+                        100 if n % 10 == 0 else 0,
+                    ),
+                ),
+            ),
+        )
+
+
+class TestRecordRun:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        run = apt_update.build_history_run(
+            _outcome(), _snapshot(), started=_T0, finished=_T0 + 65
+        )
+        conn = history.connect(tmp_path / "history.db")
+        run_id = history.record_run(conn, run)
+
+        assert conn.execute(
+            "SELECT host, kind, upgraded, failed_steps FROM runs WHERE id = ?", (run_id,)
+        ).fetchone() == ("web1", "update", 1, 1)
+        # Steps ran back to back: the upgrade started when `update` finished.
+        assert conn.execute(
+            "SELECT step, started, duration, returncode FROM steps ORDER BY seq"
+        ).fetchall() == [("update", _T0, 10.0, 0), ("dist-upgrade", _T0 + 10, 50.0, 100)]
+        assert conn.execute("SELECT name, new_version FROM packages").fetchall() == [
+            ("curl", "8.5.0-2")
+        ]
+        assert conn.execute("SELECT mountpoint, used_percent FROM disks").fetchall() == [("/", 40)]
+        assert conn.execute("SELECT name, active FROM services").fetchall() == [("sshd", 1)]
+
+    def test_step_duration_query_uses_index(self, tmp_path: Path) -> None:
+        conn = history.connect(tmp_path / "history.db")
+        plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT duration FROM steps"
+                " WHERE step = ? AND started BETWEEN ? AND ?",
+                ("dist-upgrade", _T0, _T0 + 1),
+            )
+        )
+        assert "COVERING INDEX steps_by_step_time" in plan
+
+    def test_newer_schema_is_refused(self, tmp_path: Path) -> None:
+        path = tmp_path / "history.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute(f"PRAGMA user_version = {history.SCHEMA_VERSION + 1}")
+        with pytest.raises(history.HistoryError, match="schema version"):
+            history.connect(path)
+
+    def test_unwritable_database_does_not_fail_the_run(
+        self, tmp_path: Path, silent_logger: logging.Logger, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setattr(history, "DEFAULT_HISTORY_DB", blocker / "history.db")
+        run = apt_update.build_history_run(_outcome(), _snapshot(), started=_T0, finished=_T0)
+        apt_update._record_history(run, silent_logger)  # logs, doesn't raise
+
+
+class TestQueries:
+    @pytest.fixture
+    def conn(self, tmp_path: Path) -> sqlite3.Connection:
+        conn = history.connect(tmp_path / "history.db")
+        _populate(conn, 100)
+        return conn
+
+    def test_step_percentiles(self, conn: sqlite3.Connection) -> None:
+        stats = {s.step: s for s in history.step_stats(conn)}
+
+        assert sorted(stats) == ["dist-upgrade", "update"]
+        upgrade = stats["dist-upgrade"]
+        assert (upgrade.duration.count, upgrade.failures) == (100, 10)
+        assert (upgrade.duration.p50, upgrade.duration.p95, upgrade.duration.max) == (50, 95, 100)
+
+    def test_filters_by_step_window_and_failure(self, conn: sqlite3.Connection) -> None:
+        week = 7 * 24 * 3600
+        (only,) = history.step_stats(
+            conn,
+            step="dist-upgrade",
+            since=_T0 + 11 * week,
+            until=_T0 + 51 * week,
+            failures_only=True,
+        )
+        assert only.duration.count == 4  # weeks 20, 30, 40, 50
+        assert only.duration.max == 50
+
+        packages = history.package_stats(conn, since=_T0 + 95 * week)
+        assert packages.count == 6
+        assert packages.max == 6
+
+    def test_queries_are_answered_from_indexes(self, conn: sqlite3.Connection) -> None:
+        def plan(sql: str, params: tuple[object, ...]) -> str:
+            return " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+        assert "COVERING INDEX steps_by_step_time" in plan(history._NEXT_STEP_SQL, ("",))
+        assert "COVERING INDEX steps_by_step_time" in plan(
+            history._STEP_DURATIONS_SQL, ("update", 0, 1)
+        )
+        assert "INDEX runs_by_time" in plan(history._RUN_COUNTS_SQL, (0, 1))
+
+    def test_percentile_nearest_rank(self) -> None:
+        assert history.percentile([], 50) == 0.0
+        assert history.percentile([4.0], 95) == 4.0
+        assert history.percentile(list(range(1, 21)), 95) == 19
+
+
+class TestHistoryCommand:
+    def test_prints_report(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        db = tmp_path / "history.db"
+        _populate(history.connect(db), 20)
+
+        assert history_cmd.execute(db=db, until=dt.date(2100, 1, 1)) == 0
+
+        out = capsys.readouterr().out
+        assert "20 run(s)" in out
+        assert "dist-upgrade" in out
+        assert "20.0s" in out
+
+    def test_missing_database_is_not_an_error(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        assert history_cmd.execute(db=tmp_path / "none.db") == 0
+        assert "No run history yet" in capsys.readouterr().out
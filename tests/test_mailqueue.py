@@ -0,0 +1,190 @@
+"""Tests for sysmaint.core.mailqueue — the durable outbound spool."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from sysmaint.core import mailqueue
+from sysmaint.core.email import EmailAuthError, EmailError
+
+_NOW = 1_750_000_000.0
+
+
+@pytest.fixture
+def session():
+    """Patch SMTPSession; the yielded mock is the session inside `with`."""
+    with patch("sysmaint.core.mailqueue.email_mod.SMTPSession") as cls:
+        yield cls.return_value.__enter__.return_value
+
+
+def _enqueue(outbox: Path, subject: str, *, now: float = _NOW) -> Path:
+    return mailqueue.enqueue(outbox, to_addr="to@example.com", subject=subject, body="b", now=now)
+
+
+class TestEnqueue:
+    def test_writes_private_file_in_time_order(self, tmp_path: Path) -> None:
+        second = _enqueue(tmp_path, "second", now=_NOW + 1)
+        first = _enqueue(tmp_path, "first", now=_NOW)
+
+        assert mailqueue.queued(tmp_path) == [first, second]
+        assert first.stat().st_mode & 0o777 == 0o600
+        assert mailqueue.load(first).subject == "first"
+
+
+class TestBackoff:
+    def test_exponential_with_cap_and_jitter(self) -> None:
+        lo = [mailqueue.backoff_delay(n, rng=lambda: 0.0) for n in (1, 2, 3)]
+        hi = [mailqueue.backoff_delay(n, rng=lambda: 1.0) for n in (1, 2, 3)]
+        assert lo == [30, 60, 120]
+        assert hi == [60, 120, 240]
+        assert mailqueue.backoff_delay(50, rng=lambda: 1.0) == 6 * 60 * 60
+
+
+class TestFlush:
+    def test_sends_due_messages_in_one_session(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger, session: MagicMock
+    ) -> None:
+        for offset, subject in enumerate(("a", "b", "c")):
+            _enqueue(tmp_path, subject, now=_NOW - 3 + offset)
+
+        result = mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW)
+
+        assert (result.sent, result.deferred) == (3, 0)
+        assert [c.kwargs["subject"] for c in session.send.call_args_list] == ["a", "b", "c"]
+        assert mailqueue.queued(tmp_path) == []
+
+    def test_failure_defers_with_backoff(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger, session: MagicMock
+    ) -> None:
+        path = _enqueue(tmp_path, "a")
+        session.send.side_effect = EmailError("relay down")
+
+        result = mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW)
+
+        assert result.deferred == 1
+        message = mailqueue.load(path)
+        assert message.attempts == 1
+        assert message.last_error == "relay down"
+        assert _NOW + 30 <= message.next_attempt <= _NOW + 60
+
+        # Not due yet: the next flush leaves it alone...
+        session.send.reset_mock()
+        mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW + 10)
+        session.send.assert_not_called()
+        # ...unless forced.
+        session.send.side_effect = None
+        mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW + 10, force=True)
+        assert mailqueue.queued(tmp_path) == []
+
+    def test_auth_failure_defers_the_rest_without_trying(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger, session: MagicMock
+    ) -> None:
+        for subject in ("a", "b", "c"):
+            _enqueue(tmp_path, subject)
+        session.send.side_effect = EmailAuthError("bad password")
+
+        result = mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW)
+
+        assert result.auth_failed
+        assert result.deferred == 3
+        assert session.send.call_count == 1
+        assert all(mailqueue.load(p).attempts == 1 for p in mailqueue.queued(tmp_path))
+
+    def test_unwritable_retry_state_does_not_stop_the_flush(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        example_config,
+        silent_logger: logging.Logger,
+        session: MagicMock,
+    ) -> None:
+        first = _enqueue(tmp_path, "a", now=_NOW - 1)
+        _enqueue(tmp_path, "b")
+        session.send.side_effect = [EmailError("mailbox full"), None]
+
+        def read_only(*_args: object, **_kwargs: object) -> None:
+            raise OSError("read-only file system")
+
+        monkeypatch.setattr(mailqueue.state, "write_json", read_only)
+        result = mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW)
+
+        assert (result.sent, result.deferred) == (1, 1)
+        assert mailqueue.queued(tmp_path) == [first]
+        assert mailqueue.load(first).attempts == 0
+
+    def test_expired_messages_move_to_dead(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger, session: MagicMock
+    ) -> None:
+        old = _enqueue(tmp_path, "old", now=_NOW - 8 * 24 * 3600)
+
+        result = mailqueue.flush(example_config, silent_logger, outbox=tmp_path, now=_NOW)
+
+        assert result.expired == 1
+        session.send.assert_not_called()
+        assert (tmp_path / "dead" / old.name).exists()
+
+
+class TestDeliver:
+    def test_queued_mode_only_spools(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        cfg = replace(example_config, email=replace(example_config.email, delivery="queued"))
+        with patch("sysmaint.core.mailqueue.email_mod.send_email") as send:
+            mailqueue.deliver(cfg, subject="s", body="b", logger=silent_logger, outbox=tmp_path)
+        send.assert_not_called()
+        assert len(mailqueue.queued(tmp_path)) == 1
+
+    def test_direct_mode_queues_only_on_failure(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        with patch("sysmaint.core.mailqueue.email_mod.send_email") as send:
+            mailqueue.deliver(
+                example_config, subject="s", body="b", logger=silent_logger, outbox=tmp_path
+            )
+            assert mailqueue.queued(tmp_path) == []
+
+            send.side_effect = EmailError("down")
+            mailqueue.deliver(
+                example_config, subject="s", body="b", logger=silent_logger, outbox=tmp_path
+            )
+        assert len(mailqueue.queued(tmp_path)) == 1
+
+
+class TestDeliverInBackground:
+    def test_sends_on_a_thread_and_removes_spool_copy(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        release = threading.Event()
+        with patch(
+            "sysmaint.core.mailqueue.email_mod.send_email", side_effect=lambda **_: release.wait(5)
+        ):
+            pending = mailqueue.deliver_in_background(
+                example_config, subject="s", body="b", logger=silent_logger, outbox=tmp_path
+            )
+            # Returned while the send is still in progress; the message is
+            # already durable and held back from flushes.
+            assert not pending.wait(0.05)
+            (spooled,) = mailqueue.queued(tmp_path)
+            assert mailqueue.load(spooled).next_attempt > mailqueue.load(spooled).created
+
+            release.set()
+            assert pending.wait(5)
+        assert mailqueue.queued(tmp_path) == []
+
+    def test_failed_send_stays_queued(
+        self, tmp_path: Path, example_config, silent_logger: logging.Logger
+    ) -> None:
+        with patch(
+            "sysmaint.core.mailqueue.email_mod.send_email", side_effect=EmailError("down")
+        ):
+            pending = mailqueue.deliver_in_background(
+                example_config, subject="s", body="b", logger=silent_logger, outbox=tmp_path
+            )
+            assert pending.wait(5)
+        assert len(mailqueue.queued(tmp_path)) == 1
@@ -0,0 +1,77 @@
+"""Tests for sysmaint.core.metrics — the node_exporter textfile."""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+from sysmaint.core import history, metrics
+from sysmaint.core.system import DiskUsage, ServiceStatus
+
+_SAMPLE_RE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)+\})? -?[0-9.e+]+$')
+
+
+def _run(**overrides) -> history.RunRecord:
+    base = dict(
+        host="web1",
+        kind="update",
+        started=1000.0,
+        finished=1062.5,
+        upgraded=3,
+        reboot_required=True,
+        steps=(
+            history.StepRecord("update", "apt-get update", 1000.0, 2.5, 0),
+            history.StepRecord("dist-upgrade", "apt-get dist-upgrade", 1002.5, 60.0, 100),
+        ),
+        disks=(DiskUsage("/", 100.0, 91.0, 91),),
+        services=(ServiceStatus("sshd", True, "active"), ServiceStatus('we"ird', False, "failed")),
+    )
+    base.update(overrides)
+    return history.RunRecord(**base)
+
+
+class TestRender:
+    def test_every_line_is_valid_exposition_format(self) -> None:
+        for line in metrics.render(_run()).splitlines():
+            assert line.startswith(("# HELP ", "# TYPE ")) or _SAMPLE_RE.match(line), line
+
+    def test_run_step_and_host_values(self) -> None:
+        text = metrics.render(_run())
+        assert "sysmaint_last_run_duration_seconds 62.5\n" in text
+        assert "sysmaint_last_run_success 0\n" in text
+        assert 'sysmaint_step_duration_seconds{step="dist-upgrade"} 60\n' in text
+        assert 'sysmaint_step_exit_code{step="dist-upgrade"} 100\n' in text
+        assert 'sysmaint_packages{action="upgraded"} 3\n' in text
+        assert "sysmaint_reboot_required 1\n" in text
+        assert 'sysmaint_disk_used_percent{mountpoint="/"} 91\n' in text
+        assert 'sysmaint_service_up{service="we\\"ird",state="failed"} 0\n' in text
+
+    def test_timed_out_step_reports_minus_one(self) -> None:
+        step = history.StepRecord("update", "apt-get update", 0.0, 3600.0, -9, timed_out=True)
+        text = metrics.render(_run(steps=(step,)))
+        assert 'sysmaint_step_exit_code{step="update"} -1\n' in text
+
+    def test_repeated_step_is_one_series(self) -> None:
+        batch = "install --only-upgrade"
+        steps = (
+            history.StepRecord(batch, "apt-get install --only-upgrade a", 0.0, 10.0, 0),
+            history.StepRecord(batch, "apt-get install --only-upgrade b", 10.0, 5.0, 100),
+            history.StepRecord(batch, "apt-get install --only-upgrade c", 15.0, 2.5, 0),
+        )
+        text = metrics.render(_run(steps=steps))
+        assert text.count('sysmaint_step_duration_seconds{step="install --only-upgrade"}') == 1
+        assert 'sysmaint_step_duration_seconds{step="install --only-upgrade"} 17.5\n' in text
+        assert 'sysmaint_step_exit_code{step="install --only-upgrade"} 100\n' in text
+
+
+class TestWriteTextfile:
+    def test_writes_atomically_into_existing_dir(self, tmp_path: Path) -> None:
+        path = tmp_path / "sysmaint.prom"
+        assert metrics.write_textfile(_run(), path)
+        assert path.read_text() == metrics.render(_run())
+        assert [p.name for p in tmp_path.iterdir()] == ["sysmaint.prom"]
+
+    def test_skips_when_collector_dir_missing(self, tmp_path: Path) -> None:
+        path = tmp_path / "node-exporter" / "sysmaint.prom"
+        assert not metrics.write_textfile(_run(), path)
+        assert not path.parent.exists()
@@ -0,0 +1,96 @@
+"""Tests for sysmaint.tasks.prefetch — the download-ahead stage."""
+
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from sysmaint.core.runner import CommandResult
+from sysmaint.tasks import prefetch
+
+_DOWNLOAD_ONLY = """\
+2 upgraded, 0 newly installed, 0 to remove and 0 not upgraded.
+Need to get 2,255 kB of archives.
+Get:1 http://deb.debian.org/debian bookworm/main amd64 curl amd64 7.88.1-10+deb12u6 [315 kB]
+Get:2 http://deb.debian.org/debian bookworm/main amd64 libcurl4 amd64 7.88.1-10+deb12u6 [390 kB]
+Fetched 705 kB in 1s (705 kB/s)
+Download complete and in download only mode
+"""
+
+
+def _fake_run(calls: list[tuple[str, ...]], *, fail_update: bool = False):
+    def run(cmd, *, line_consumers=(), **_kwargs):
+        calls.append(tuple(cmd))
+        if "update" in cmd:
+            return CommandResult(tuple(cmd), 100 if fail_update else 0, "", "", 1.0)
+        for line in _DOWNLOAD_ONLY.splitlines():
+            for consume in line_consumers:
+                consume(line)
+        return CommandResult(tuple(cmd), 0, "", "", 2.0)
+
+    return run
+
+
+class TestRunPrefetch:
+    def test_downloads_only_at_low_priority(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        calls: list[tuple[str, ...]] = []
+        with patch.object(prefetch, "run_command", side_effect=_fake_run(calls)), patch.object(
+            prefetch.shutil, "which", return_value="/usr/bin/x"
+        ):
+            outcome = prefetch.run_prefetch(example_config, silent_logger)
+
+        assert outcome.succeeded
+        assert outcome.pending == 2
+        assert outcome.fetched == {"curl": "7.88.1-10+deb12u6", "libcurl4": "7.88.1-10+deb12u6"}
+        download = calls[1]
+        assert download[:6] == ("ionice", "-c", "3", "nice", "-n", "19")
+        assert download[-2:] == ("-d", "dist-upgrade")
+
+    def test_security_only_downloads_just_security_upgrades(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        calls: list[tuple[str, ...]] = []
+        with patch.object(prefetch, "run_command", side_effect=_fake_run(calls)), patch.object(
+            prefetch, "security_upgrades", return_value=["curl", "libcurl4"]
+        ):
+            outcome = prefetch.run_prefetch(example_config, silent_logger, security_only=True)
+        assert outcome.succeeded
+        assert calls[1][-5:] == ("-d", "install", "--only-upgrade", "curl", "libcurl4")
+
+    def test_failed_list_refresh_skips_download(
+        self, example_config, silent_logger: logging.Logger
+    ) -> None:
+        calls: list[tuple[str, ...]] = []
+        with patch.object(prefetch, "run_command", side_effect=_fake_run(calls, fail_update=True)):
+            outcome = prefetch.run_prefetch(example_config, silent_logger)
+        assert not outcome.succeeded
+        assert len(calls) == 1
+
+
+class TestState:
+    def test_later_prefetch_keeps_earlier_downloads(self, tmp_path: Path) -> None:
+        path = tmp_path / "prefetch.json"
+        prefetch.save_state(prefetch.PrefetchOutcome(fetched={"curl": "2"}), path)
+        prefetch.save_state(prefetch.PrefetchOutcome(fetched={"vim": "9"}), path)
+        assert prefetch.load_state(path)["fetched"] == {"curl": "2", "vim": "9"}
+
+    def test_cache_hits_match_name_and_version(self, tmp_path: Path) -> None:
+        path = tmp_path / "prefetch.json"
+        prefetch.save_state(prefetch.PrefetchOutcome(fetched={"curl": "2", "vim": "8"}), path)
+        hits = prefetch.cache_hits([("curl", "2"), ("vim", "9"), ("bash", "5")], path)
+        assert hits == 1
+
+    def test_cache_hits_ignore_the_arch_qualifier(self, tmp_path: Path) -> None:
+        path = tmp_path / "prefetch.json"
+        prefetch.save_state(prefetch.PrefetchOutcome(fetched={"libc6": "2.36-9"}), path)
+        hits = prefetch.cache_hits([("libc6:amd64", "2.36-9"), ("libc6:i386", "2.36-9")], path)
+        assert hits == 2
+
+    def test_stale_state_is_ignored(self, tmp_path: Path) -> None:
+        path = tmp_path / "prefetch.json"
+        prefetch.save_state(prefetch.PrefetchOutcome(fetched={"curl": "2"}), path)
+        assert prefetch.load_state(path, now=time.time() + 8 * 24 * 3600) is None
@@ -3,9 +3,14 @@
 from __future__ import annotations
 
 import os
+import subprocess
+import sys
+from typing import Any
+from unittest.mock import patch
 
 import pytest
 
+from sysmaint.core import runner
 from sysmaint.core.runner import (
     APT_ENV,
     CommandError,
@@ -74,6 +79,108 @@ class TestRunCommand:
         assert "/usr/bin" in result.stdout or "/bin" in result.stdout
 
 
+class TestRunCommandStreaming:
+    def test_lines_reach_consumers_in_order(self) -> None:
+        seen: list[str] = []
+        result = run_command(
+            ["sh", "-c", "printf 'one\\ntwo\\nthree'"],
+            timeout=5,
+            stream=True,
+            line_consumers=[seen.append],
+        )
+        assert result.succeeded
+        # The unterminated final line is still delivered.
+        assert seen == ["one", "two", "three"]
+        assert result.stdout == "one\ntwo\nthree\n"
+
+    def test_capture_keeps_bounded_head_and_tail(self) -> None:
+        seen: list[str] = []
+        result = run_command(
+            ["seq", "1", "1000"],
+            timeout=5,
+            stream=True,
+            line_consumers=[seen.append],
+            capture_lines=3,
+        )
+        assert len(seen) == 1000
+        assert result.stdout.splitlines() == [
+            "1", "2", "3", "... [994 lines omitted] ...", "998", "999", "1000",
+        ]
+        assert result.truncated_lines == 994
+
+    def test_unterminated_output_is_split_at_the_line_limit(self) -> None:
+        seen: list[str] = []
+        run_command(
+            [sys.executable, "-c", "import sys; sys.stdout.write('x' * (1 << 20))"],
+            timeout=10,
+            stream=True,
+            line_consumers=[seen.append],
+        )
+        assert max(len(line) for line in seen) == runner.MAX_LINE_BYTES
+        assert sum(len(line) for line in seen) == 1 << 20
+
+    def test_progress_redraws_keep_only_the_last_frame(self) -> None:
+        seen: list[str] = []
+        script = (
+            "import sys\n"
+            "for i in range(20000): sys.stdout.write(f'\\rProgress: [{i % 100:3d}%]')\n"
+            "sys.stdout.write('\\ndone\\n')"
+        )
+        run_command(
+            [sys.executable, "-c", script], timeout=10, stream=True, line_consumers=[seen.append]
+        )
+        assert seen == ["Progress: [ 99%]", "done"]
+
+    def test_stderr_is_captured_separately(self) -> None:
+        seen: list[str] = []
+        result = run_command(
+            ["sh", "-c", "echo out; echo err >&2; exit 3"],
+            timeout=5,
+            check=False,
+            stream=True,
+            line_consumers=[seen.append],
+        )
+        assert result.returncode == 3
+        assert seen == ["out"]
+        assert result.stderr.strip() == "err"
+
+    def test_timeout_kills_child_and_keeps_partial_output(self) -> None:
+        result = run_command(
+            ["sh", "-c", "echo started; exec sleep 5"],
+            timeout=1,
+            check=False,
+            stream=True,
+        )
+        assert result.timed_out
+        assert result.stdout.strip() == "started"
+        assert result.duration < 4
+
+    def test_nonzero_exit_raises_with_check(self) -> None:
+        with pytest.raises(CommandError):
+            run_command(["false"], timeout=5, stream=True)
+
+    def test_raising_consumer_kills_and_reaps_child(self) -> None:
+        procs: list[subprocess.Popen[bytes]] = []
+        real_popen = subprocess.Popen
+
+        def spy(*args: Any, **kwargs: Any) -> subprocess.Popen[bytes]:
+            procs.append(real_popen(*args, **kwargs))
+            return procs[-1]
+
+        def consumer(line: str) -> None:
+            raise ValueError(f"unparseable: {line}")
+
+        with patch.object(subprocess, "Popen", spy), pytest.raises(ValueError):
+            run_command(
+                ["sh", "-c", "echo first; exec sleep 3"],
+                timeout=10,
+                stream=True,
+                line_consumers=[consumer],
+            )
+        assert procs[0].returncode is not None  # killed and reaped, not left running
+        assert procs[0].stdout is not None and procs[0].stdout.closed
+
+
 class TestAptCommand:
     def test_includes_force_confold_and_yes(self) -> None:
         cmd = apt_command(["dist-upgrade"])
@@ -88,6 +195,12 @@ class TestAptCommand:
         cmd = apt_command(["install", "postfix"])
         assert cmd[-2:] == ["install", "postfix"]
 
+    def test_proxy_only_when_configured(self) -> None:
+        assert not any("Proxy" in a for a in apt_command(["update"]))
+        cmd = apt_command(["update"], proxy="http://cache1:3142")
+        assert "Acquire::http::Proxy=http://cache1:3142" in cmd
+        assert cmd[-1] == "update"
+
 
 class TestAptEnv:
     def test_disables_interactive_frontends(self) -> None:
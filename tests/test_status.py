@@ -0,0 +1,90 @@
+"""Tests for `sysmaint status` report caching (tasks/status.py, core/status_cache.py)."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from sysmaint.core import status_cache
+from sysmaint.tasks import status
+
+
+@pytest.fixture
+def renders(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Point the cache, config and run marker at tmp_path; count _render() calls."""
+    calls: list[str] = []
+
+    def fake_render() -> str:
+        calls.append("render")
+        return f"report #{len(calls)}"
+
+    config = tmp_path / "sysmaint.conf"
+    config.write_text("[email]\n")
+    monkeypatch.setattr(status, "_render", fake_render)
+    monkeypatch.setattr(status, "DEFAULT_CONFIG_PATH", config)
+    monkeypatch.setattr(status_cache, "RUN_MARKER", tmp_path / "run" / "last-run")
+    monkeypatch.setattr(status_cache, "cache_path", lambda: tmp_path / "cache" / "status.json")
+    return calls
+
+
+class TestStatusCache:
+    def test_repeat_call_is_served_from_cache(
+        self, renders: list[str], capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        assert status.execute() == 0
+        assert status.execute() == 0
+        out = capsys.readouterr().out
+        assert renders == ["render"]
+        assert out.count("report #1") == 2
+        assert "--fresh" in out
+
+    def test_fresh_bypasses_and_refreshes_cache(
+        self, renders: list[str], capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        status.execute()
+        status.execute(fresh=True)
+        status.execute()
+        assert len(renders) == 2
+        assert capsys.readouterr().out.rstrip().endswith("re-check)")
+
+    def test_config_edit_invalidates(self, renders: list[str], tmp_path: Path) -> None:
+        status.execute()
+        config = tmp_path / "sysmaint.conf"
+        st = config.stat()
+        os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        status.execute()
+        assert len(renders) == 2
+
+    def test_completed_run_invalidates(self, renders: list[str]) -> None:
+        status.execute()
+        status_cache.mark_run_complete(status_cache.RUN_MARKER)
+        status.execute()
+        status.execute()
+        assert len(renders) == 2
+
+    def test_expired_or_future_entry_is_not_reused(self, renders: list[str], tmp_path: Path) -> None:
+        status.execute()
+        path = tmp_path / "cache" / "status.json"
+        key = status_cache.validity_key(tmp_path / "sysmaint.conf", status_cache.RUN_MARKER)
+        entry = status_cache.load(path, key, max_age=60)
+        assert entry is not None
+        assert status_cache.load(path, key, max_age=60, now=entry.created + 61) is None
+        assert status_cache.load(path, key, max_age=60, now=entry.created - 5) is None
+
+    def test_corrupt_cache_is_ignored(self, renders: list[str], tmp_path: Path) -> None:
+        cache = tmp_path / "cache" / "status.json"
+        cache.parent.mkdir()
+        cache.write_text("{not json")
+        status.execute()
+        assert renders == ["render"]
+
+    def test_unprivileged_user_without_runtime_dir_does_not_cache(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(os, "geteuid", lambda: 1000)
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        assert status_cache.cache_path() is None
+        monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+        assert status_cache.cache_path() == Path("/run/user/1000/sysmaint/status.json")
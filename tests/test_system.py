@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import subprocess
 from pathlib import Path
 from unittest.mock import patch
 
@@ -12,6 +13,8 @@ from sysmaint.core.system import (
     disks_over_threshold,
     get_disk_usage,
     get_host_info,
+    get_service_statuses,
+    get_timer_statuses,
     is_within_window,
     reboot_required,
     reboot_required_packages,
@@ -93,3 +96,69 @@ class TestRebootRequired:
         absent = tmp_path / "nope"
         with patch("sysmaint.core.system.REBOOT_REQUIRED_FLAG", absent):
             assert reboot_required() is False
+
+
+def _completed(stdout: str, rc: int = 0) -> subprocess.CompletedProcess[str]:
+    return subprocess.CompletedProcess(args=[], returncode=rc, stdout=stdout, stderr="")
+
+
+class TestBatchedUnitQueries:
+    _SHOW_OUTPUT = (
+        "Id=ssh.service\nLoadState=loaded\nActiveState=active\nSubState=running\n"
+        "UnitFileState=enabled\n\n"
+        "Id=postfix.service\nLoadState=loaded\nActiveState=failed\nSubState=failed\n"
+        "UnitFileState=enabled\n\n"
+        "Id=nope.service\nLoadState=not-found\nActiveState=inactive\nSubState=dead\n"
+    )
+
+    def test_one_systemctl_call_for_all_services(self) -> None:
+        with patch(
+            "sysmaint.core.system.subprocess.run", return_value=_completed(self._SHOW_OUTPUT)
+        ) as run:
+            statuses = get_service_statuses(["sshd", "postfix", "nope"])
+        run.assert_called_once()
+        argv = run.call_args[0][0]
+        assert argv[:2] == ["systemctl", "show"]
+        assert argv[-3:] == ["sshd.service", "postfix.service", "nope.service"]
+        assert [(s.name, s.active, s.state) for s in statuses] == [
+            ("sshd", True, "active"),
+            ("postfix", False, "failed"),
+            ("nope", False, "not-installed"),
+        ]
+
+    def test_explicit_unit_suffix_is_kept(self) -> None:
+        with patch(
+            "sysmaint.core.system.subprocess.run",
+            return_value=_completed("Id=docker.socket\nLoadState=loaded\nActiveState=active\n"),
+        ) as run:
+            (status,) = get_service_statuses(["docker.socket"])
+        assert run.call_args[0][0][-1] == "docker.socket"
+        assert status.active
+
+    def test_mismatched_batch_falls_back_to_per_unit(self) -> None:
+        replies = [
+            _completed("", rc=1),  # whole batch rejected
+            _completed("Id=a.service\nLoadState=loaded\nActiveState=active\n"),
+            _completed("", rc=1),  # the bad name on its own
+        ]
+        with patch("sysmaint.core.system.subprocess.run", side_effect=replies):
+            statuses = get_service_statuses(["a", "bad name"])
+        assert [s.state for s in statuses] == ["active", "unknown"]
+
+    def test_no_systemd(self) -> None:
+        with patch("sysmaint.core.system.subprocess.run", side_effect=FileNotFoundError):
+            statuses = get_service_statuses(["a", "b"])
+        assert {s.state for s in statuses} == {"no-systemd"}
+
+    def test_timer_fields_and_empty_property_defaults(self) -> None:
+        output = (
+            "Id=sysmaint-update.timer\nActiveState=active\nLoadState=loaded\n"
+            "NextElapseUSecRealtime=Sun 2026-10-25 03:00:00 UTC\nResult=success\n\n"
+            "Id=sysmaint-pihole.timer\nActiveState=inactive\nLoadState=loaded\nResult=success\n"
+        )
+        with patch("sysmaint.core.system.subprocess.run", return_value=_completed(output)):
+            update, pihole = get_timer_statuses(["sysmaint-update.timer", "sysmaint-pihole.timer"])
+        assert update.next == "Sun 2026-10-25 03:00:00 UTC"
+        assert update.last == "(never)"
+        assert pihole.state == "inactive"
+        assert pihole.next == "(not scheduled)"
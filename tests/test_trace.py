@@ -0,0 +1,87 @@
+"""Tests for sysmaint.core.trace and the --trace CLI option."""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from sysmaint import cli
+from sysmaint.core import trace
+from sysmaint.core.runner import run_command
+
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    trace.enable()
+    yield
+    trace.disable()
+
+
+class TestSpans:
+    def test_disabled_records_nothing(self) -> None:
+        with trace.span("ignored") as s:
+            s.set(x=1)
+        trace.enable()
+        trace.disable()
+        assert trace.finished_spans() == []
+
+    def test_nesting_attributes_and_errors(self, tracing: None) -> None:
+        with trace.span("outer", "cli") as outer:
+            with trace.span("inner", n=1) as inner:
+                inner.set(rc=0)
+            with pytest.raises(ValueError), trace.span("failing"):
+                raise ValueError("boom")
+            outer.set(done=True)
+
+        by_name = {s.name: s for s in trace.finished_spans()}
+        assert [s.name for s in trace.finished_spans()] == ["outer", "inner", "failing"]
+        assert by_name["inner"].parent is by_name["outer"]
+        assert by_name["inner"].attrs == {"n": 1, "rc": 0}
+        assert by_name["failing"].attrs == {"error": "ValueError"}
+        assert by_name["outer"].duration >= by_name["inner"].duration > 0
+
+    def test_threads_nest_independently(self, tracing: None) -> None:
+        def worker() -> None:
+            with trace.span("in thread"):
+                pass
+
+        with trace.span("main"):
+            t = threading.Thread(target=worker, name="mailer")
+            t.start()
+            t.join()
+
+        spans = {s.name: s for s in trace.finished_spans()}
+        assert spans["in thread"].parent is None
+        assert spans["in thread"].thread_name == "mailer"
+
+    def test_run_command_is_traced(self, tracing: None) -> None:
+        run_command(["sh", "-c", "exit 3"], timeout=5, check=False)
+        (s,) = trace.finished_spans()
+        assert (s.name, s.category) == ("sh", "command")
+        assert s.attrs == {"argv": "sh -c 'exit 3'", "returncode": 3, "timed_out": False}
+
+
+class TestChromeExport:
+    def test_complete_events_in_microseconds(self, tracing: None) -> None:
+        with trace.span("step", "apt", argv="apt-get update"):
+            pass
+        doc = trace.chrome_trace(trace.finished_spans())
+
+        (event,) = [e for e in doc["traceEvents"] if e["ph"] == "X"]
+        assert event["name"] == "step"
+        assert event["cat"] == "apt"
+        assert event["dur"] >= 0
+        assert event["args"] == {"argv": "apt-get update"}
+        assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in doc["traceEvents"])
+
+    def test_cli_trace_option_writes_file(self, tmp_path: Path) -> None:
+        out = tmp_path / "trace.json"
+        assert cli.main(["--trace", str(out), "history"]) == 0
+
+        events = json.loads(out.read_text())["traceEvents"]
+        assert "sysmaint history" in [e["name"] for e in events]
+        assert not trace.is_enabled()
@@ -0,0 +1,44 @@
+"""Tests for sysmaint.core.upgrade_batches — dependency-closed upgrade batches."""
+
+from __future__ import annotations
+
+from sysmaint.core import upgrade_batches
+from sysmaint.core.apt_index import PendingUpgrade, Release
+
+_RELEASE = Release(prefix="", suite="stable")
+
+
+def _pending(*names: str) -> list[PendingUpgrade]:
+    return [PendingUpgrade(name, "1.0-1", "1.0-2", _RELEASE) for name in names]
+
+
+def _names(batches: list[list[PendingUpgrade]]) -> list[list[str]]:
+    return [[u.name for u in batch] for batch in batches]
+
+
+class TestPlan:
+    def test_dependencies_share_a_batch(self) -> None:
+        upgrades = _pending("curl", "libcurl4", "openssl", "libssl3", "tzdata")
+        depends = {"curl": {"libcurl4", "libc6"}, "libcurl4": {"libssl3"}, "openssl": {"libssl3"}}
+        assert _names(upgrade_batches.plan(upgrades, depends, 5)) == [
+            ["curl", "libcurl4", "libssl3", "openssl", "tzdata"]
+        ]
+        # Too big for size 2, the dependency-closed group stays whole.
+        assert _names(upgrade_batches.plan(upgrades, depends, 2)) == [
+            ["curl", "libcurl4", "libssl3", "openssl"],
+            ["tzdata"],
+        ]
+
+    def test_independent_upgrades_are_packed_up_to_size(self) -> None:
+        upgrades = _pending("a", "b", "c", "d", "e")
+        assert _names(upgrade_batches.plan(upgrades, {}, 2)) == [["a", "b"], ["c", "d"], ["e"]]
+
+    def test_multi_arch_siblings_stay_together(self) -> None:
+        upgrades = _pending("libc6:amd64", "bash", "libc6:i386")
+        assert _names(upgrade_batches.plan(upgrades, {}, 1)) == [
+            ["bash"],
+            ["libc6:amd64", "libc6:i386"],
+        ]
+
+    def test_nothing_pending(self) -> None:
+        assert upgrade_batches.plan([], {}, 10) == []